@@ -0,0 +1,431 @@
+"""
+Benchmark de los caminos críticos del motor deliberativo
+========================================================
+Mide, al estilo de asv, los motores que se ejecutan en cada deliberación:
+
+- inquiry_tree: `generate_inquiry_tree`, `InquiryTree.from_dict` y
+  `count_tree_nodes` sobre árboles sintéticos de profundidad y factor de
+  ramificación configurables.
+- perspectives: `generate_perspectives_batch` sobre todos los nodos del árbol.
+- eee: `calculate_eee_simple`, `calculate_eee_batch` sobre archivos de
+  hasta 1M sesiones, el evaluador incremental sobre registros de
+  razonamiento de 10 a 1M entradas y `auditor`, que reproduce el registro
+  de una sesión con conjuntos de perspectivas de distinto tamaño por nodo.
+- signature: `generate_signature_hash` y el árbol de Merkle del registro
+  con `sign_deliberation`.
+- certificate: `json.dumps` del certificado completo y la codificación en
+  streaming de `iter_certificate_bytes`.
+
+Cada caso se ejecuta en un proceso propio, de modo que su pico de RSS no
+depende de los anteriores, y se mide:
+- latencia: mediana y mínimo por llamada (ms) de `--repeat` muestras, cada
+  una con las llamadas necesarias para durar al menos `MIN_SAMPLE_TIME`
+  (las regresiones se comprueban sobre el mínimo);
+- asignaciones: pico de memoria asignada durante una llamada (tracemalloc);
+- RSS: pico de memoria residente del proceso (incluye los datos del caso).
+
+Con `--json` los resultados se guardan como línea base; con `--baseline`
+se comparan con una línea base anterior y el script falla (código de salida
+1) si alguna métrica empeora más que `--threshold`.
+
+La rejilla por defecto, con registros de hasta 1M entradas, tarda varios
+minutos; para una comprobación rápida basta `--log-sizes 10 1000`.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_engine.py --json baseline.json
+    python benchmarks/bench_engine.py --baseline baseline.json --threshold 0.2
+    python benchmarks/bench_engine.py --filter eee --log-sizes 10 1000 1000000
+"""
+
+import argparse
+import itertools
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+# Duración mínima de una muestra de latencia (segundos)
+MIN_SAMPLE_TIME = 0.02
+
+# Tiempo máximo de muestreo por caso (segundos): los casos lentos, como los
+# registros de 1M entradas, toman menos muestras que `--repeat`
+MAX_CASE_TIME = 10.0
+
+# Diferencias de latencia por debajo de este umbral no cuentan como regresión
+# (ruido de medida en los casos de microsegundos)
+MIN_REGRESSION_MS = 0.05
+
+# Métricas comparadas con la línea base. La latencia se compara por el mínimo,
+# menos sensible que la mediana a la carga de la máquina
+REGRESSION_METRICS = ("min_ms", "alloc_peak_kb", "rss_peak_mb")
+
+TYPES = ("factual", "comparative", "argumentative", "definitional")
+
+ACTIONS = ("EXPLORAR_NODO", "VALIDAR_NODO", "EXPLORAR_NODO", "REVISAR_NODO")
+
+# Nombre del caso → (preparación, parámetros); ver `case`
+CASES = {}
+
+
+def case(name: str, **grid):
+    """
+    Registra un caso. `grid` da, por parámetro, la opción de la CLI de la que
+    toma sus valores; el caso se ejecuta para cada combinación. La función
+    decorada prepara los datos y devuelve la llamada que se mide.
+    """
+    def register(setup):
+        CASES[name] = (setup, grid)
+        return setup
+    return register
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# DATOS SINTÉTICOS
+# ══════════════════════════════════════════════════════════════════════════════
+
+def synthetic_tree(depth: int, branching: int) -> dict:
+    """Árbol completo en el formato de `generate_inquiry_tree`."""
+    def branches(prefix: str, level: int) -> list:
+        if level > depth:
+            return []
+        nodes = []
+        for n in range(1, branching + 1):
+            node_id = f"{prefix}.{n}" if prefix else f"q{n}"
+            nodes.append({
+                "id": node_id,
+                "question": f"¿Subpregunta sintética {node_id} del complejo de indagación?",
+                "level": level,
+                "type": TYPES[(n + level) % len(TYPES)],
+                "sub_branches": branches(node_id, level + 1)
+            })
+        return nodes
+    return {"root": "¿Pregunta raíz sintética?", "branches": branches("", 1)}
+
+
+def synthetic_log(size: int, node_ids: list) -> list:
+    """Registro de razonamiento con exploraciones, validaciones y revisiones."""
+    return [{
+        "timestamp": f"2025-01-01T00:00:{n % 60:02d}.{n:06d}",
+        "action": ACTIONS[n % len(ACTIONS)],
+        "node_id": node_ids[n % len(node_ids)],
+        "perspectives_count": n % 5,
+        "detail": f"Entrada sintética {n}"
+    } for n in range(size)]
+
+
+def synthetic_perspectives(node_ids: list, per_node: int) -> dict:
+    return {node_id: [{
+        "source": f"Fuente {k}",
+        "content": "Texto sintético de una perspectiva normativa o doctrinal. " * 4,
+        "confidence": 0.9,
+        "type": "doctrine"
+    } for k in range(per_node)] for node_id in node_ids}
+
+
+def _node_ids(depth: int = 3, branching: int = 4) -> list:
+    from cd_modules import InquiryTree
+    return [node.id for node in InquiryTree.from_dict(synthetic_tree(depth, branching))]
+
+
+def _certificate(log_size: int) -> dict:
+    from cd_modules import build_certificate
+    node_ids = _node_ids()
+    return build_certificate(
+        "Benchmark", "Propiedad intelectual", "¿Pregunta raíz sintética?",
+        "Síntesis sintética. " * 50, {"total": 0.8}, node_ids[::2],
+        {node_id: f"Anotación de {node_id}" for node_id in node_ids[::3]},
+        synthetic_log(log_size, node_ids), "0" * 64, "2025-01-01T00:00:00"
+    )
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# CASOS
+# ══════════════════════════════════════════════════════════════════════════════
+
+@case("inquiry_tree.generate")
+def _generate_tree():
+    from cd_modules import generate_inquiry_tree
+    return lambda: generate_inquiry_tree("¿Puede una obra generada por IA ser protegida?")
+
+
+@case("inquiry_tree.from_dict", depth="depths", branching="branching")
+def _tree_from_dict(depth, branching):
+    from cd_modules import InquiryTree
+    data = synthetic_tree(depth, branching)
+    return lambda: InquiryTree.from_dict(data)
+
+
+@case("inquiry_tree.count_nodes", depth="depths", branching="branching")
+def _count_nodes(depth, branching):
+    from cd_modules.core import count_tree_nodes
+    data = synthetic_tree(depth, branching)
+    return lambda: count_tree_nodes(data)
+
+
+@case("perspectives.generate_batch", depth="depths", branching="branching")
+def _generate_perspectives(depth, branching):
+    from cd_modules import InquiryTree
+    from cd_modules.core import generate_perspectives_batch
+    nodes = [(node.id, node.question)
+             for node in InquiryTree.from_dict(synthetic_tree(depth, branching))]
+    return lambda: generate_perspectives_batch(nodes)
+
+
+@case("eee.calculate_simple")
+def _calculate_eee():
+    from cd_modules import calculate_eee_simple
+    validated = set(_node_ids()[::2])
+    return lambda: calculate_eee_simple(validated, 84, 150)
+
+
+@case("eee.calculate_batch", sessions="sessions")
+def _calculate_eee_batch(sessions):
+    import numpy as np
+    from cd_modules import calculate_eee_batch
+    rng = np.random.default_rng(0)
+    total = rng.integers(1, 200, sessions)
+    validated = rng.integers(0, total + 1)
+    perspectives = rng.integers(0, 400, sessions)
+    weights = {"pluralidad": 2.0, "reversibilidad": 0.5}
+    return lambda: calculate_eee_batch(validated, total, perspectives, weights)
+
+
+@case("eee.apply_log", log_size="log_sizes")
+def _apply_log(log_size):
+    from cd_modules import EroteticEvaluator
+    log = synthetic_log(log_size, _node_ids())
+
+    def run():
+        evaluator = EroteticEvaluator(84)
+        evaluator.apply_all(log)
+        return evaluator.metrics()
+    return run
+
+
+@case("eee.auditor", per_node="perspectives", depth="depths", branching="branching")
+def _auditor(per_node, depth, branching):
+    from cd_modules import auditor
+    tree = synthetic_tree(depth, branching)
+    node_ids = _node_ids(depth, branching)
+    events = [{"action": "EXPLORAR_NODO", "node_id": node_id, "perspectives_count": per_node}
+              for node_id in node_ids]
+    events += [{"action": "VALIDAR_NODO", "node_id": node_id, "annotation": "Justificada."}
+               for node_id in node_ids[::2]]
+    return lambda: auditor(tree, events)
+
+
+@case("signature.hash", per_node="perspectives")
+def _signature_hash(per_node):
+    from cd_modules.core import generate_signature_hash
+    node_ids = _node_ids()
+    content = {
+        "root_question": "¿Pregunta raíz sintética?",
+        "validated_nodes": node_ids[::2],
+        "perspectives": synthetic_perspectives(node_ids, per_node),
+        "synthesis": "Síntesis sintética. " * 50,
+        "eee_score": 0.8
+    }
+    return lambda: generate_signature_hash(content, "Benchmark", "2025-01-01T00:00:00")
+
+
+@case("signature.merkle", log_size="log_sizes")
+def _merkle(log_size):
+    from cd_modules.core import MerkleTrail, sign_deliberation
+    log = synthetic_log(log_size, _node_ids())
+    content = {"root_question": "¿Pregunta raíz sintética?", "synthesis": "", "eee_score": 0.8}
+
+    def run():
+        trail = MerkleTrail.from_entries(log)
+        return sign_deliberation(content, "Benchmark", "2025-01-01T00:00:00", trail)
+    return run
+
+
+@case("certificate.json_dumps", log_size="log_sizes")
+def _certificate_dumps(log_size):
+    certificate = _certificate(log_size)
+    return lambda: json.dumps(certificate, indent=2, ensure_ascii=False)
+
+
+@case("certificate.stream", log_size="log_sizes")
+def _certificate_stream(log_size):
+    from cd_modules import iter_certificate_bytes
+    certificate = _certificate(log_size)
+
+    def run():
+        size = 0
+        for chunk in iter_certificate_bytes(certificate):
+            size += len(chunk)
+        return size
+    return run
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# MEDICIÓN
+# ══════════════════════════════════════════════════════════════════════════════
+
+def _rss_mb() -> float:
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def measure(name: str, params: dict, repeat: int) -> dict:
+    """Mide un caso en el proceso actual."""
+    setup, _ = CASES[name]
+    func = setup(**params)
+    func()  # calentamiento: importaciones y cachés perezosas
+
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_SAMPLE_TIME or number >= 1 << 20:
+            break
+        number *= 2 if elapsed * 10 < MIN_SAMPLE_TIME else 1 + int(MIN_SAMPLE_TIME / elapsed)
+    samples = [elapsed / number]
+    repeat = max(1, min(repeat, int(MAX_CASE_TIME / elapsed)))
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "case": name,
+        "params": params,
+        "median_ms": round(statistics.median(samples) * 1000, 4),
+        "min_ms": round(min(samples) * 1000, 4),
+        "calls": number * repeat,
+        "alloc_peak_kb": round((peak - before) / 1024, 1),
+        "rss_peak_mb": round(_rss_mb(), 1)
+    }
+
+
+def measure_isolated(name: str, params: dict, repeat: int) -> dict:
+    """Mide un caso en un intérprete nuevo para aislar su pico de RSS."""
+    result = subprocess.run(
+        [sys.executable, __file__, "--worker", name, json.dumps(params), "--repeat", str(repeat)],
+        capture_output=True, text=True, cwd=REPO_ROOT
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{name} {params}: {result.stderr.strip()}")
+    return json.loads(result.stdout)
+
+
+def expand(name: str, args: argparse.Namespace) -> list:
+    """Combinaciones de parámetros de un caso según las opciones de la CLI."""
+    _, grid = CASES[name]
+    keys = list(grid)
+    values = [getattr(args, grid[key]) for key in keys]
+    return [dict(zip(keys, combination)) for combination in itertools.product(*values)]
+
+
+def case_key(result: dict) -> str:
+    params = ",".join(f"{k}={v}" for k, v in result["params"].items())
+    return f"{result['case']}[{params}]" if params else result["case"]
+
+
+def compare(results: list, baseline: dict, threshold: float) -> list:
+    """Regresiones respecto a la línea base: `(caso, métrica, antes, ahora)`."""
+    previous = {case_key(r): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get(case_key(result))
+        if before is None:
+            continue
+        for metric in REGRESSION_METRICS:
+            old, new = before.get(metric), result[metric]
+            if not old or new <= old * (1 + threshold):
+                continue
+            if metric == "min_ms" and new - old < MIN_REGRESSION_MS:
+                continue
+            regressions.append((case_key(result), metric, old, new))
+    return regressions
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# CLI
+# ══════════════════════════════════════════════════════════════════════════════
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Caminos críticos del motor deliberativo")
+    parser.add_argument("--filter", help="Solo los casos cuyo nombre contiene este texto")
+    parser.add_argument("--depths", type=int, nargs="+", default=[3, 5],
+                        help="Profundidades de los árboles sintéticos")
+    parser.add_argument("--branching", type=int, nargs="+", default=[4, 8],
+                        help="Factores de ramificación de los árboles sintéticos")
+    parser.add_argument("--log-sizes", type=int, nargs="+",
+                        default=[10, 1000, 100_000, 1_000_000],
+                        help="Entradas de los registros de razonamiento")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1000, 1_000_000],
+                        help="Sesiones del EEE por lotes")
+    parser.add_argument("--perspectives", type=int, nargs="+", default=[2, 8],
+                        help="Perspectivas por nodo")
+    parser.add_argument("--repeat", type=int, default=5, help="Muestras de latencia por caso")
+    parser.add_argument("--json", metavar="RUTA", help="Guarda los resultados (línea base) en JSON")
+    parser.add_argument("--baseline", metavar="RUTA", help="Línea base con la que comparar")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Empeoramiento relativo tolerado (0.2 = 20 %%)")
+    parser.add_argument("--worker", nargs=2, metavar=("CASO", "PARAMS"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    # Índices y datos fuera del repositorio: sin corpus, perspectivas de demostración
+    os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="delibera-bench-"))
+    os.environ.setdefault("CHROMA_PERSIST_DIR", os.path.join(os.environ["DATA_DIR"], "index"))
+    os.environ.setdefault("DELIBERA_VECTOR_STORE", "local")
+
+    if args.worker:
+        name, params = args.worker
+        print(json.dumps(measure(name, json.loads(params), args.repeat)))
+        return 0
+
+    results = []
+    print(f"{'caso':<58}  {'mediana':>11}  {'asignado':>11}  {'RSS':>9}")
+    for name in CASES:
+        if args.filter and args.filter not in name:
+            continue
+        for params in expand(name, args):
+            result = measure_isolated(name, params, args.repeat)
+            results.append(result)
+            print(f"{case_key(result):<58}  {result['median_ms']:>8.3f} ms  "
+                  f"{result['alloc_peak_kb']:>8.1f} KB  {result['rss_peak_mb']:>6.1f} MB",
+                  flush=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "repeat": args.repeat,
+                       "results": results}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for key, metric, old, new in regressions:
+            print(f"REGRESIÓN {key} {metric}: {old} → {new} (+{(new / old - 1):.0%})")
+        if regressions:
+            return 1
+        print(f"OK: sin regresiones de más del {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
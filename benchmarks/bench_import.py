@@ -0,0 +1,106 @@
+"""
+Benchmark de tiempo de importación
+==================================
+Mide, en intérpretes nuevos, cuánto cuesta `import cd_modules` y el primer
+uso de cada motor de `cd_modules.core`. Cada medición se repite varias veces
+y se informa la mediana.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_import.py
+    python benchmarks/bench_import.py --repeat 20 --json import_times.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Escenario → sentencia que se cronometra tras arrancar el intérprete
+SCENARIOS = {
+    "import cd_modules": "import cd_modules",
+    "inquiry_engine": "import cd_modules; cd_modules.InquiryTree",
+    "contextual_generator": "import cd_modules; cd_modules.generate_perspectives",
+    "perspective_cache": "import cd_modules; cd_modules.PerspectiveCache",
+    "prefetch": "import cd_modules; cd_modules.run_prefetch",
+    "epistemic_validator": "import cd_modules; cd_modules.EroteticEvaluator",
+    "reasoning_tracker": "import cd_modules; cd_modules.ReasoningTracker",
+    "signature": "import cd_modules; cd_modules.sign_deliberation",
+    "certificate": "import cd_modules; cd_modules.build_certificate",
+    "all engines": "import cd_modules; [getattr(cd_modules, n) for n in cd_modules.__all__]",
+}
+
+_TIMER = (
+    "import time; _t = time.perf_counter(); {stmt}; "
+    "print((time.perf_counter() - _t) * 1000)"
+)
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(REPO_ROOT), env.get("PYTHONPATH")]))
+    env.pop("PYTHONPROFILEIMPORTTIME", None)
+    return env
+
+
+def time_statement(stmt: str, repeat: int) -> float:
+    """Mediana en milisegundos de ejecutar `stmt` en un intérprete nuevo."""
+    samples = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", _TIMER.format(stmt=stmt)],
+            capture_output=True, text=True, check=True, env=_env(), cwd=REPO_ROOT
+        )
+        samples.append(float(result.stdout.strip()))
+    return statistics.median(samples)
+
+
+def importtime_ms(stmt: str, prefix: str = "") -> dict:
+    """
+    Tiempo acumulado por módulo según `python -X importtime`, en milisegundos.
+    Con `prefix`, solo se devuelven los módulos cuyo nombre empieza así.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", stmt],
+        capture_output=True, text=True, check=True, env=_env(), cwd=REPO_ROOT
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, module = line[len("import time:"):].split("|")
+        module = module.strip()
+        if module.startswith(prefix):
+            times[module] = int(cumulative_us) / 1000
+    return times
+
+
+def run(repeat: int) -> dict:
+    return {name: round(time_statement(stmt, repeat), 2) for name, stmt in SCENARIOS.items()}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Tiempo de importación de cd_modules")
+    parser.add_argument("--repeat", type=int, default=7, help="Repeticiones por escenario")
+    parser.add_argument("--json", metavar="RUTA", help="Guarda los resultados en JSON")
+    args = parser.parse_args(argv)
+
+    results = run(args.repeat)
+    width = max(map(len, results))
+    for name, ms in results.items():
+        print(f"{name:<{width}}  {ms:8.2f} ms")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "repeat": args.repeat,
+                       "median_ms": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""
+Benchmark de renderizado del árbol de indagación
+================================================
+Ejecuta la fase de deliberación de `streamlit_app.py` con `AppTest` sobre
+árboles sintéticos de 50, 500 y 5000 nodos y mide, por ejecución del script,
+el tiempo de renderizado y el tamaño de lo emitido (elementos y bytes de
+Markdown), como aproximación a la carga que viaja por el websocket.
+
+Modos:
+- paginado: vista por defecto (ramas de primer nivel desplegadas, páginas
+  de `TREE_PAGE_SIZE` nodos, paneles de perspectivas bajo demanda).
+- completo: todo desplegado en una sola página y todos los paneles de los
+  nodos explorados abiertos, como el renderizado recursivo anterior.
+
+Uso (desde la raíz del repositorio; requiere streamlit):
+    python benchmarks/bench_tree_render.py
+    python benchmarks/bench_tree_render.py --sizes 50 500 --repeat 5 --json render.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from cd_modules import InquiryTree, generate_perspectives  # noqa: E402
+
+
+TYPES = ("factual", "comparative", "argumentative", "definitional")
+
+# Fracción de nodos explorados (con perspectivas) en el árbol sintético
+EXPLORED_RATIO = 0.1
+
+
+def synthetic_tree(size: int, fanout: int = 4) -> InquiryTree:
+    """Árbol de `size` nodos en anchura, con `fanout` hijos por nodo."""
+    branches = []
+    queue = []
+    for n in range(size):
+        parent = queue[n // fanout - 1] if n >= fanout else None
+        level = parent["level"] + 1 if parent else 1
+        node = {
+            "id": f"{parent['id']}.{len(parent['sub_branches']) + 1}" if parent else f"q{n + 1}",
+            "question": f"¿Subpregunta sintética {n + 1} del complejo de indagación?",
+            "level": level,
+            "type": TYPES[n % len(TYPES)],
+            "sub_branches": []
+        }
+        (parent["sub_branches"] if parent else branches).append(node)
+        queue.append(node)
+    return InquiryTree.from_dict({"root": "Pregunta raíz sintética", "branches": branches})
+
+
+def session_state(tree: InquiryTree, mode: str) -> dict:
+    explored = [node.id for n, node in enumerate(tree) if n % int(1 / EXPLORED_RATIO) == 0]
+    perspectives = {node_id: generate_perspectives(node_id, "") for node_id in explored}
+    state = {
+        "current_phase": "deliberation",
+        "root_question": tree.root,
+        "expert_name": "Benchmark",
+        "inquiry_tree": tree,
+        "perspectives": perspectives,
+    }
+    if mode == "completo":
+        state.update({
+            "expanded_nodes": {node.id for node in tree},
+            "open_panels": set(explored),
+            "tree_page_size": len(tree)
+        })
+    else:
+        state.update({
+            "expanded_nodes": {node.id for node in tree.branches()},
+            "open_panels": set()
+        })
+    return state
+
+
+def measure(size: int, mode: str, repeat: int) -> dict:
+    from streamlit.testing.v1 import AppTest
+
+    tree = synthetic_tree(size)
+    samples = []
+    for _ in range(repeat):
+        app = AppTest.from_file(str(REPO_ROOT / "streamlit_app.py"), default_timeout=600)
+        for key, value in session_state(tree, mode).items():
+            app.session_state[key] = value
+        start = time.perf_counter()
+        app.run()
+        samples.append((time.perf_counter() - start) * 1000)
+        if app.exception:
+            raise RuntimeError(app.exception[0].value)
+
+    markdown_bytes = sum(len(m.value.encode()) for m in app.markdown)
+    return {
+        "nodes": size,
+        "mode": mode,
+        "median_ms": round(statistics.median(samples), 1),
+        "elements": len(app.markdown) + len(app.button) + len(app.text_area),
+        "markdown_kb": round(markdown_bytes / 1024, 1)
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Renderizado del árbol de indagación")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 5000])
+    parser.add_argument("--modes", nargs="+", default=["paginado", "completo"],
+                        choices=["paginado", "completo"])
+    parser.add_argument("--repeat", type=int, default=3, help="Ejecuciones por escenario")
+    parser.add_argument("--json", metavar="RUTA", help="Guarda los resultados en JSON")
+    args = parser.parse_args(argv)
+
+    # Datos del registro de razonamiento fuera del repositorio
+    os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="delibera-bench-"))
+    os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")
+
+    results = []
+    print(f"{'nodos':>6}  {'modo':<9}  {'mediana':>10}  {'elementos':>9}  {'markdown':>10}")
+    for size in args.sizes:
+        for mode in args.modes:
+            result = measure(size, mode, args.repeat)
+            results.append(result)
+            print(f"{result['nodes']:>6}  {mode:<9}  {result['median_ms']:>7.1f} ms  "
+                  f"{result['elements']:>9}  {result['markdown_kb']:>7.1f} KB")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "repeat": args.repeat,
+                       "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
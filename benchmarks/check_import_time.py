@@ -0,0 +1,72 @@
+"""
+Control de regresión del tiempo de importación
+==============================================
+Falla (código de salida 1) si un `import cd_modules` en frío supera el
+presupuesto, según `python -X importtime`, o si arrastra alguna dependencia
+pesada que debería cargarse solo bajo demanda a través del registro de
+proveedores.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/check_import_time.py
+    python benchmarks/check_import_time.py --budget-ms 30 --runs 5
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+from bench_import import REPO_ROOT, _env, importtime_ms
+
+
+# Presupuesto por defecto; configurable con DELIBERA_IMPORT_BUDGET_MS
+DEFAULT_BUDGET_MS = float(os.getenv("DELIBERA_IMPORT_BUDGET_MS", "25"))
+
+# Dependencias de requirements.txt que nunca deben cargarse al importar cd_modules
+HEAVY_MODULES = (
+    "streamlit", "langchain", "langchain_openai", "langchain_community", "openai",
+    "chromadb", "tiktoken", "numpy", "pandas", "plotly", "pypdf", "docx", "pydantic",
+)
+
+
+def cold_import_ms(runs: int) -> float:
+    """Mejor tiempo acumulado de `cd_modules` entre varias ejecuciones en frío."""
+    return min(importtime_ms("import cd_modules", "cd_modules")["cd_modules"]
+               for _ in range(runs))
+
+
+def heavy_modules_loaded() -> list:
+    probe = (
+        "import sys, cd_modules; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True,
+                            check=True, env=_env(), cwd=REPO_ROOT)
+    return [m for m in result.stdout.strip().split(",") if m]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Presupuesto de importación de cd_modules")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=5,
+                        help="Ejecuciones en frío; se toma la más rápida")
+    args = parser.parse_args(argv)
+
+    elapsed = cold_import_ms(args.runs)
+    heavy = heavy_modules_loaded()
+    print(f"import cd_modules: {elapsed:.2f} ms (presupuesto {args.budget_ms:.2f} ms)")
+
+    failed = False
+    if elapsed > args.budget_ms:
+        print("FALLO: la importación en frío supera el presupuesto")
+        failed = True
+    if heavy:
+        print(f"FALLO: dependencias pesadas cargadas al importar: {', '.join(heavy)}")
+        failed = True
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
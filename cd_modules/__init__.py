@@ -6,35 +6,17 @@ Implementación del Código Deliberativo para asistencia a expertos
 en Derecho de Propiedad Intelectual (DPI).
 
 Módulos disponibles:
-- cd_modules.core: Motores centrales del sistema
+- cd_modules.core: Motores centrales del sistema (carga perezosa)
+- cd_modules.verify: Verificación de certificados (delibera-verify)
+- cd_modules.archive: Archivo de deliberaciones firmadas (delibera-archive)
+- cd_modules.batch: Deliberaciones por lotes sin interfaz (delibera-batch)
 - cd_modules.domain_ip: Especializaciones para DPI (futuro)
 
 Referencia: Tamames, J. (2025). El Código Deliberativo: 
 arquitectura, métrica y aplicación.
 """
 
-from .core import (
-    # Inquiry Engine
-    InquiryEngine,
-    InquiryNode,
-    QuestionType,
-    generate_inquiry_tree,
-    
-    # Epistemic Validator (EEE)
-    EroteticEvaluator,
-    EEEResult,
-    EEEDimension,
-    auditor,
-    calculate_eee_simple,
-    
-    # Reasoning Tracker
-    ReasoningTracker,
-    ReasoningStep,
-    SessionSummary,
-    ActionType,
-    get_tracker,
-    reset_tracker,
-)
+from . import core
 
 __version__ = "1.0.0"
 __author__ = "José Tamames"
@@ -44,17 +26,53 @@ __all__ = [
     # Core exports
     "InquiryEngine",
     "InquiryNode",
+    "InquiryTree",
     "QuestionType", 
     "generate_inquiry_tree",
+    "generate_perspectives",
+    "PerspectiveCache",
+    "prefetch_perspectives",
+    "run_prefetch",
+    "generate_node_perspectives",
+    "StubPerspectiveProvider",
     "EroteticEvaluator",
+    "EEEAccumulator",
     "EEEResult",
+    "EEEEvidence",
     "EEEDimension",
     "auditor",
     "calculate_eee_simple",
+    "calculate_eee_batch",
     "ReasoningTracker",
     "ReasoningStep",
     "SessionSummary",
     "ActionType",
     "get_tracker",
     "reset_tracker",
+    "sign_deliberation",
+    "verify_certificate",
+    "build_certificate",
+    "certificate_tempfile",
+    "get_provider",
+    "SourceIndex",
+    "LLMBatcher",
+    "default_perspective_provider",
+    "expand_inquiry_tree",
+    "SessionStore",
+    "DeliberationArchive",
+    "InquiryTreeCache",
+    "Instruments",
 ]
+
+
+def __getattr__(name: str):
+    # Los motores se cargan al primer uso (ver cd_modules.core)
+    if name in core.__all__:
+        value = getattr(core, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,111 @@
+"""
+delibera-archive — Archivo de deliberaciones firmadas
+=====================================================
+Importa certificados exportados al archivo SQLite indexado
+(`DATA_DIR/archive.sqlite3`) y lo consulta desde la línea de órdenes. Las
+consultas se emiten como JSONL. No importa Streamlit.
+
+Uso:
+    python -m cd_modules.archive import certificados/ lote.tar.gz
+    python -m cd_modules.archive find --expert "Dra. Ruiz" --max-eee 0.6 \\
+        --since 2025-07-01 --until 2025-10-01
+    python -m cd_modules.archive annotations q3.1
+    python -m cd_modules.archive search "obras generadas por IA"
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Iterable, Iterator, Union
+
+from .config import get_settings
+from .core.archive import DeliberationArchive
+from .verify import iter_sources
+
+
+def iter_certificates(paths: Iterable[Union[str, Path]]) -> Iterator[dict]:
+    """Certificados de archivos, directorios o tarballs (los ilegibles se omiten)."""
+    for source, data in iter_sources(paths):
+        try:
+            if data is None:
+                with open(source, "rb") as f:
+                    data = f.read()
+            certificate = json.loads(data)
+            if "hash" not in certificate.get("firma", {}):
+                raise ValueError("certificado sin firma")
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as exc:
+            print(f"Se omite {source}: {type(exc).__name__}: {exc}", file=sys.stderr)
+            continue
+        yield certificate
+
+
+def _print_rows(rows: list):
+    for row in rows:
+        print(json.dumps(row, ensure_ascii=False))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="delibera-archive",
+        description="Archivo indexado de deliberaciones firmadas."
+    )
+    parser.add_argument("--db", type=Path,
+                        help="Base de datos del archivo (por defecto, DATA_DIR/archive.sqlite3)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    importer = commands.add_parser("import", help="Archiva certificados JSON")
+    importer.add_argument("paths", nargs="+", help="Certificados JSON, directorios o tarballs")
+    importer.add_argument("--batch-size", type=int, default=500,
+                          help="Certificados por transacción")
+
+    finder = commands.add_parser("find", help="Busca deliberaciones")
+    finder.add_argument("--expert")
+    finder.add_argument("--question", help="Pregunta raíz exacta")
+    finder.add_argument("--min-eee", type=float)
+    finder.add_argument("--max-eee", type=float, help="Cota superior exclusiva del EEE")
+    finder.add_argument("--since", help="Fecha ISO inicial (incluida)")
+    finder.add_argument("--until", help="Fecha ISO final (excluida)")
+    finder.add_argument("--limit", type=int, default=100)
+
+    annotations = commands.add_parser("annotations", help="Anotaciones sobre un nodo")
+    annotations.add_argument("node_id")
+    annotations.add_argument("--limit", type=int)
+
+    searcher = commands.add_parser("search", help="Búsqueda de texto completo")
+    searcher.add_argument("text", help="Pregunta o términos a buscar")
+    searcher.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    archive = (DeliberationArchive(args.db) if args.db
+               else DeliberationArchive.from_settings(get_settings()))
+    start = time.perf_counter()
+
+    if args.command == "import":
+        added = archive.add_many(iter_certificates(args.paths), args.batch_size)
+        elapsed = time.perf_counter() - start
+        print(f"{added} deliberaciones nuevas · {len(archive)} en el archivo · {elapsed:.2f} s",
+              file=sys.stderr)
+    elif args.command == "find":
+        rows = archive.find(args.expert, args.question, args.min_eee, args.max_eee,
+                            args.since, args.until, args.limit)
+        _print_rows(rows)
+        print(f"{len(rows)} deliberaciones · {(time.perf_counter() - start) * 1000:.1f} ms",
+              file=sys.stderr)
+    elif args.command == "search":
+        rows = archive.search(args.text, args.limit)
+        _print_rows(rows)
+        print(f"{len(rows)} deliberaciones · {(time.perf_counter() - start) * 1000:.1f} ms",
+              file=sys.stderr)
+    else:
+        rows = archive.annotations(args.node_id, args.limit)
+        _print_rows(rows)
+        print(f"{len(rows)} anotaciones · {(time.perf_counter() - start) * 1000:.1f} ms",
+              file=sys.stderr)
+    archive.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,315 @@
+"""
+delibera-batch — Deliberaciones por lotes sin interfaz
+======================================================
+Genera fuera de Streamlit el árbol de indagación y las perspectivas de cada
+nodo para una lista de preguntas raíz, p. ej. las cuestiones recurrentes de
+DPI durante la noche. No importa Streamlit.
+
+- Entrada: JSONL con una pregunta por línea (`{"question": "..."}`, o
+  `"pregunta"`; `"id"` opcional). Sin id, se usa un hash de la pregunta
+  normalizada, de modo que las preguntas repetidas se procesan una vez.
+- Proceso: pool de hilos (por defecto; la generación con LLM espera red) o
+  de procesos (`--processes`), con un número acotado de preguntas en vuelo.
+  Los árboles se guardan en la caché de árboles y las perspectivas en la
+  caché de perspectivas, así que la interfaz los reutiliza después.
+- Salida: directorio con partes Parquet (o Arrow con `--format arrow`), una
+  fila por nodo. Cada parte se escribe de forma atómica cada
+  `--checkpoint-every` preguntas; al relanzar una ejecución interrumpida se
+  omiten las preguntas que ya están en alguna parte. El directorio se lee
+  entero con `pandas.read_parquet(directorio)`.
+
+Al terminar se informa del rendimiento en preguntas por segundo.
+
+Uso:
+    python -m cd_modules.batch preguntas.jsonl -o resultados/
+    python -m cd_modules.batch --workers 16 --checkpoint-every 200 preguntas.jsonl -o resultados/
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Iterable, Iterator, Tuple
+
+from .core.inquiry_engine import InquiryTree, generate_inquiry_tree
+from .core.llm_batch import default_perspective_provider, expand_inquiry_tree
+from .core.perspective_cache import PerspectiveCache, normalize_question
+from .core.prefetch import run_prefetch
+from .core.tree_cache import InquiryTreeCache
+
+
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+# Columnas de la salida, una fila por nodo del árbol
+COLUMNS = ("question_id", "root_question", "node_id", "parent_id", "level", "type",
+           "question", "perspectives", "perspective_count", "elapsed_ms")
+
+# Una pregunta a procesar: (id, pregunta raíz)
+Task = Tuple[str, str]
+
+# Cachés del proceso (se crean al primer uso en cada proceso del pool)
+_caches = None
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# ENTRADA
+# ══════════════════════════════════════════════════════════════════════════════
+
+def question_id(question: str) -> str:
+    return hashlib.sha256(normalize_question(question).encode()).hexdigest()[:16]
+
+
+def iter_questions(paths: Iterable[str]) -> Iterator[Task]:
+    """Preguntas de los JSONL indicados (`-` es stdin); las líneas inválidas se omiten."""
+    for path in paths:
+        f = sys.stdin if path == "-" else open(path, encoding="utf-8")
+        try:
+            for number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    question = (record.get("question") or record.get("pregunta") or "").strip()
+                    if not question:
+                        raise ValueError("línea sin pregunta")
+                except (ValueError, AttributeError) as exc:
+                    print(f"Se omite {path}:{number}: {exc}", file=sys.stderr)
+                    continue
+                yield str(record.get("id") or question_id(question)), question
+        finally:
+            if f is not sys.stdin:
+                f.close()
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# DELIBERACIÓN
+# ══════════════════════════════════════════════════════════════════════════════
+
+def _get_caches() -> tuple:
+    global _caches
+    if _caches is None:
+        _caches = (PerspectiveCache.from_settings(), InquiryTreeCache.from_settings())
+    return _caches
+
+
+def deliberate(task: Task) -> dict:
+    """
+    Árbol y perspectivas de una pregunta raíz. Devuelve `{"id", "rows"}` con
+    una fila por nodo, o `{"id", "error"}` si algún paso falla.
+    """
+    qid, question = task
+    start = time.perf_counter()
+    try:
+        perspective_cache, tree_cache = _get_caches()
+        provider = default_perspective_provider(context=question)
+        tree = generate_inquiry_tree(question)
+        if provider is not None:
+            tree = expand_inquiry_tree(tree, context=question)
+        tree_cache.put(question, tree, (time.perf_counter() - start) * 1000)
+
+        tree = InquiryTree.from_dict(tree)
+        perspectives = {}
+        summary = run_prefetch(tree, provider=provider, cache=perspective_cache, sink=perspectives)
+        if summary["failed"]:
+            node_id, error = next(iter(summary["failed"].items()))
+            raise RuntimeError(f"{len(summary['failed'])} nodos sin perspectivas ({node_id}: {error})")
+    except Exception as exc:
+        return {"id": qid, "error": f"{type(exc).__name__}: {exc}"}
+
+    elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+    rows = []
+    for node in tree:
+        node_perspectives = perspectives.get(node.id, [])
+        rows.append({
+            "question_id": qid,
+            "root_question": question,
+            "node_id": node.id,
+            "parent_id": node.parent.id if node.parent is not None else None,
+            "level": node.level,
+            "type": node.type,
+            "question": node.question,
+            "perspectives": json.dumps(node_perspectives, ensure_ascii=False),
+            "perspective_count": len(node_perspectives),
+            "elapsed_ms": elapsed_ms
+        })
+    return {"id": qid, "rows": rows}
+
+
+def _deliberate_batch(batch: list) -> list:
+    return [deliberate(task) for task in batch]
+
+
+def deliberate_stream(tasks: Iterable[Task], workers: int = 4, processes: bool = False,
+                      batch_size: int = 1) -> Iterator[dict]:
+    """
+    Procesa las preguntas y entrega los resultados según terminan, con un
+    pool de hilos (o de procesos) y como mucho `2 × workers` lotes en vuelo.
+    """
+    batches = _batches(iter(tasks), batch_size)
+    if workers <= 1:
+        for batch in batches:
+            yield from _deliberate_batch(batch)
+        return
+
+    executor = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with executor(max_workers=workers) as pool:
+        pending = set()
+        for batch in batches:
+            pending.add(pool.submit(_deliberate_batch, batch))
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+        for future in pending:
+            yield from future.result()
+
+
+def _batches(items: Iterator[Task], size: int) -> Iterator[list]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# SALIDA CON PUNTOS DE CONTROL
+# ══════════════════════════════════════════════════════════════════════════════
+
+class PartWriter:
+    """
+    Directorio de partes columnares (`part-00000.parquet`, ...). Cada parte
+    se escribe en un temporal y se renombra, así que una parte presente está
+    completa: las preguntas que contiene son el punto de control.
+    """
+
+    def __init__(self, directory: Path, fmt: str = "parquet"):
+        import pandas  # noqa: F401 — falla pronto si falta la dependencia
+        import pyarrow  # noqa: F401
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.fmt = fmt
+        self.suffix = FORMATS[fmt]
+        self.parts = sorted(self.directory.glob(f"part-*{self.suffix}"))
+
+    def completed(self) -> set:
+        """Ids de las preguntas ya escritas en alguna parte."""
+        import pandas as pd
+        done = set()
+        for part in self.parts:
+            if self.fmt == "parquet":
+                frame = pd.read_parquet(part, columns=["question_id"])
+            else:
+                frame = pd.read_feather(part, columns=["question_id"])
+            done.update(frame["question_id"])
+        return done
+
+    def write(self, rows: list) -> Path:
+        import pandas as pd
+        frame = pd.DataFrame(rows, columns=list(COLUMNS))
+        path = self.directory / f"part-{len(self.parts):05d}{self.suffix}"
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        if self.fmt == "parquet":
+            frame.to_parquet(tmp_path, index=False)
+        else:
+            frame.to_feather(tmp_path)
+        os.replace(tmp_path, path)
+        self.parts.append(path)
+        return path
+
+
+def run_batch(tasks: Iterable[Task], writer: PartWriter, workers: int = 4,
+              processes: bool = False, checkpoint_every: int = 100,
+              progress=None) -> dict:
+    """
+    Procesa las preguntas que aún no están en `writer` y escribe una parte
+    cada `checkpoint_every` preguntas terminadas. Las preguntas fallidas no
+    se escriben (se reintentan en la siguiente ejecución). Devuelve el
+    resumen con el rendimiento obtenido.
+    """
+    start = time.perf_counter()
+    done = writer.completed()
+    summary = {"questions": 0, "nodes": 0, "failures": 0, "skipped": 0}
+
+    def pending_tasks():
+        for qid, question in tasks:
+            if qid in done:
+                summary["skipped"] += 1
+                continue
+            done.add(qid)
+            yield qid, question
+
+    buffered, rows = 0, []
+    for result in deliberate_stream(pending_tasks(), workers, processes):
+        if "error" in result:
+            summary["failures"] += 1
+            print(f"Falla {result['id']}: {result['error']}", file=sys.stderr)
+            continue
+        rows.extend(result["rows"])
+        buffered += 1
+        summary["questions"] += 1
+        summary["nodes"] += len(result["rows"])
+        if buffered >= checkpoint_every:
+            path = writer.write(rows)
+            buffered, rows = 0, []
+            if progress is not None:
+                progress(path, summary, time.perf_counter() - start)
+    if rows:
+        writer.write(rows)
+
+    elapsed = time.perf_counter() - start
+    summary["elapsed"] = round(elapsed, 3)
+    summary["questions_per_second"] = round(summary["questions"] / elapsed, 2) if elapsed > 0 else 0.0
+    return summary
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# CLI
+# ══════════════════════════════════════════════════════════════════════════════
+
+def _report_progress(path: Path, summary: dict, elapsed: float):
+    rate = summary["questions"] / elapsed if elapsed > 0 else 0.0
+    print(f"{path.name}: {summary['questions']} preguntas · {rate:.2f} preg/s",
+          file=sys.stderr)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="delibera-batch",
+        description="Genera árboles de indagación y perspectivas por lotes."
+    )
+    parser.add_argument("paths", nargs="+", help="JSONL de preguntas raíz (- para stdin)")
+    parser.add_argument("-o", "--output", type=Path, required=True,
+                        help="Directorio de salida (partes columnares)")
+    parser.add_argument("--format", choices=list(FORMATS), default="parquet")
+    parser.add_argument("--workers", type=int, default=min(32, (os.cpu_count() or 1) * 4),
+                        help="Preguntas en paralelo (1 = sin pool)")
+    parser.add_argument("--processes", action="store_true",
+                        help="Pool de procesos en lugar de hilos (generación local, sin LLM)")
+    parser.add_argument("--checkpoint-every", type=int, default=100,
+                        help="Preguntas por parte escrita")
+    args = parser.parse_args(argv)
+
+    try:
+        writer = PartWriter(args.output, args.format)
+    except ImportError as exc:
+        parser.error(f"la salida {args.format} requiere pandas y pyarrow ({exc})")
+
+    summary = run_batch(iter_questions(args.paths), writer, args.workers, args.processes,
+                        args.checkpoint_every, progress=_report_progress)
+    print(f"{summary['questions']} preguntas · {summary['nodes']} nodos · "
+          f"{summary['failures']} fallos · {summary['skipped']} omitidas · "
+          f"{summary['elapsed']} s · {summary['questions_per_second']} preg/s",
+          file=sys.stderr)
+    return 1 if summary["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
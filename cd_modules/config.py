@@ -0,0 +1,82 @@
+"""
+Configuración de DELIBERA
+=========================
+Lee las variables de entorno documentadas en `.env.example`. Si
+python-dotenv está disponible, se carga antes el archivo `.env` del
+directorio de trabajo.
+"""
+
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+
+def _env_bool(value: str) -> bool:
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Parámetros de despliegue de DELIBERA."""
+    env: str = "development"
+    debug: bool = False
+    openai_api_key: str = ""
+    openai_model: str = "gpt-4o"
+    openai_temperature: float = 0.3
+    openai_base_url: str = "https://api.openai.com/v1"
+    llm_batch_tokens: int = 8000
+    data_dir: Path = Path("./data")
+    chroma_persist_dir: Path = Path("./chroma_db")
+    llm_provider: str = ""
+    embeddings_provider: str = ""
+    vector_store: str = ""
+    session_backend: str = ""
+    session_ttl: int = 7 * 24 * 3600
+    tree_cache_threshold: float = 0.9
+    tree_cache_ttl: int = 30 * 24 * 3600
+    metrics_path: Optional[Path] = None
+    eee_weights: str = ""
+
+    @property
+    def has_openai_key(self) -> bool:
+        """Indica si hay una API key de OpenAI real (no la de ejemplo)."""
+        return bool(self.openai_api_key) and self.openai_api_key != "sk-your-api-key-here"
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        return cls(
+            env=os.getenv("DELIBERA_ENV", cls.env),
+            debug=_env_bool(os.getenv("DELIBERA_DEBUG", "false")),
+            openai_api_key=os.getenv("OPENAI_API_KEY", ""),
+            openai_model=os.getenv("OPENAI_MODEL", cls.openai_model),
+            openai_temperature=float(os.getenv("OPENAI_TEMPERATURE", cls.openai_temperature)),
+            openai_base_url=os.getenv("OPENAI_BASE_URL", cls.openai_base_url),
+            llm_batch_tokens=int(os.getenv("DELIBERA_LLM_BATCH_TOKENS", cls.llm_batch_tokens)),
+            data_dir=Path(os.getenv("DATA_DIR", str(cls.data_dir))),
+            chroma_persist_dir=Path(os.getenv("CHROMA_PERSIST_DIR", str(cls.chroma_persist_dir))),
+            llm_provider=os.getenv("DELIBERA_LLM_PROVIDER", ""),
+            embeddings_provider=os.getenv("DELIBERA_EMBEDDINGS_PROVIDER", ""),
+            vector_store=os.getenv("DELIBERA_VECTOR_STORE", ""),
+            session_backend=os.getenv("DELIBERA_SESSION_BACKEND", ""),
+            session_ttl=int(os.getenv("DELIBERA_SESSION_TTL", cls.session_ttl)),
+            tree_cache_threshold=float(os.getenv("DELIBERA_TREE_CACHE_THRESHOLD",
+                                                 cls.tree_cache_threshold)),
+            tree_cache_ttl=int(os.getenv("DELIBERA_TREE_CACHE_TTL", cls.tree_cache_ttl)),
+            metrics_path=Path(os.environ["DELIBERA_METRICS_PATH"])
+            if os.getenv("DELIBERA_METRICS_PATH") else None,
+            eee_weights=os.getenv("DELIBERA_EEE_WEIGHTS", ""),
+        )
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Devuelve la configuración del proceso (se lee una sola vez)."""
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        pass
+    else:
+        load_dotenv()
+    return Settings.from_env()
@@ -0,0 +1,233 @@
+"""
+cd_modules.core — Motores centrales de DELIBERA
+===============================================
+
+- inquiry_engine: Motor de Indagación y árbol de indagación
+- contextual_generator: Generador Contextual de perspectivas
+- perspective_cache: Caché persistente de perspectivas
+- prefetch: Precarga asíncrona de perspectivas del árbol
+- epistemic_validator: Índice de Equilibrio Erotético (EEE)
+- reasoning_tracker: Registro de razonamiento auditable
+- certificate: Exportación en streaming del certificado de autoría
+- signature: Firma epistémica y árbol de Merkle del rastro
+- providers: Registro perezoso de backends de LLM, embeddings y vectores
+- retrieval: Índice de fuentes para el Generador Contextual
+- embedding_store: Matriz de embeddings en `np.memmap` con búsqueda por lotes
+- llm_batch: Peticiones agrupadas al LLM para perspectivas y subpreguntas
+- session_store: Estado de las deliberaciones en curso en SQLite o memoria
+- archive: Archivo SQLite indexado de deliberaciones firmadas
+- tree_cache: Caché de árboles de indagación por similitud de la pregunta raíz
+- instrumentation: Tiempos por ejecución de los caminos críticos (Prometheus/JSON)
+
+Los nombres se resuelven de forma perezosa (`__getattr__` de módulo): cada
+submódulo, con sus dependencias, se importa la primera vez que se usa uno
+de sus nombres. Así `import cd_modules` cuesta milisegundos y los procesos
+por lotes solo cargan los motores que necesitan.
+"""
+
+import importlib
+
+# Equivale a typing.TYPE_CHECKING sin pagar la importación de typing
+TYPE_CHECKING = False
+
+# Nombre exportado → submódulo que lo define
+_EXPORTS = {
+    "InquiryEngine": "inquiry_engine",
+    "InquiryNode": "inquiry_engine",
+    "InquiryTree": "inquiry_engine",
+    "QuestionType": "inquiry_engine",
+    "generate_inquiry_tree": "inquiry_engine",
+    "generate_perspectives": "contextual_generator",
+    "generate_perspectives_batch": "contextual_generator",
+    "PerspectiveCache": "perspective_cache",
+    "perspective_cache_key": "perspective_cache",
+    "PerspectiveProvider": "prefetch",
+    "LocalPerspectiveProvider": "prefetch",
+    "StubPerspectiveProvider": "prefetch",
+    "PrefetchResult": "prefetch",
+    "iter_prefetch": "prefetch",
+    "prefetch_perspectives": "prefetch",
+    "run_prefetch": "prefetch",
+    "generate_node_perspectives": "prefetch",
+    "EroteticEvaluator": "epistemic_validator",
+    "EEEAccumulator": "epistemic_validator",
+    "EEEResult": "epistemic_validator",
+    "EEEEvidence": "epistemic_validator",
+    "EEEDimension": "epistemic_validator",
+    "auditor": "epistemic_validator",
+    "calculate_eee_simple": "epistemic_validator",
+    "calculate_eee_batch": "epistemic_validator",
+    "count_tree_nodes": "epistemic_validator",
+    "MerkleTrail": "signature",
+    "generate_signature_hash": "signature",
+    "sign_deliberation": "signature",
+    "annotation_proof": "signature",
+    "verify_inclusion_proof": "signature",
+    "verify_certificate": "signature",
+    "ReasoningTracker": "reasoning_tracker",
+    "ReasoningStep": "reasoning_tracker",
+    "SessionSummary": "reasoning_tracker",
+    "ActionType": "reasoning_tracker",
+    "get_tracker": "reasoning_tracker",
+    "reset_tracker": "reasoning_tracker",
+    "build_certificate": "certificate",
+    "iter_certificate_json": "certificate",
+    "iter_certificate_bytes": "certificate",
+    "write_certificate": "certificate",
+    "certificate_tempfile": "certificate",
+    "ProviderRegistry": "providers",
+    "ProviderNotAvailable": "providers",
+    "HashingEmbeddings": "providers",
+    "registry": "providers",
+    "get_provider": "providers",
+    "SourceIndex": "retrieval",
+    "LocalSourceStore": "retrieval",
+    "get_source_index": "retrieval",
+    "retrieve_perspectives": "retrieval",
+    "retrieve_perspectives_batch": "retrieval",
+    "MemmapEmbeddingStore": "embedding_store",
+    "LLMBatcher": "llm_batch",
+    "LLMBatchError": "llm_batch",
+    "BatchedLLMPerspectiveProvider": "llm_batch",
+    "OpenAICompatibleTransport": "llm_batch",
+    "aexpand_inquiry_tree": "llm_batch",
+    "expand_inquiry_tree": "llm_batch",
+    "default_perspective_provider": "llm_batch",
+    "SessionStore": "session_store",
+    "SessionBackend": "session_store",
+    "SQLiteSessionBackend": "session_store",
+    "MemorySessionBackend": "session_store",
+    "SessionConflict": "session_store",
+    "new_session_id": "session_store",
+    "is_session_id": "session_store",
+    "DeliberationArchive": "archive",
+    "InquiryTreeCache": "tree_cache",
+    "TreeMatch": "tree_cache",
+    "normalize_root_question": "tree_cache",
+    "Instruments": "instrumentation",
+    "Histogram": "instrumentation",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if TYPE_CHECKING:
+    from .inquiry_engine import (
+        InquiryEngine,
+        InquiryNode,
+        InquiryTree,
+        QuestionType,
+        generate_inquiry_tree,
+    )
+    from .contextual_generator import (
+        generate_perspectives,
+        generate_perspectives_batch,
+    )
+    from .perspective_cache import (
+        PerspectiveCache,
+        perspective_cache_key,
+    )
+    from .prefetch import (
+        PerspectiveProvider,
+        LocalPerspectiveProvider,
+        StubPerspectiveProvider,
+        PrefetchResult,
+        iter_prefetch,
+        prefetch_perspectives,
+        run_prefetch,
+        generate_node_perspectives,
+    )
+    from .epistemic_validator import (
+        EroteticEvaluator,
+        EEEAccumulator,
+        EEEResult,
+        EEEEvidence,
+        EEEDimension,
+        auditor,
+        calculate_eee_simple,
+        calculate_eee_batch,
+        count_tree_nodes,
+    )
+    from .signature import (
+        MerkleTrail,
+        generate_signature_hash,
+        sign_deliberation,
+        annotation_proof,
+        verify_inclusion_proof,
+        verify_certificate,
+    )
+    from .reasoning_tracker import (
+        ReasoningTracker,
+        ReasoningStep,
+        SessionSummary,
+        ActionType,
+        get_tracker,
+        reset_tracker,
+    )
+    from .certificate import (
+        build_certificate,
+        iter_certificate_json,
+        iter_certificate_bytes,
+        write_certificate,
+        certificate_tempfile,
+    )
+    from .providers import (
+        ProviderRegistry,
+        ProviderNotAvailable,
+        HashingEmbeddings,
+        registry,
+        get_provider,
+    )
+    from .retrieval import (
+        SourceIndex,
+        LocalSourceStore,
+        get_source_index,
+        retrieve_perspectives,
+        retrieve_perspectives_batch,
+    )
+    from .embedding_store import (
+        MemmapEmbeddingStore,
+    )
+    from .llm_batch import (
+        LLMBatcher,
+        LLMBatchError,
+        BatchedLLMPerspectiveProvider,
+        OpenAICompatibleTransport,
+        aexpand_inquiry_tree,
+        expand_inquiry_tree,
+        default_perspective_provider,
+    )
+    from .session_store import (
+        SessionStore,
+        SessionBackend,
+        SQLiteSessionBackend,
+        MemorySessionBackend,
+        SessionConflict,
+        new_session_id,
+        is_session_id,
+    )
+    from .archive import (
+        DeliberationArchive,
+    )
+    from .tree_cache import (
+        InquiryTreeCache,
+        TreeMatch,
+        normalize_root_question,
+    )
+    from .instrumentation import (
+        Instruments,
+        Histogram,
+    )
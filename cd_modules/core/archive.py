@@ -0,0 +1,603 @@
+"""
+Archivo de deliberaciones
+=========================
+Almacén local e indexado de las deliberaciones firmadas, para consultar
+sesiones pasadas sin releer los certificados JSON descargados.
+
+Tablas de `DATA_DIR/archive.sqlite3`:
+- `deliberations`: una fila por certificado (experto, pregunta raíz,
+  síntesis, dimensiones, total y evidencia del EEE, firma y fecha de firma)
+- `nodes`: nodos del árbol (o, sin árbol, los que aparecen en el
+  certificado), con su estado de validación y exploración
+- `perspectives`: perspectivas mostradas por nodo, si se conocen
+- `annotations`: anotaciones del experto por nodo
+- `log_events`: registro de razonamiento, una fila por entrada
+
+Índices: experto (con fecha de firma), pregunta raíz, total del EEE, fecha
+de firma e id de nodo en nodos, perspectivas, anotaciones y eventos. La
+inserción masiva agrupa los certificados en transacciones por lotes; un
+certificado ya archivado (mismo hash de firma) se omite.
+
+Búsqueda de texto completo (`search`): índice FTS5 sin contenido
+(`deliberations_fts`) sobre la pregunta raíz, la síntesis y las anotaciones,
+actualizado en la misma transacción que archiva cada sesión. Los textos se
+analizan en Python con los términos de `retrieval.tokenize` (minúsculas,
+sin tildes ni palabras vacías) y un lematizador ligero del español que
+reduce género y número, de modo que «obras generadas» y «obra generada»
+comparten términos. La consulta descarta los términos muy frecuentes
+(según `fts_terms`, su frecuencia documental) y, si coincide con muchas
+deliberaciones, calcula BM25 solo sobre las más recientes, de modo que su
+coste no crece con el tamaño del archivo. Si el SQLite del sistema no
+incluye FTS5, la búsqueda no está disponible y el resto del archivo
+funciona igual.
+"""
+
+import json
+import sqlite3
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from ..config import Settings, get_settings
+from .retrieval import tokenize
+
+
+_EEE_DIMENSIONS = ("profundidad", "pluralidad", "trazabilidad", "reversibilidad", "robustez")
+
+# Campos de `EEEEvidence`, guardados en las columnas `eee_<campo>`
+_EEE_EVIDENCE = ("total_nodes", "validated", "perspectives", "tree_depth", "max_level",
+                 "justified", "ever_validated", "reverted")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS deliberations (
+    id INTEGER PRIMARY KEY,
+    signature_hash TEXT NOT NULL UNIQUE,
+    expert TEXT NOT NULL,
+    expert_role TEXT,
+    root_question TEXT NOT NULL,
+    synthesis TEXT,
+    eee_total REAL,
+    eee_profundidad REAL,
+    eee_pluralidad REAL,
+    eee_trazabilidad REAL,
+    eee_reversibilidad REAL,
+    eee_robustez REAL,
+    validated_count INTEGER NOT NULL,
+    log_size INTEGER NOT NULL,
+    signed_at TEXT NOT NULL,
+    scheme TEXT,
+    merkle_root TEXT,
+    eee_total_nodes INTEGER,
+    eee_validated INTEGER,
+    eee_perspectives INTEGER,
+    eee_tree_depth INTEGER,
+    eee_max_level INTEGER,
+    eee_justified INTEGER,
+    eee_ever_validated INTEGER,
+    eee_reverted INTEGER
+);
+CREATE INDEX IF NOT EXISTS deliberations_expert ON deliberations (expert, signed_at);
+CREATE INDEX IF NOT EXISTS deliberations_question ON deliberations (root_question);
+CREATE INDEX IF NOT EXISTS deliberations_eee ON deliberations (eee_total);
+CREATE INDEX IF NOT EXISTS deliberations_signed_at ON deliberations (signed_at);
+
+CREATE TABLE IF NOT EXISTS nodes (
+    deliberation_id INTEGER NOT NULL REFERENCES deliberations (id) ON DELETE CASCADE,
+    node_id TEXT NOT NULL,
+    question TEXT,
+    type TEXT,
+    level INTEGER,
+    validated INTEGER NOT NULL,
+    perspectives_count INTEGER,
+    PRIMARY KEY (deliberation_id, node_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS nodes_node_id ON nodes (node_id);
+
+CREATE TABLE IF NOT EXISTS perspectives (
+    deliberation_id INTEGER NOT NULL REFERENCES deliberations (id) ON DELETE CASCADE,
+    node_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    source TEXT,
+    type TEXT,
+    confidence REAL,
+    content TEXT,
+    PRIMARY KEY (deliberation_id, node_id, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS perspectives_node_id ON perspectives (node_id);
+
+CREATE TABLE IF NOT EXISTS annotations (
+    deliberation_id INTEGER NOT NULL REFERENCES deliberations (id) ON DELETE CASCADE,
+    node_id TEXT NOT NULL,
+    text TEXT NOT NULL,
+    PRIMARY KEY (deliberation_id, node_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS annotations_node_id ON annotations (node_id);
+
+CREATE TABLE IF NOT EXISTS log_events (
+    deliberation_id INTEGER NOT NULL REFERENCES deliberations (id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    timestamp TEXT,
+    action TEXT NOT NULL,
+    node_id TEXT,
+    data TEXT,
+    PRIMARY KEY (deliberation_id, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS log_events_node_id ON log_events (node_id);
+CREATE INDEX IF NOT EXISTS log_events_action ON log_events (action, timestamp);
+"""
+
+_DELIBERATION_COLUMNS = (
+    "signature_hash", "expert", "expert_role", "root_question", "synthesis", "eee_total",
+    *(f"eee_{name}" for name in _EEE_DIMENSIONS), "validated_count", "log_size", "signed_at",
+    "scheme", "merkle_root", *(f"eee_{name}" for name in _EEE_EVIDENCE)
+)
+
+_INSERT_DELIBERATION = (
+    f"INSERT OR IGNORE INTO deliberations ({', '.join(_DELIBERATION_COLUMNS)}) "
+    f"VALUES ({', '.join('?' * len(_DELIBERATION_COLUMNS))})"
+)
+
+# Pesos BM25 de las columnas del índice: pregunta raíz, síntesis, anotaciones
+_FTS_WEIGHTS = (4.0, 1.0, 1.0)
+
+_FTS_SCHEMA = (
+    "CREATE VIRTUAL TABLE deliberations_fts USING fts5("
+    "root_question, synthesis, annotations, "
+    "content='', tokenize='unicode61 remove_diacritics 2')",
+    f"INSERT INTO deliberations_fts (deliberations_fts, rank) VALUES ('rank', 'bm25{_FTS_WEIGHTS}')",
+    # Frecuencia documental de cada término, mantenida al insertar (consultar
+    # `fts5vocab` recorre la lista de apariciones entera del término)
+    "CREATE TABLE fts_terms (term TEXT PRIMARY KEY, docs INTEGER NOT NULL) WITHOUT ROWID",
+)
+
+# Términos presentes en más de esta fracción de las deliberaciones (y de
+# `_RANKED_CANDIDATES`): no distinguen y encarecen el cálculo de BM25, que
+# recorre todas sus apariciones
+_COMMON_TERM_RATIO = 0.1
+
+# Apariciones como máximo de los términos de una consulta; se conservan los
+# menos frecuentes que quepan
+_MAX_QUERY_POSTINGS = 200_000
+
+# Si una consulta coincide con más deliberaciones, la relevancia se calcula
+# solo sobre las coincidencias más recientes (el coste de BM25 crece con
+# el número de coincidencias)
+_RANKED_CANDIDATES = 1000
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# ANÁLISIS DE TEXTO
+# ══════════════════════════════════════════════════════════════════════════════
+
+def stem(term: str) -> str:
+    """
+    Lematizador ligero del español: quita el plural y la vocal final de
+    género (`autores` → `autor`, `obras` → `obr`, `luces` → `luz`).
+    Espera términos ya en minúsculas y sin tildes.
+    """
+    if len(term) > 4 and term.endswith("ces"):
+        term = term[:-3] + "z"
+    elif len(term) > 4 and term.endswith("es") and term[-3] not in "aeiou":
+        term = term[:-2]
+    elif len(term) > 3 and term.endswith("s"):
+        term = term[:-1]
+    if len(term) > 3 and term[-1] in "aeo":
+        term = term[:-1]
+    return term
+
+
+def search_terms(text: str) -> list:
+    """Términos de búsqueda del archivo: `tokenize` más `stem`."""
+    return [stem(term) for term in tokenize(text or "")]
+
+
+def _indexed_text(text: str) -> str:
+    return " ".join(search_terms(text))
+
+
+class DeliberationArchive:
+    """
+    Archivo SQLite de certificados firmados. Es seguro entre hilos (una
+    conexión por proceso serializada con un cerrojo) y admite varios
+    procesos escribiendo sobre el mismo archivo (modo WAL).
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(_SCHEMA)
+        self._add_missing_columns()
+        self.fts_available = self._ensure_fts()
+
+    def _add_missing_columns(self):
+        # Archivos creados antes de guardar la evidencia del EEE
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(deliberations)")}
+        for name in _EEE_EVIDENCE:
+            if f"eee_{name}" not in columns:
+                try:
+                    self._conn.execute(f"ALTER TABLE deliberations ADD COLUMN eee_{name} INTEGER")
+                except sqlite3.OperationalError:
+                    # Añadida a la vez por otro proceso
+                    pass
+
+    def _ensure_fts(self) -> bool:
+        # Crea el índice de texto completo y lo llena con lo ya archivado
+        exists = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'deliberations_fts'"
+        ).fetchone()
+        if exists:
+            return True
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            for statement in _FTS_SCHEMA:
+                self._conn.execute(statement)
+        except sqlite3.OperationalError:
+            # SQLite sin FTS5 (o creado a la vez por otro proceso)
+            self._conn.execute("ROLLBACK")
+            return self._conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'deliberations_fts'"
+            ).fetchone() is not None
+        rows = self._conn.execute(
+            "SELECT d.id, d.root_question, d.synthesis, "
+            "(SELECT group_concat(a.text, ' ') FROM annotations a WHERE a.deliberation_id = d.id) "
+            "FROM deliberations d"
+        )
+        documents = [(row[0], _indexed_text(row[1]), _indexed_text(row[2]), _indexed_text(row[3]))
+                     for row in rows.fetchall()]
+        self._index_documents(documents)
+        self._conn.execute("COMMIT")
+        return True
+
+    @classmethod
+    def from_settings(cls, settings: Optional[Settings] = None) -> "DeliberationArchive":
+        """Archivo en `DATA_DIR/archive.sqlite3`."""
+        settings = settings or get_settings()
+        return cls(settings.data_dir / "archive.sqlite3")
+
+    def close(self):
+        self._conn.close()
+
+    # ── Inserción ─────────────────────────────────────────────────────────────
+
+    def add(self, certificate: dict, tree=None, perspectives: Optional[dict] = None) -> Optional[int]:
+        """
+        Archiva un certificado. `tree` (un `InquiryTree`) y `perspectives`
+        (`{node_id: [perspectiva, ...]}`) completan lo que el certificado no
+        incluye. Devuelve el id de la deliberación, o None si ya estaba.
+        """
+        ids = self._insert_batch([(certificate, tree, perspectives)])
+        return ids[0]
+
+    def add_many(self, records: Iterable, batch_size: int = 500) -> int:
+        """
+        Archiva certificados en transacciones de `batch_size`. Cada registro
+        es un certificado o una tupla `(certificado, árbol, perspectivas)`.
+        Devuelve el número de deliberaciones nuevas.
+        """
+        added = 0
+        batch = []
+        for record in records:
+            batch.append(record if isinstance(record, tuple) else (record, None, None))
+            if len(batch) >= batch_size:
+                added += sum(i is not None for i in self._insert_batch(batch))
+                batch = []
+        if batch:
+            added += sum(i is not None for i in self._insert_batch(batch))
+        return added
+
+    def _insert_batch(self, batch: list) -> list:
+        ids = []
+        children = {"nodes": [], "perspectives": [], "annotations": [], "fts": []}
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for certificate, tree, perspectives in batch:
+                    cursor = self._conn.execute(
+                        _INSERT_DELIBERATION, _deliberation_row(certificate, 0)
+                    )
+                    if not cursor.rowcount:
+                        ids.append(None)
+                        continue
+                    deliberation_id = cursor.lastrowid
+                    ids.append(deliberation_id)
+
+                    # El registro (p. ej. un ReasoningTracker en disco) se
+                    # inserta en streaming; su tamaño se conoce al terminar
+                    explored = {}
+                    log_size = self._conn.executemany(
+                        "INSERT INTO log_events VALUES (?, ?, ?, ?, ?, ?)",
+                        _log_rows(deliberation_id,
+                                  certificate.get("registro_razonamiento") or (), explored)
+                    ).rowcount
+                    self._conn.execute("UPDATE deliberations SET log_size = ? WHERE id = ?",
+                                       (max(log_size, 0), deliberation_id))
+                    _collect_children(children, deliberation_id, certificate, explored,
+                                      tree, perspectives or {})
+                    if self.fts_available:
+                        children["fts"].append((
+                            deliberation_id,
+                            _indexed_text(certificate.get("pregunta_raiz")),
+                            _indexed_text(certificate.get("sintesis")),
+                            _indexed_text(" ".join((certificate.get("anotaciones") or {}).values()))
+                        ))
+
+                self._conn.executemany(
+                    "INSERT INTO nodes VALUES (?, ?, ?, ?, ?, ?, ?)", children["nodes"])
+                self._conn.executemany(
+                    "INSERT INTO perspectives VALUES (?, ?, ?, ?, ?, ?, ?)", children["perspectives"])
+                self._conn.executemany(
+                    "INSERT INTO annotations VALUES (?, ?, ?)", children["annotations"])
+                self._index_documents(children["fts"])
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return ids
+
+    def _index_documents(self, documents: list):
+        # Dentro de la transacción del llamante
+        if not documents:
+            return
+        self._conn.executemany(
+            "INSERT INTO deliberations_fts (rowid, root_question, synthesis, annotations) "
+            "VALUES (?, ?, ?, ?)", documents)
+        frequency = Counter()
+        for _, *columns in documents:
+            frequency.update(set(" ".join(columns).split()))
+        self._conn.executemany(
+            "INSERT INTO fts_terms (term, docs) VALUES (?, ?) "
+            "ON CONFLICT (term) DO UPDATE SET docs = docs + excluded.docs",
+            frequency.items())
+
+    # ── Consultas ─────────────────────────────────────────────────────────────
+
+    def find(self, expert: Optional[str] = None, root_question: Optional[str] = None,
+             min_eee: Optional[float] = None, max_eee: Optional[float] = None,
+             since: Optional[str] = None, until: Optional[str] = None,
+             limit: Optional[int] = 100) -> list:
+        """
+        Deliberaciones que cumplen todos los filtros dados, de la más reciente
+        a la más antigua. `max_eee` es exclusivo; `since` y `until` son
+        fechas ISO (`until` exclusiva), p. ej. el tercer trimestre de 2025 es
+        `since="2025-07-01", until="2025-10-01"`.
+        """
+        clauses, params = [], []
+        for clause, value in (("expert = ?", expert), ("root_question = ?", root_question),
+                              ("eee_total >= ?", min_eee), ("eee_total < ?", max_eee),
+                              ("signed_at >= ?", since), ("signed_at < ?", until)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        sql = "SELECT * FROM deliberations"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        if any(value is not None for value in (expert, root_question, min_eee, max_eee)):
+            # `+signed_at` evita que SQLite recorra entero el índice de fechas
+            # para no ordenar: filtra por el índice más selectivo y ordena
+            # solo las filas que quedan
+            sql += " ORDER BY +signed_at DESC"
+        else:
+            sql += " ORDER BY signed_at DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self._query(sql, params)
+
+    def search(self, text: str, limit: int = 10) -> list:
+        """
+        Deliberaciones cuyo texto (pregunta raíz, síntesis y anotaciones) se
+        parece a `text`, ordenadas por relevancia BM25 (`score`, menor es
+        mejor). Basta con que coincida uno de los términos distintivos; si
+        coinciden más de `_RANKED_CANDIDATES` deliberaciones, se ordenan
+        solo las más recientes. Si todos los términos son frecuentes, se
+        devuelven las más recientes que los contienen todos (`score` None).
+        """
+        if not self.fts_available:
+            return []
+        terms = list(dict.fromkeys(search_terms(text)))
+        if not terms:
+            return []
+        with self._lock:
+            frequency = self._term_frequency(terms)
+            if not frequency:
+                return []
+            distinctive = self._distinctive_terms(frequency)
+            if not distinctive:
+                query = " AND ".join(f'"{term}"' for term in frequency)
+                rows = self._conn.execute(
+                    "SELECT d.*, NULL AS score FROM deliberations d WHERE d.id IN "
+                    "(SELECT rowid FROM deliberations_fts WHERE deliberations_fts MATCH ? "
+                    "ORDER BY rowid DESC LIMIT ?) ORDER BY d.id DESC",
+                    (query, limit)
+                ).fetchall()
+                return [dict(row) for row in rows]
+
+            query = " OR ".join(f'"{term}"' for term in distinctive)
+            sql = "SELECT rowid, rank FROM deliberations_fts WHERE deliberations_fts MATCH ?"
+            params = [query]
+            if sum(frequency[term] for term in distinctive) > _RANKED_CANDIDATES:
+                oldest = self._conn.execute(
+                    "SELECT rowid FROM deliberations_fts WHERE deliberations_fts MATCH ? "
+                    "ORDER BY rowid DESC LIMIT 1 OFFSET ?",
+                    (query, _RANKED_CANDIDATES - 1)
+                ).fetchone()
+                if oldest is not None:
+                    sql += " AND rowid >= ?"
+                    params.append(oldest[0])
+            rows = self._conn.execute(
+                f"SELECT d.*, f.rank AS score FROM ({sql} ORDER BY rank LIMIT ?) f "
+                "JOIN deliberations d ON d.id = f.rowid ORDER BY f.rank",
+                (*params, limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def _term_frequency(self, terms: list) -> dict:
+        # {término: deliberaciones que lo contienen}, sin los que no aparecen
+        placeholders = ",".join("?" * len(terms))
+        return dict(self._conn.execute(
+            f"SELECT term, docs FROM fts_terms WHERE term IN ({placeholders})", terms
+        ).fetchall())
+
+    def _distinctive_terms(self, frequency: dict) -> list:
+        # MAX(id) aproxima el número de deliberaciones sin recorrer la tabla
+        total = self._conn.execute("SELECT MAX(id) FROM deliberations").fetchone()[0] or 0
+        common = max(total * _COMMON_TERM_RATIO, _RANKED_CANDIDATES)
+        distinctive, postings = [], 0
+        for term in sorted(frequency, key=frequency.get):
+            postings += frequency[term]
+            if frequency[term] > common or (
+                    distinctive and postings > _MAX_QUERY_POSTINGS):
+                break
+            distinctive.append(term)
+        return distinctive
+
+    def get(self, signature_hash: str) -> Optional[dict]:
+        rows = self._query("SELECT * FROM deliberations WHERE signature_hash = ?", [signature_hash])
+        return rows[0] if rows else None
+
+    def annotations(self, node_id: str, limit: Optional[int] = None) -> list:
+        """Anotaciones de todas las deliberaciones sobre un nodo."""
+        sql = ("SELECT d.signature_hash, d.expert, d.root_question, d.signed_at, "
+               "a.node_id, a.text FROM annotations a "
+               "JOIN deliberations d ON d.id = a.deliberation_id "
+               "WHERE a.node_id = ? ORDER BY d.signed_at DESC")
+        params = [node_id]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self._query(sql, params)
+
+    def nodes(self, signature_hash: str) -> list:
+        """Nodos archivados de una deliberación."""
+        return self._query(
+            "SELECT n.node_id, n.question, n.type, n.level, n.validated, n.perspectives_count "
+            "FROM nodes n JOIN deliberations d ON d.id = n.deliberation_id "
+            "WHERE d.signature_hash = ?", [signature_hash]
+        )
+
+    def events(self, signature_hash: str) -> Iterator[dict]:
+        """Registro de razonamiento archivado, en orden."""
+        for row in self._query(
+            "SELECT e.timestamp, e.action, e.node_id, e.data FROM log_events e "
+            "JOIN deliberations d ON d.id = e.deliberation_id "
+            "WHERE d.signature_hash = ? ORDER BY e.seq", [signature_hash]
+        ):
+            yield {"timestamp": row["timestamp"], "action": row["action"], **json.loads(row["data"])}
+
+    def rescore(self, weights: Optional[dict] = None) -> dict:
+        """
+        Recalcula con `calculate_eee_batch` el EEE de las deliberaciones que
+        guardan su evidencia (`evidencia_eee`), p. ej. al cambiar los pesos.
+        Devuelve `{"signature_hash": [...], dimensión: array, ..., "total": array}`
+        en orden de archivo; con los pesos de la sesión, coincide con el EEE
+        firmado. Las deliberaciones archivadas sin evidencia se omiten.
+        """
+        import numpy as np
+        from .epistemic_validator import calculate_eee_batch
+
+        columns = ", ".join(f"eee_{name}" for name in _EEE_EVIDENCE)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT signature_hash, {columns} FROM deliberations "
+                "WHERE eee_total_nodes IS NOT NULL ORDER BY id"
+            ).fetchall()
+        values = np.array([tuple(row)[1:] for row in rows], dtype=np.float64)
+        evidence = dict(zip(_EEE_EVIDENCE, values.reshape(len(rows), len(_EEE_EVIDENCE)).T))
+        scores = calculate_eee_batch(
+            evidence["validated"], evidence["total_nodes"], evidence["perspectives"], weights,
+            max_levels=evidence["max_level"], tree_depths=evidence["tree_depth"],
+            justified=evidence["justified"], ever_validated=evidence["ever_validated"],
+            reverted=evidence["reverted"]
+        )
+        return {"signature_hash": [row[0] for row in rows], **scores}
+
+    def _query(self, sql: str, params: list) -> list:
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params)]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM deliberations").fetchone()[0]
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# FILAS
+# ══════════════════════════════════════════════════════════════════════════════
+
+def _deliberation_row(certificate: dict, log_size: int) -> tuple:
+    expert = certificate.get("experto") or {}
+    metrics = certificate.get("metricas_eee") or {}
+    evidence = certificate.get("evidencia_eee") or {}
+    firma = certificate["firma"]
+    return (
+        firma["hash"],
+        expert.get("nombre", ""),
+        expert.get("especialización"),
+        certificate.get("pregunta_raiz", ""),
+        certificate.get("sintesis"),
+        metrics.get("total"),
+        *(metrics.get(name) for name in _EEE_DIMENSIONS),
+        len(certificate.get("nodos_validados") or []),
+        log_size,
+        firma["timestamp"],
+        firma.get("esquema"),
+        firma.get("raiz_merkle"),
+        *(evidence.get(name) for name in _EEE_EVIDENCE)
+    )
+
+
+def _log_rows(deliberation_id: int, events: Iterable[dict], explored: dict) -> Iterator[tuple]:
+    """
+    Filas de `log_events`, de una en una. Anota en `explored` los nodos
+    explorados: `{node_id: (pregunta de la primera exploración, último
+    número de perspectivas)}`.
+    """
+    for seq, event in enumerate(events):
+        data = {k: v for k, v in event.items() if k not in ("timestamp", "action")}
+        node_id = event.get("node_id")
+        if event.get("action") == "EXPLORAR_NODO" and node_id is not None:
+            question = explored[node_id][0] if node_id in explored else event.get("question")
+            explored[node_id] = (question, event.get("perspectives_count"))
+        yield (deliberation_id, seq, event.get("timestamp"), event.get("action", ""), node_id,
+               json.dumps(data, ensure_ascii=False, separators=(",", ":")))
+
+
+def _collect_children(children: dict, deliberation_id: int, certificate: dict,
+                      explored: dict, tree, perspectives: dict):
+    validated = set(certificate.get("nodos_validados") or [])
+    annotations = certificate.get("anotaciones") or {}
+
+    # Nodos: los del árbol si se conoce; si no, los que cita el certificado
+    nodes = {}
+    if tree is not None:
+        for node in tree:
+            nodes[node.id] = (node.question, node.type, node.level)
+    for node_id, (question, _) in explored.items():
+        nodes.setdefault(node_id, (question, None, None))
+    for node_id in (*validated, *annotations, *perspectives):
+        nodes.setdefault(node_id, (None, None, None))
+
+    for node_id, (question, node_type, level) in nodes.items():
+        count = explored[node_id][1] if node_id in explored else None
+        if node_id in perspectives:
+            count = len(perspectives[node_id])
+        children["nodes"].append((deliberation_id, node_id, question, node_type, level,
+                                  int(node_id in validated), count))
+
+    for node_id, items in perspectives.items():
+        for position, persp in enumerate(items):
+            children["perspectives"].append((
+                deliberation_id, node_id, position, persp.get("source"), persp.get("type"),
+                persp.get("confidence"), persp.get("content")
+            ))
+
+    for node_id, text in annotations.items():
+        children["annotations"].append((deliberation_id, node_id, text))
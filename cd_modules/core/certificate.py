@@ -0,0 +1,211 @@
+"""
+Certificado de Autoría Deliberada
+=================================
+Serialización en streaming del certificado que exporta la fase de firma.
+
+`iter_certificate_json` produce exactamente el mismo texto que
+`json.dumps(certificado, indent=2, ensure_ascii=False)`, pero por fragmentos:
+los valores iterables que no son listas (por ejemplo, un `ReasoningTracker`)
+se recorren elemento a elemento, de modo que el registro de razonamiento
+nunca se materializa completo en memoria. También admite un modo compacto
+sin sangría y salida gzip.
+"""
+
+import json
+import os
+import tempfile
+import zlib
+from typing import BinaryIO, Iterable, Iterator, Optional, Union
+
+
+# Separadores del modo compacto (sin sangría ni espacios)
+COMPACT_SEPARATORS = (",", ":")
+
+_CHUNK_SIZE = 64 * 1024
+
+
+def build_certificate(expert_name: str, expert_role: str, root_question: str,
+                      synthesis: str, eee_metrics: dict, validated_nodes: Iterable[str],
+                      annotations: dict, reasoning_log: Iterable[dict],
+                      signature_hash: str, timestamp: str,
+                      signature_fields: Optional[dict] = None,
+                      eee_evidence: Optional[dict] = None) -> dict:
+    """
+    Construye el certificado con el esquema de exportación de DELIBERA.
+    `signature_fields` añade a `firma` los campos del esquema de firma (Merkle)
+    y `eee_evidence` los recuentos del EEE (`EEEEvidence.to_dict()`), con los
+    que se recalcula con otros pesos.
+    """
+    firma = {
+        "hash": signature_hash,
+        "timestamp": timestamp,
+        "algoritmo": "SHA-256"
+    }
+    firma.update(signature_fields or {})
+    certificate = {
+        "documento": "DELIBERA - Certificación de Autoría Deliberada",
+        "version": "1.0",
+        "experto": {
+            "nombre": expert_name,
+            "especialización": expert_role
+        },
+        "pregunta_raiz": root_question,
+        "sintesis": synthesis,
+        "metricas_eee": eee_metrics,
+        "nodos_validados": list(validated_nodes),
+        "anotaciones": annotations,
+        "registro_razonamiento": reasoning_log,
+        "firma": firma
+    }
+    if eee_evidence is not None:
+        certificate["evidencia_eee"] = eee_evidence
+    return certificate
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# CODIFICACIÓN EN STREAMING
+# ══════════════════════════════════════════════════════════════════════════════
+
+# Contenedores con más elementos que este umbral se codifican por fragmentos
+_LARGE_CONTAINER = 256
+
+_EMPTY = object()
+
+
+def _is_streamable(value) -> bool:
+    return (hasattr(value, "__iter__")
+            and not isinstance(value, (str, bytes, bytearray, dict, list, tuple)))
+
+
+def _needs_streaming(value) -> bool:
+    """Indica si un valor debe codificarse por fragmentos y no de una vez."""
+    if _is_streamable(value):
+        return True
+    if isinstance(value, dict):
+        children = value.values()
+    elif isinstance(value, (list, tuple)):
+        children = value
+    else:
+        return False
+    return len(value) > _LARGE_CONTAINER or any(
+        _needs_streaming(child) for child in children
+        if not isinstance(child, (str, int, float, bool, type(None))))
+
+
+def iter_certificate_json(data: dict, indent: Optional[Union[int, str]] = 2,
+                          separators: Optional[tuple] = None,
+                          ensure_ascii: bool = False) -> Iterator[str]:
+    """
+    Recorre la representación JSON del certificado por fragmentos.
+    Con los mismos parámetros, la concatenación coincide con `json.dumps`.
+    """
+    if isinstance(indent, int):
+        indent = " " * indent
+    if separators is None:
+        separators = (",", ": ") if indent is not None else (", ", ": ")
+    item_separator, key_separator = separators
+
+    def dumps(value, level: int) -> str:
+        # Los valores pequeños los codifica el codificador en C de json;
+        # solo hay que desplazar su sangría al nivel actual
+        text = json.dumps(value, indent=indent, separators=separators,
+                          ensure_ascii=ensure_ascii)
+        if indent is not None and level and "\n" in text:
+            text = text.replace("\n", "\n" + indent * level)
+        return text
+
+    def encode(value, level: int) -> Iterator[str]:
+        if not _needs_streaming(value):
+            yield dumps(value, level)
+        elif isinstance(value, dict):
+            yield from encode_items(iter(value.items()), level, True)
+        else:
+            yield from encode_items(iter(value), level, False)
+
+    def encode_items(iterator: Iterator, level: int, is_object: bool) -> Iterator[str]:
+        opening, closing = ("{", "}") if is_object else ("[", "]")
+        item = next(iterator, _EMPTY)
+        if item is _EMPTY:
+            yield opening + closing
+            return
+
+        if indent is not None:
+            inner = "\n" + indent * (level + 1)
+            separator = item_separator + inner
+            yield opening + inner
+        else:
+            separator = item_separator
+            yield opening
+
+        while True:
+            if is_object:
+                key, item = item
+                if not isinstance(key, str):
+                    key = json.dumps(key)
+                yield json.dumps(key, ensure_ascii=ensure_ascii) + key_separator
+            yield from encode(item, level + 1)
+
+            item = next(iterator, _EMPTY)
+            if item is _EMPTY:
+                break
+            yield separator
+
+        yield ("\n" + indent * level + closing) if indent is not None else closing
+
+    yield from encode(data, 0)
+
+
+def iter_certificate_bytes(data: dict, compact: bool = False, gzip: bool = False,
+                           chunk_size: int = _CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Fragmentos UTF-8 del certificado, de unos `chunk_size` bytes.
+    `compact` elimina sangría y espacios; `gzip` comprime la salida.
+    """
+    if compact:
+        pieces = iter_certificate_json(data, indent=None, separators=COMPACT_SEPARATORS)
+    else:
+        pieces = iter_certificate_json(data)
+    compressor = zlib.compressobj(wbits=31) if gzip else None
+
+    buffer = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            chunk = "".join(buffer).encode("utf-8")
+            buffer, size = [], 0
+            if compressor is not None:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                yield chunk
+
+    chunk = "".join(buffer).encode("utf-8")
+    if compressor is not None:
+        chunk = compressor.compress(chunk) + compressor.flush()
+    if chunk:
+        yield chunk
+
+
+def write_certificate(data: dict, target: Union[str, os.PathLike, BinaryIO],
+                      compact: bool = False, gzip: bool = False) -> int:
+    """Escribe el certificado en una ruta o archivo binario. Devuelve los bytes escritos."""
+    if isinstance(target, (str, os.PathLike)):
+        with open(target, "wb") as f:
+            return write_certificate(data, f, compact=compact, gzip=gzip)
+    written = 0
+    for chunk in iter_certificate_bytes(data, compact=compact, gzip=gzip):
+        target.write(chunk)
+        written += len(chunk)
+    return written
+
+
+def certificate_tempfile(data: dict, compact: bool = False, gzip: bool = False) -> BinaryIO:
+    """
+    Escribe el certificado en un archivo temporal y lo devuelve rebobinado.
+    Hasta 1 MB se mantiene en memoria; por encima se vuelca a disco.
+    """
+    f = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    write_certificate(data, f, compact=compact, gzip=gzip)
+    f.seek(0)
+    return f
@@ -0,0 +1,102 @@
+"""
+Contextual Generator — Generador Contextual
+===========================================
+Genera respuestas múltiples y argumentadas para cada subpregunta del
+complejo de indagación, reflejando diversidad teórica y normativa.
+
+Las perspectivas se recuperan del índice de fuentes (`retrieval`) cuando se
+ha ingerido un corpus; si no, se usan las perspectivas de demostración.
+"""
+
+from .retrieval import retrieve_perspectives, retrieve_perspectives_batch
+
+
+def generate_perspectives(node_id: str, question: str) -> list:
+    """
+    Genera múltiples perspectivas para una pregunta.
+    Implementa la apertura semántica y la integración del disenso.
+    """
+    return retrieve_perspectives(question) or demo_perspectives(node_id)
+
+
+def generate_perspectives_batch(nodes: list) -> list:
+    """
+    Genera las perspectivas de varios nodos `(node_id, question)` en una
+    sola pasada por el índice de fuentes.
+    """
+    retrieved = retrieve_perspectives_batch([question for _, question in nodes])
+    return [perspectives or demo_perspectives(node_id)
+            for (node_id, _), perspectives in zip(nodes, retrieved)]
+
+
+def demo_perspectives(node_id: str) -> list:
+    """Perspectivas de demostración, usadas cuando no hay corpus ingerido."""
+    perspectives_map = {
+        "q1": [
+            {
+                "source": "Marco Normativo Nacional",
+                "content": "El Real Decreto Legislativo 1/1996 establece el régimen general de propiedad intelectual en España. El artículo 10.1 enumera las obras protegibles, exigiendo originalidad como requisito esencial.",
+                "confidence": 0.95,
+                "type": "legal"
+            },
+            {
+                "source": "Directiva UE 2019/790",
+                "content": "La Directiva sobre derechos de autor en el mercado único digital introduce nuevas excepciones y limitaciones, particularmente relevantes para la minería de textos y datos.",
+                "confidence": 0.92,
+                "type": "eu_law"
+            }
+        ],
+        "q2": [
+            {
+                "source": "STJUE C-5/08 Infopaq",
+                "content": "El TJUE estableció que la originalidad requiere que la obra refleje la 'creación intelectual propia del autor'. Este estándar armonizado ha influido en toda la jurisprudencia posterior.",
+                "confidence": 0.98,
+                "type": "case_law"
+            },
+            {
+                "source": "STS 214/2011",
+                "content": "El Tribunal Supremo español ha adoptado progresivamente el criterio europeo de originalidad, abandonando la anterior exigencia de 'altura creativa'.",
+                "confidence": 0.90,
+                "type": "case_law"
+            }
+        ],
+        "q3": [
+            {
+                "source": "Posición Restrictiva (Bercovitz)",
+                "content": "Desde esta perspectiva, el requisito de originalidad debe interpretarse de forma estricta, exigiendo un mínimo de creatividad que excluya las producciones puramente mecánicas o automatizadas.",
+                "confidence": 0.85,
+                "type": "doctrine"
+            },
+            {
+                "source": "Posición Extensiva (Saiz García)",
+                "content": "Esta corriente aboga por un concepto más flexible de originalidad que reconozca valor en las decisiones creativas incluso cuando el resultado pueda parecer simple o funcional.",
+                "confidence": 0.85,
+                "type": "doctrine"
+            },
+            {
+                "source": "Perspectiva Crítica (Tamames)",
+                "content": "La cuestión de la originalidad en obras generadas con IA plantea una ruptura epistémica: el concepto mismo de 'creación intelectual propia' presupone una agencia humana que estos sistemas problematizan.",
+                "confidence": 0.80,
+                "type": "critical"
+            }
+        ],
+        "q4": [
+            {
+                "source": "Análisis de Impacto",
+                "content": "Una interpretación restrictiva protegería la integridad del sistema de derechos de autor pero podría dejar sin protección producciones con valor económico. Una interpretación extensiva ampliaría la protección pero diluiría el concepto de autoría.",
+                "confidence": 0.88,
+                "type": "analysis"
+            }
+        ]
+    }
+    
+    # Extraer el ID base (q1, q2, etc.) para la demo
+    base_id = node_id.split('.')[0] if '.' in node_id else node_id
+    return perspectives_map.get(base_id, [
+        {
+            "source": "Análisis General",
+            "content": "Esta cuestión requiere un análisis detallado del contexto específico y las fuentes aplicables.",
+            "confidence": 0.75,
+            "type": "general"
+        }
+    ])
@@ -0,0 +1,254 @@
+"""
+Almacén de embeddings en memoria mapeada
+========================================
+Almacén vectorial plano para recuperar perspectivas en una sola máquina sin
+base de datos vectorial externa.
+
+Archivos bajo `CHROMA_PERSIST_DIR/memmap`:
+- `embeddings.bin`: matriz `n × d` (float16 o float32) de embeddings
+  normalizados, abierta con `np.memmap` en solo lectura. La carga no copia
+  datos: varios procesos de Streamlit comparten las mismas páginas de la
+  caché del sistema operativo.
+- `offsets.bin`: desplazamiento (uint64) de cada documento en la tabla de
+  metadatos.
+- `documents.jsonl`: tabla de metadatos (`[id, texto, metadatos]`).
+- `deleted.bin`: filas borradas (uint64). Las filas no se reescriben: la
+  búsqueda las descarta.
+- `header.json`: dimensión, tipo y número de filas confirmadas y de filas
+  borradas. Se escribe al final de cada lote, de modo que los lectores nunca
+  ven filas ni borrados a medias.
+
+La búsqueda es vectorizada y por lotes: las consultas de todos los nodos de
+un árbol se resuelven con un producto matriz-matriz por bloques de filas y
+`argpartition` para el top-k.
+"""
+
+import json
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from ..config import Settings
+from .providers import registry
+from .retrieval import DEFAULT_TOP_K, SourceHit
+
+
+# Tamaño máximo de un bloque de puntuaciones en float32 (bytes)
+_BLOCK_BYTES = 32 * 1024 * 1024
+
+
+class MemmapEmbeddingStore:
+    """
+    Matriz de embeddings en `np.memmap` con tabla de metadatos adjunta.
+    Expone `add_texts`, `delete`, `similarity_search_with_relevance_scores`
+    y la variante por lotes `similarity_search_batch`.
+    """
+
+    def __init__(self, directory: Path, embeddings, dtype: str = "float16"):
+        self.directory = Path(directory)
+        self.embeddings = embeddings
+        self._header_path = self.directory / "header.json"
+        self._matrix_path = self.directory / "embeddings.bin"
+        self._offsets_path = self.directory / "offsets.bin"
+        self._documents_path = self.directory / "documents.jsonl"
+        self._deleted_path = self.directory / "deleted.bin"
+        self._lock = threading.Lock()
+
+        header = self._read_header()
+        self.dtype = np.dtype(header["dtype"] if header else dtype)
+        self.dimensions = header["dim"] if header else None
+        self.count = header["count"] if header else 0
+        self.deleted = header.get("deleted", 0) if header else 0
+        self._matrix = None
+        self._offsets = None
+        self._live = None
+        self._ids = None
+
+    def __len__(self) -> int:
+        return self.count - self.deleted
+
+    # ── Ingesta ───────────────────────────────────────────────────────────────
+
+    def add_texts(self, texts: list, metadatas: Optional[list] = None,
+                  ids: Optional[list] = None) -> list:
+        """Embebe los textos en un solo lote y los añade; los ids ya presentes se ignoran."""
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [uuid.uuid4().hex for _ in texts]
+        with self._lock:
+            known = self._known_ids()
+            rows = [i for i, doc_id in enumerate(ids) if doc_id not in known]
+            if not rows:
+                return ids
+
+            vectors = _normalize(np.asarray(
+                self.embeddings.embed_documents([texts[i] for i in rows]), dtype=np.float32
+            ))
+            if self.dimensions is None:
+                self.dimensions = vectors.shape[1]
+            elif vectors.shape[1] != self.dimensions:
+                raise ValueError(
+                    f"Dimensión de embeddings {vectors.shape[1]} distinta de la del almacén "
+                    f"({self.dimensions})"
+                )
+
+            self.directory.mkdir(parents=True, exist_ok=True)
+            # Se descartan restos de un lote interrumpido antes de añadir
+            self._truncate(self._matrix_path, self.count * self.dimensions * self.dtype.itemsize)
+            self._truncate(self._offsets_path, self.count * 8)
+
+            offsets = np.empty(len(rows), dtype=np.uint64)
+            with open(self._documents_path, "ab") as f:
+                position = f.tell()
+                for n, i in enumerate(rows):
+                    line = json.dumps([ids[i], texts[i], metadatas[i]], ensure_ascii=False).encode()
+                    offsets[n] = position
+                    f.write(line + b"\n")
+                    position += len(line) + 1
+                    known[ids[i]] = self.count + n
+            with open(self._matrix_path, "ab") as f:
+                f.write(vectors.astype(self.dtype).tobytes())
+            with open(self._offsets_path, "ab") as f:
+                f.write(offsets.tobytes())
+
+            self.count += len(rows)
+            self._write_header()
+            self._matrix = self._offsets = self._live = None
+        return ids
+
+    def delete(self, ids: list) -> int:
+        """Borra documentos por id; los desconocidos se ignoran. Devuelve cuántos borra."""
+        with self._lock:
+            known = self._known_ids()
+            rows = np.array([known.pop(doc_id) for doc_id in dict.fromkeys(ids)
+                             if doc_id in known], dtype=np.uint64)
+            if not len(rows):
+                return 0
+            self._truncate(self._deleted_path, self.deleted * 8)
+            with open(self._deleted_path, "ab") as f:
+                f.write(rows.tobytes())
+            self.deleted += len(rows)
+            self._write_header()
+            self._live = None
+        return len(rows)
+
+    def _known_ids(self) -> dict:
+        # Carga los ids confirmados y no borrados (id → fila) y descarta los
+        # metadatos de un lote que no llegó a confirmarse en la cabecera
+        if self._ids is None:
+            self._ids = {}
+            if self._documents_path.exists():
+                with open(self._documents_path, "r+b") as f:
+                    for row in range(self.count):
+                        line = f.readline()
+                        if not line:
+                            break
+                        self._ids[json.loads(line)[0]] = row
+                    f.truncate(f.tell())
+            deleted = set(self._deleted_rows().tolist())
+            self._ids = {doc_id: row for doc_id, row in self._ids.items() if row not in deleted}
+        return self._ids
+
+    def _deleted_rows(self) -> np.ndarray:
+        if not self.deleted:
+            return np.empty(0, dtype=np.uint64)
+        return np.fromfile(self._deleted_path, dtype=np.uint64, count=self.deleted)
+
+    @staticmethod
+    def _truncate(path: Path, size: int):
+        if path.exists() and path.stat().st_size > size:
+            with open(path, "r+b") as f:
+                f.truncate(size)
+
+    def _read_header(self) -> Optional[dict]:
+        try:
+            with open(self._header_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_header(self):
+        tmp_path = self._header_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"dim": self.dimensions, "dtype": self.dtype.name, "count": self.count,
+                       "deleted": self.deleted}, f)
+        os.replace(tmp_path, self._header_path)
+
+    # ── Consulta ──────────────────────────────────────────────────────────────
+
+    def _open(self):
+        if self._matrix is None and self.count:
+            self._matrix = np.memmap(self._matrix_path, dtype=self.dtype, mode="r",
+                                     shape=(self.count, self.dimensions))
+            self._offsets = np.memmap(self._offsets_path, dtype=np.uint64, mode="r",
+                                      shape=(self.count,))
+        if self._live is None and self.deleted:
+            self._live = np.ones(self.count, dtype=bool)
+            self._live[self._deleted_rows().astype(np.int64)] = False
+        return self._matrix
+
+    def similarity_search_batch(self, queries: list, k: int = DEFAULT_TOP_K) -> list:
+        """
+        Top-k de varias consultas a la vez. Devuelve, por consulta, una lista
+        de `(SourceHit, relevancia)` con la similitud coseno en [0, 1].
+        """
+        matrix = self._open()
+        if matrix is None or not queries or not len(self):
+            return [[] for _ in queries]
+
+        q = _normalize(np.asarray(self.embeddings.embed_documents(list(queries)), dtype=np.float32))
+        n_queries, k = len(q), min(k, len(self))
+        best_rows = np.empty((n_queries, 0), dtype=np.int64)
+        best_scores = np.empty((n_queries, 0), dtype=np.float32)
+
+        block_rows = max(k, _BLOCK_BYTES // (4 * max(self.dimensions, n_queries)))
+        for start in range(0, self.count, block_rows):
+            block = matrix[start:start + block_rows]
+            scores = q @ block.T.astype(np.float32, copy=False)
+            if self._live is not None:
+                scores[:, ~self._live[start:start + len(block)]] = -np.inf
+            kk = min(k, scores.shape[1])
+            top = np.argpartition(-scores, kk - 1, axis=1)[:, :kk]
+            best_rows = np.concatenate([best_rows, top + start], axis=1)
+            best_scores = np.concatenate(
+                [best_scores, np.take_along_axis(scores, top, axis=1)], axis=1
+            )
+            if best_rows.shape[1] > k:
+                keep = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+                best_rows = np.take_along_axis(best_rows, keep, axis=1)
+                best_scores = np.take_along_axis(best_scores, keep, axis=1)
+
+        order = np.argsort(-best_scores, axis=1)
+        best_rows = np.take_along_axis(best_rows, order, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+
+        results = []
+        with open(self._documents_path, "rb") as f:
+            for rows, scores in zip(best_rows, best_scores):
+                hits = []
+                for row, score in zip(rows.tolist(), scores.tolist()):
+                    f.seek(int(self._offsets[row]))
+                    _, text, metadata = json.loads(f.readline())
+                    hits.append((SourceHit(text, metadata), max(0.0, float(score))))
+                results.append(hits)
+        return results
+
+    def similarity_search_with_relevance_scores(self, query: str, k: int = DEFAULT_TOP_K) -> list:
+        return self.similarity_search_batch([query], k)[0]
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    if vectors.ndim != 2:
+        vectors = vectors.reshape(len(vectors), -1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _memmap_vectorstore(settings: Settings) -> MemmapEmbeddingStore:
+    return MemmapEmbeddingStore(
+        settings.chroma_persist_dir / "memmap",
+        registry.get("embeddings", settings=settings)
+    )
@@ -0,0 +1,528 @@
+"""
+Epistemic Validator — Índice de Equilibrio Erotético (EEE)
+===========================================================
+Evalúa la calidad estructural del proceso deliberativo en cinco dimensiones:
+
+- D1: Profundidad estructural
+- D2: Pluralidad semántica
+- D3: Trazabilidad
+- D4: Reversibilidad
+- D5: Robustez epistémica
+
+`calculate_eee_simple` calcula el índice a partir de un recuento completo de
+la sesión y `calculate_eee_batch` el de muchas sesiones a la vez, con arrays
+de NumPy (p. ej. para recalcular un archivo entero al cambiar los pesos).
+El total es la media ponderada `Σwᵢ·Dᵢ / Σw`; por defecto todas las
+dimensiones pesan lo mismo.
+
+`EroteticEvaluator` (también `EEEAccumulator`) deriva cada dimensión de la
+evidencia del registro de razonamiento (niveles explorados, anotaciones,
+revisiones) y se actualiza de forma incremental con cada evento, de modo que
+cada rerun de la interfaz solo aplica las entradas nuevas del registro. Sus
+recuentos (`EEEEvidence`) viajan en el certificado y en el archivo; con
+ellos, `calculate_eee_simple` y `calculate_eee_batch` reproducen el EEE de
+la sesión. Sin evidencia aplican la fórmula original, solo con recuentos.
+"""
+
+import itertools
+from dataclasses import asdict, dataclass
+from enum import Enum
+from typing import Iterable, Optional
+
+from ..config import Settings, get_settings
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# DIMENSIONES Y RESULTADO
+# ══════════════════════════════════════════════════════════════════════════════
+
+class EEEDimension(str, Enum):
+    """Dimensiones del EEE, con la clave usada en `st.session_state.eee_metrics`."""
+    PROFUNDIDAD = "profundidad"
+    PLURALIDAD = "pluralidad"
+    TRAZABILIDAD = "trazabilidad"
+    REVERSIBILIDAD = "reversibilidad"
+    ROBUSTEZ = "robustez"
+
+
+# Pesos por defecto de la media ponderada (todas las dimensiones por igual)
+DEFAULT_WEIGHTS = {dimension.value: 1.0 for dimension in EEEDimension}
+
+
+def normalize_weights(weights: Optional[dict] = None) -> tuple:
+    """
+    Pesos en el orden de `EEEDimension`, divididos por su suma. Acepta las
+    claves de las dimensiones o sus miembros; las omitidas pesan 1.
+    """
+    merged = dict(DEFAULT_WEIGHTS)
+    for key, weight in (weights or {}).items():
+        try:
+            name = EEEDimension(key).value
+        except ValueError:
+            raise ValueError(f"Dimensión del EEE desconocida: {key!r}") from None
+        if weight < 0:
+            raise ValueError(f"El peso de {name} no puede ser negativo: {weight}")
+        merged[name] = float(weight)
+    total = sum(merged.values())
+    if total <= 0:
+        raise ValueError("La suma de los pesos del EEE debe ser positiva")
+    return tuple(merged[dimension.value] / total for dimension in EEEDimension)
+
+
+@dataclass(frozen=True)
+class EEEResult:
+    """Resultado del EEE: las cinco dimensiones y el índice total."""
+    profundidad: float
+    pluralidad: float
+    trazabilidad: float
+    reversibilidad: float
+    robustez: float
+    total: float
+
+    def to_dict(self) -> dict:
+        """Devuelve el formato de diccionario que consume la interfaz."""
+        return {
+            "profundidad": self.profundidad,
+            "pluralidad": self.pluralidad,
+            "trazabilidad": self.trazabilidad,
+            "reversibilidad": self.reversibilidad,
+            "robustez": self.robustez,
+            "total": self.total
+        }
+
+
+# Reversibilidad de una sesión sin revisiones. Cualquier validación puede
+# deshacerse con «Revisar», así que no ejercer la revisión no penaliza: la
+# sesión conserva la reversibilidad del sistema (la constante de la fórmula
+# original) y cada validación revertida la acerca a 1
+REVERSIBILITY_BASELINE = 0.95
+
+
+@dataclass(frozen=True)
+class EEEEvidence:
+    """
+    Recuentos de una sesión de los que se derivan las dimensiones del EEE.
+    Es lo que guarda el certificado (`evidencia_eee`) y el archivo, de modo
+    que el EEE de una sesión se puede recalcular con otros pesos.
+    """
+    total_nodes: int
+    validated: int
+    perspectives: int
+    tree_depth: int = 0
+    max_level: int = 0
+    justified: int = 0
+    ever_validated: int = 0
+    reverted: int = 0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def dimensions(self) -> tuple:
+        """Dimensiones D1–D5 sin redondear."""
+        return _eee_dimensions(
+            self.validated, self.total_nodes, self.perspectives,
+            max_level=self.max_level, tree_depth=self.tree_depth, justified=self.justified,
+            ever_validated=self.ever_validated, reverted=self.reverted
+        )
+
+    def result(self, weights: Optional[dict] = None) -> EEEResult:
+        """EEE de la sesión con los pesos dados (por defecto, la media)."""
+        return _eee_result(self.dimensions(), normalize_weights(weights) if weights else None)
+
+
+def _eee_dimensions(validated_count: int, total_nodes: int, perspectives_count: int,
+                    max_level: Optional[int] = None, tree_depth: Optional[int] = None,
+                    justified: Optional[int] = None, ever_validated: int = 0,
+                    reverted: int = 0) -> tuple:
+    """
+    Fórmulas del EEE, comunes al evaluador y a los cálculos por recuentos.
+    Sin la evidencia del registro (`tree_depth`, `justified`) se aproximan
+    como en la fórmula original: D1 y D3 por la fracción de nodos validados.
+    """
+    total = max(total_nodes, 1)
+
+    # D1: Profundidad estructural (nivel más profundo explorado)
+    if tree_depth is None:
+        depth = min(1.0, validated_count / total)
+    else:
+        depth = min(1.0, max_level / tree_depth) if tree_depth else 0.0
+
+    # D2: Pluralidad semántica (perspectivas consideradas)
+    plurality = min(1.0, perspectives_count / (total * 2))
+
+    # D3: Trazabilidad (nodos validados con justificación)
+    traceability = min(1.0, (validated_count if justified is None else justified) / total)
+
+    # D4: Reversibilidad (validaciones revertidas sobre las realizadas)
+    reversibility = REVERSIBILITY_BASELINE
+    if reverted and ever_validated:
+        reversibility += (1 - REVERSIBILITY_BASELINE) * min(1.0, reverted / ever_validated)
+
+    # D5: Robustez (coherencia ante disenso)
+    robustness = min(1.0, (validated_count + perspectives_count * 0.5) / (total * 1.5))
+
+    return depth, plurality, traceability, reversibility, robustness
+
+
+def _eee_result(dimensions: tuple, weights: Optional[tuple] = None) -> EEEResult:
+    """
+    Redondea las dimensiones y calcula el total. `weights` son los pesos ya
+    normalizados (`normalize_weights`); sin ellos, la media simple.
+    """
+    if weights is None:
+        score = sum(dimensions) / 5
+    else:
+        score = sum(w * d for w, d in zip(weights, dimensions))
+    depth, plurality, traceability, reversibility, robustness = dimensions
+    return EEEResult(
+        profundidad=round(depth, 2),
+        pluralidad=round(plurality, 2),
+        trazabilidad=round(traceability, 2),
+        reversibilidad=round(reversibility, 2),
+        robustez=round(robustness, 2),
+        total=round(score, 2)
+    )
+
+
+def calculate_eee_simple(validated: set, total_nodes: int, perspectives_count: int,
+                         weights: Optional[dict] = None, *, max_level: Optional[int] = None,
+                         tree_depth: Optional[int] = None, justified: Optional[int] = None,
+                         ever_validated: int = 0, reverted: int = 0) -> dict:
+    """
+    Calcula el Índice de Equilibrio Erotético (EEE).
+    Evalúa la calidad estructural del proceso deliberativo.
+
+    Con la evidencia del registro (ver `EEEEvidence`) da el mismo resultado
+    que `EroteticEvaluator`; solo con recuentos, el de la fórmula original.
+    """
+    normalized = normalize_weights(weights) if weights else None
+    return _eee_result(_eee_dimensions(
+        len(validated), total_nodes, perspectives_count, max_level=max_level,
+        tree_depth=tree_depth, justified=justified, ever_validated=ever_validated,
+        reverted=reverted
+    ), normalized).to_dict()
+
+
+def calculate_eee_batch(validated_counts, total_nodes, perspectives_counts,
+                        weights: Optional[dict] = None, *, max_levels=None, tree_depths=None,
+                        justified=None, ever_validated=None, reverted=None) -> dict:
+    """
+    EEE de muchas sesiones a la vez. Recibe arrays (o escalares, que se
+    difunden) de nodos validados, nodos totales y perspectivas por sesión, y
+    devuelve `{dimensión: array, ..., "total": array}` con las mismas
+    fórmulas y redondeo que `calculate_eee_simple`. La evidencia opcional
+    (`max_levels` con `tree_depths`, `justified`, `ever_validated` con
+    `reverted`) son los campos de `EEEEvidence` de cada sesión.
+    """
+    import numpy as np
+
+    if (max_levels is None) != (tree_depths is None):
+        raise ValueError("max_levels y tree_depths se indican juntos")
+    if (ever_validated is None) != (reverted is None):
+        raise ValueError("ever_validated y reverted se indican juntos")
+
+    def column(values):
+        return None if values is None else np.asarray(values, dtype=np.float64)
+
+    validated, total, perspectives, *evidence = np.broadcast_arrays(*(
+        array for array in (
+            column(validated_counts),
+            np.maximum(column(total_nodes), 1.0),
+            column(perspectives_counts),
+            column(max_levels), column(tree_depths), column(justified),
+            column(ever_validated), column(reverted)
+        ) if array is not None
+    ))
+    evidence = iter(evidence)
+    max_level = next(evidence) if max_levels is not None else None
+    depth_of_tree = next(evidence) if tree_depths is not None else None
+    justified_count = next(evidence) if justified is not None else validated
+    ever_count = next(evidence) if ever_validated is not None else None
+    reverted_count = next(evidence) if reverted is not None else None
+
+    # Mismas operaciones que `_eee_dimensions`, elemento a elemento
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if depth_of_tree is None:
+            depth = np.minimum(validated / total, 1.0)
+        else:
+            depth = np.where(depth_of_tree > 0,
+                             np.minimum(max_level / depth_of_tree, 1.0), 0.0)
+        reversibility = np.full(total.shape, REVERSIBILITY_BASELINE)
+        if reverted_count is not None:
+            revised = (reverted_count > 0) & (ever_count > 0)
+            reversibility[revised] += (1 - REVERSIBILITY_BASELINE) * np.minimum(
+                reverted_count[revised] / ever_count[revised], 1.0)
+    plurality = np.minimum(perspectives / (total * 2), 1.0)
+    traceability = np.minimum(justified_count / total, 1.0)
+    robustness = np.minimum((validated + perspectives * 0.5) / (total * 1.5), 1.0)
+
+    # Mismo orden de operaciones que `_eee_result`, para redondear igual
+    if weights:
+        w_depth, w_plurality, w_traceability, w_reversibility, w_robustness = \
+            normalize_weights(weights)
+        score = depth * w_depth
+        score += plurality * w_plurality
+        score += traceability * w_traceability
+        score += reversibility * w_reversibility
+        score += robustness * w_robustness
+    else:
+        score = depth + plurality
+        score += traceability
+        score += reversibility
+        score += robustness
+        score /= 5
+
+    return {
+        "profundidad": _round2(depth),
+        "pluralidad": _round2(plurality),
+        "trazabilidad": _round2(traceability),
+        "reversibilidad": _round2(reversibility),
+        "robustez": _round2(robustness),
+        "total": _round2(score)
+    }
+
+
+def _round2(values):
+    """
+    Redondeo a dos decimales idéntico a `round(x, 2)`. NumPy redondea x·100
+    ya redondeado, así que cuando el producto cae justo en k + 0,5 se decide
+    con el signo de su error de redondeo, exacto por el producto de Dekker.
+    """
+    import numpy as np
+    flat = np.ravel(values)
+    scaled = flat * 100
+    rounded = np.rint(scaled)
+    ties = np.flatnonzero(scaled - np.floor(scaled) == 0.5)
+    if ties.size:
+        x, product = flat[ties], scaled[ties]
+        high = x * 134217729.0  # 2**27 + 1: mitad alta de x (división de Veltkamp)
+        high -= high - x
+        error = (high * 100 - product) + (x - high) * 100
+        rounded[ties] = np.where(error > 0, np.ceil(product),
+                                 np.where(error < 0, np.floor(product), rounded[ties]))
+    return (rounded / 100).reshape(np.shape(values))
+
+
+def count_tree_nodes(tree) -> int:
+    """
+    Cuenta los nodos de un árbol de indagación (sin contar la raíz).
+    Acepta tanto `InquiryTree` como el formato anidado de diccionarios.
+    """
+    if not isinstance(tree, dict):
+        return len(tree)
+    count = 0
+    stack = list(tree.get("branches", []))
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.get("sub_branches", []))
+    return count
+
+
+def tree_depth(tree) -> int:
+    """Nivel máximo de un árbol de indagación (`InquiryTree` o diccionarios)."""
+    if not isinstance(tree, dict):
+        return tree.depth()
+    depth = 0
+    stack = list(tree.get("branches", []))
+    while stack:
+        node = stack.pop()
+        depth = max(depth, node.get("level", 0))
+        stack.extend(node.get("sub_branches", []))
+    return depth
+
+
+def parse_weights(text: str) -> dict:
+    """Pesos declarados como `"profundidad=2, pluralidad=1"` (`DELIBERA_EEE_WEIGHTS`)."""
+    weights = {}
+    for item in text.split(","):
+        if not item.strip():
+            continue
+        name, sep, value = item.partition("=")
+        if not sep:
+            raise ValueError(f"Peso del EEE sin valor: {item.strip()!r}")
+        weights[name.strip()] = float(value)
+    normalize_weights(weights)
+    return weights
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# EVALUADOR INCREMENTAL
+# ══════════════════════════════════════════════════════════════════════════════
+
+def _event_level(event: dict) -> int:
+    level = event.get("level")
+    if level is None:
+        # Los ids del árbol siguen la jerarquía: "q2.1" es de nivel 2
+        level = str(event["node_id"]).count(".") + 1
+    return level
+
+
+class EroteticEvaluator:
+    """
+    Evaluador incremental del EEE a partir de la evidencia del registro.
+
+    Cada dimensión se deriva de los eventos de la deliberación, recorridos
+    una sola vez:
+
+    - D1: nivel más profundo explorado / profundidad del árbol.
+    - D2: perspectivas generadas / (2 · nodos), como máximo 1.
+    - D3: nodos validados con una anotación que los justifica / nodos.
+    - D4: `REVERSIBILITY_BASELINE` más el resto hasta 1 en proporción a
+      los nodos cuya validación se revirtió (REVISAR_NODO) sobre los
+      validados alguna vez; una sesión sin revisiones no se penaliza.
+    - D5: (validados + perspectivas / 2) / (1,5 · nodos), como máximo 1.
+
+    Las fórmulas son las de `calculate_eee_simple` con la evidencia de
+    `evidence()`, que el certificado y el archivo guardan para recalcular
+    el EEE con otros pesos. El total es la media ponderada con los pesos
+    declarados (sin pesos, la media simple). Cada evento
+    cuesta O(1); `sync` aplica solo las entradas del registro posteriores a
+    las ya aplicadas, y el resultado se memoriza hasta el siguiente evento.
+    """
+
+    __slots__ = ("total_nodes", "tree_depth", "weights", "events", "perspectives_count",
+                 "max_level", "_node_perspectives", "_validated", "_justified",
+                 "_ever_validated", "_reverted", "_result")
+
+    def __init__(self, total_nodes: int = 0, weights: Optional[dict] = None,
+                 tree_depth: int = 0):
+        self.total_nodes = total_nodes
+        self.tree_depth = tree_depth
+        # Pesos normalizados, o None para la media simple
+        self.weights = normalize_weights(weights) if weights else None
+        # Entradas del registro aplicadas (posición para `sync`)
+        self.events = 0
+        self.perspectives_count = 0
+        self.max_level = 0
+        self._node_perspectives = {}
+        self._validated = set()
+        self._justified = set()
+        self._ever_validated = set()
+        self._reverted = set()
+        self._result: Optional[EEEResult] = None
+
+    @classmethod
+    def from_settings(cls, settings: Optional[Settings] = None, **kwargs) -> "EroteticEvaluator":
+        """Evaluador con los pesos de `DELIBERA_EEE_WEIGHTS`."""
+        settings = settings or get_settings()
+        kwargs.setdefault("weights", parse_weights(settings.eee_weights))
+        return cls(**kwargs)
+
+    def __setstate__(self, state):
+        # Un evaluador guardado por una versión anterior (sin posición en el
+        # registro) empieza de cero y se rehace en el siguiente `sync`
+        _, slots = state
+        self.__init__(slots.get("total_nodes", 0))
+        if "events" in slots:
+            for name, value in slots.items():
+                setattr(self, name, value)
+            # El resultado memorizado puede venir de otras fórmulas
+            self._result = None
+
+    @property
+    def validated_count(self) -> int:
+        return len(self._validated)
+
+    # ── Eventos ───────────────────────────────────────────────────────────────
+
+    def load_tree(self, tree):
+        """Registra un nuevo árbol de indagación (una sola pasada al generarlo)."""
+        self.total_nodes = count_tree_nodes(tree)
+        self.tree_depth = tree_depth(tree)
+        self._result = None
+
+    def explore(self, node_id: str, perspectives_count: int, level: int = 0):
+        """Registra las perspectivas generadas para un nodo (sustituye las previas)."""
+        previous = self._node_perspectives.get(node_id, 0)
+        self._node_perspectives[node_id] = perspectives_count
+        self.perspectives_count += perspectives_count - previous
+        self.max_level = max(self.max_level, level)
+        self._result = None
+
+    def validate(self, node_id: str, annotation: str = ""):
+        """Registra la validación de un nodo; la anotación la justifica."""
+        self._validated.add(node_id)
+        self._ever_validated.add(node_id)
+        if annotation and annotation.strip():
+            self._justified.add(node_id)
+        else:
+            self._justified.discard(node_id)
+        self._result = None
+
+    def revise(self, node_id: str):
+        """Registra la revisión de un nodo, que deja de estar validado."""
+        if node_id in self._validated:
+            self._validated.discard(node_id)
+            self._justified.discard(node_id)
+            self._reverted.add(node_id)
+            self._result = None
+
+    def apply(self, event: dict):
+        """
+        Aplica una entrada del registro de razonamiento.
+        Las acciones que no afectan al EEE solo avanzan la posición.
+        """
+        self.events += 1
+        action = event.get("action")
+        if action == "EXPLORAR_NODO":
+            self.explore(event["node_id"], event.get("perspectives_count", 0),
+                         _event_level(event))
+        elif action == "VALIDAR_NODO":
+            self.validate(event["node_id"], event.get("annotation") or "")
+        elif action == "REVISAR_NODO":
+            self.revise(event["node_id"])
+
+    def apply_all(self, events: Iterable[dict]):
+        """Aplica una secuencia de entradas del registro de razonamiento."""
+        for event in events:
+            self.apply(event)
+
+    def sync(self, log):
+        """
+        Aplica las entradas de `log` (el registro completo) posteriores a las
+        ya aplicadas. Con un `ReasoningTracker` las recientes se leen de
+        memoria, así que el coste es O(entradas nuevas).
+        """
+        since = getattr(log, "since", None)
+        self.apply_all(since(self.events) if since is not None
+                       else itertools.islice(log, self.events, None))
+
+    # ── Resultado ─────────────────────────────────────────────────────────────
+
+    def evidence(self) -> EEEEvidence:
+        """Recuentos actuales de los que se derivan las dimensiones."""
+        return EEEEvidence(
+            total_nodes=self.total_nodes,
+            validated=len(self._validated),
+            perspectives=self.perspectives_count,
+            tree_depth=self.tree_depth,
+            max_level=self.max_level,
+            justified=len(self._justified),
+            ever_validated=len(self._ever_validated),
+            reverted=len(self._reverted)
+        )
+
+    def result(self) -> EEEResult:
+        """Devuelve el EEE actual, recalculándolo solo si hubo eventos nuevos."""
+        if self._result is None:
+            self._result = _eee_result(self.evidence().dimensions(), self.weights)
+        return self._result
+
+    def metrics(self) -> dict:
+        """Devuelve el EEE actual en el formato de `st.session_state.eee_metrics`."""
+        return self.result().to_dict()
+
+
+EEEAccumulator = EroteticEvaluator
+
+
+def auditor(tree, events: Iterable[dict], weights: Optional[dict] = None) -> EEEResult:
+    """
+    Reconstruye el EEE reproduciendo el registro completo de una sesión.
+    Útil para auditar certificados o comprobar el evaluador incremental.
+    """
+    evaluator = EroteticEvaluator(weights=weights)
+    evaluator.load_tree(tree)
+    evaluator.apply_all(events)
+    return evaluator.result()
@@ -0,0 +1,410 @@
+"""
+Inquiry Engine — Motor de Indagación
+====================================
+Detecta la pregunta raíz y genera un complejo jerárquico de subpreguntas
+interdependientes.
+
+El complejo de indagación se almacena en `InquiryTree`, una estructura plana
+en arrays paralelos (id, índice del padre, nivel, código de tipo, posición de
+la pregunta) ordenados en preorden. Así cada subárbol ocupa un rango
+contiguo y las consultas por id, rango de subárbol o nivel no necesitan
+recorrer el árbol. `InquiryNode` es una vista ligera sobre una posición del
+árbol. El formato de diccionarios anidados con `sub_branches` se conserva
+como formato de intercambio (`from_dict` / `to_dict`).
+"""
+
+from array import array
+from enum import Enum
+from typing import Iterator, Optional
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# TIPOS DE PREGUNTA
+# ══════════════════════════════════════════════════════════════════════════════
+
+class QuestionType(str, Enum):
+    """Tipos de subpregunta del complejo de indagación."""
+    DEFINITIONAL = "definitional"
+    FACTUAL = "factual"
+    COMPARATIVE = "comparative"
+    PRECEDENTIAL = "precedential"
+    DIALECTICAL = "dialectical"
+    ARGUMENTATIVE = "argumentative"
+    CONSEQUENTIAL = "consequential"
+    GENERAL = "general"
+
+
+# Claves de nodo con almacenamiento propio; el resto se conserva aparte
+_NODE_KEYS = ("id", "question", "level", "type", "sub_branches")
+
+# Banderas por nodo para reproducir el diccionario original sin pérdidas
+_HAS_TYPE = 1
+_HAS_SUB_BRANCHES = 2
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# ÁRBOL DE INDAGACIÓN
+# ══════════════════════════════════════════════════════════════════════════════
+
+class InquiryNode:
+    """Vista de un nodo de `InquiryTree`. No copia datos del árbol."""
+
+    __slots__ = ("tree", "index")
+
+    def __init__(self, tree: "InquiryTree", index: int):
+        self.tree = tree
+        self.index = index
+
+    @property
+    def id(self) -> str:
+        return self.tree._ids[self.index]
+
+    @property
+    def question(self) -> str:
+        return self.tree._questions[self.tree._question_offsets[self.index]]
+
+    @property
+    def level(self) -> int:
+        return self.tree._levels[self.index]
+
+    @property
+    def type(self) -> str:
+        if not self.tree._flags[self.index] & _HAS_TYPE:
+            return QuestionType.GENERAL.value
+        return self.tree._types[self.tree._type_codes[self.index]]
+
+    @property
+    def parent(self) -> Optional["InquiryNode"]:
+        parent = self.tree._parents[self.index]
+        return InquiryNode(self.tree, parent) if parent >= 0 else None
+
+    @property
+    def children(self) -> Iterator["InquiryNode"]:
+        return self.tree.children(self.index)
+
+    def subtree(self) -> Iterator["InquiryNode"]:
+        """Recorre en preorden el subárbol del nodo, incluido él mismo."""
+        return self.tree.iter_range(*self.tree.subtree_range(self.index))
+
+    def to_dict(self) -> dict:
+        """Devuelve el nodo y su subárbol en el formato de `sub_branches`."""
+        return self.tree._node_to_dict(self.index)
+
+    def __eq__(self, other) -> bool:
+        return (isinstance(other, InquiryNode)
+                and other.tree is self.tree and other.index == self.index)
+
+    def __hash__(self) -> int:
+        return hash((id(self.tree), self.index))
+
+    def __repr__(self) -> str:
+        return f"InquiryNode({self.id!r}, level={self.level})"
+
+
+class InquiryTree:
+    """
+    Complejo de indagación en arrays paralelos ordenados en preorden.
+
+    - `_ids`, `_question_offsets`: identificador y posición de la pregunta
+    - `_parents`: índice del padre (-1 para las ramas de primer nivel)
+    - `_levels`, `_type_codes`: nivel declarado y tipo codificado
+    - `_subtree_ends`: fin (exclusivo) del rango que ocupa cada subárbol
+
+    La búsqueda por id es O(1) a través de `_index`; el rango de un subárbol
+    y el nivel de un nodo también son O(1).
+    """
+
+    __slots__ = ("root", "_meta", "_ids", "_questions",
+                 "_question_offsets", "_parents", "_levels", "_type_codes",
+                 "_types", "_type_index", "_flags", "_subtree_ends",
+                 "_extra", "_index")
+
+    def __init__(self, root: str = ""):
+        self.root = root
+        self._meta = {}
+        self._ids = []
+        self._questions = []
+        self._question_offsets = array("l")
+        self._parents = array("l")
+        self._levels = array("H")
+        self._type_codes = array("H")
+        self._types = [t.value for t in QuestionType]
+        self._type_index = {t: code for code, t in enumerate(self._types)}
+        self._flags = array("B")
+        self._subtree_ends = array("l")
+        self._extra = {}
+        self._index = {}
+
+    # ── Construcción ──────────────────────────────────────────────────────────
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "InquiryTree":
+        """Construye el árbol desde el formato anidado de `generate_inquiry_tree`."""
+        tree = cls(data.get("root", ""))
+        # Se conserva el orden de las claves; "branches" se regenera al exportar
+        tree._meta = {k: (None if k == "branches" else v) for k, v in data.items()}
+
+        stack = [(branch, -1) for branch in reversed(data.get("branches", []))]
+        while stack:
+            node, parent = stack.pop()
+            index = tree._append(node, parent)
+            for sub_node in reversed(node.get("sub_branches", [])):
+                stack.append((sub_node, index))
+
+        tree._compute_subtree_ends()
+        return tree
+
+    def _append(self, node: dict, parent: int) -> int:
+        index = len(self._ids)
+        node_id = node["id"]
+        if node_id in self._index:
+            raise ValueError(f"Identificador de nodo duplicado: {node_id}")
+
+        flags = 0
+        type_code = 0
+        if "type" in node:
+            flags |= _HAS_TYPE
+            type_code = self._type_code(node["type"])
+        if "sub_branches" in node:
+            flags |= _HAS_SUB_BRANCHES
+
+        self._ids.append(node_id)
+        self._question_offsets.append(len(self._questions))
+        self._questions.append(node["question"])
+        self._parents.append(parent)
+        self._levels.append(node["level"])
+        self._type_codes.append(type_code)
+        self._flags.append(flags)
+        self._index[node_id] = index
+
+        extra = {k: v for k, v in node.items() if k not in _NODE_KEYS}
+        if extra:
+            self._extra[index] = extra
+        return index
+
+    def _type_code(self, type_name: str) -> int:
+        code = self._type_index.get(type_name)
+        if code is None:
+            code = len(self._types)
+            self._types.append(type_name)
+            self._type_index[type_name] = code
+        return code
+
+    def _compute_subtree_ends(self):
+        # En preorden, el tamaño de cada subárbol se acumula de atrás hacia delante
+        n = len(self._ids)
+        sizes = array("l", [1]) * n
+        for index in range(n - 1, -1, -1):
+            parent = self._parents[index]
+            if parent >= 0:
+                sizes[parent] += sizes[index]
+        self._subtree_ends = array("l", (index + sizes[index] for index in range(n)))
+
+    # ── Consultas ─────────────────────────────────────────────────────────────
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, node_id: str) -> bool:
+        return node_id in self._index
+
+    def __getitem__(self, node_id: str) -> InquiryNode:
+        return InquiryNode(self, self._index[node_id])
+
+    def get(self, node_id: str) -> Optional[InquiryNode]:
+        """Devuelve la vista del nodo con ese id, o None si no existe."""
+        index = self._index.get(node_id)
+        return InquiryNode(self, index) if index is not None else None
+
+    def node(self, index: int) -> InquiryNode:
+        return InquiryNode(self, index)
+
+    def __iter__(self) -> Iterator[InquiryNode]:
+        return self.iter_range(0, len(self._ids))
+
+    def iter_range(self, start: int, end: int) -> Iterator[InquiryNode]:
+        for index in range(start, end):
+            yield InquiryNode(self, index)
+
+    def branches(self) -> Iterator[InquiryNode]:
+        """Ramas de primer nivel, en orden."""
+        return self.children(-1)
+
+    def children(self, index: int) -> Iterator[InquiryNode]:
+        """Hijos directos de un nodo (-1 para las ramas de primer nivel)."""
+        child = index + 1
+        end = self._subtree_ends[index] if index >= 0 else len(self._ids)
+        while child < end:
+            yield InquiryNode(self, child)
+            child = self._subtree_ends[child]
+
+    def iter_visible(self, expanded) -> Iterator[InquiryNode]:
+        """
+        Recorre en preorden los nodos visibles: los descendientes de un nodo
+        solo se visitan si su id está en `expanded`. Los subárboles plegados
+        se saltan en O(1) gracias a `_subtree_ends`.
+        """
+        index, end = 0, len(self._ids)
+        while index < end:
+            yield InquiryNode(self, index)
+            index = index + 1 if self._ids[index] in expanded else self._subtree_ends[index]
+
+    def subtree_range(self, index: int) -> tuple:
+        """Rango [inicio, fin) que ocupa el subárbol del nodo en los arrays."""
+        return index, self._subtree_ends[index]
+
+    def subtree_size(self, node_id: str) -> int:
+        index = self._index[node_id]
+        return self._subtree_ends[index] - index
+
+    def level(self, node_id: str) -> int:
+        return self._levels[self._index[node_id]]
+
+    def depth(self) -> int:
+        """Nivel máximo del complejo de indagación."""
+        return max(self._levels, default=0)
+
+    def ancestors(self, node_id: str) -> list:
+        """Ids desde la rama de primer nivel hasta el padre del nodo."""
+        path = []
+        parent = self._parents[self._index[node_id]]
+        while parent >= 0:
+            path.append(self._ids[parent])
+            parent = self._parents[parent]
+        path.reverse()
+        return path
+
+    # ── Exportación ───────────────────────────────────────────────────────────
+
+    def _node_fields(self, index: int) -> dict:
+        flags = self._flags[index]
+        node = {
+            "id": self._ids[index],
+            "question": self._questions[self._question_offsets[index]],
+            "level": self._levels[index],
+        }
+        if flags & _HAS_TYPE:
+            node["type"] = self._types[self._type_codes[index]]
+        node.update(self._extra.get(index, {}))
+        if flags & _HAS_SUB_BRANCHES:
+            node["sub_branches"] = []
+        return node
+
+    def _range_to_dicts(self, start: int, end: int) -> list:
+        # Reconstrucción iterativa: los hijos se enganchan al padre por índice
+        built = {}
+        top = []
+        for index in range(start, end):
+            node = self._node_fields(index)
+            built[index] = node
+            parent = self._parents[index]
+            if index == start or parent not in built:
+                top.append(node)
+            else:
+                built[parent].setdefault("sub_branches", []).append(node)
+        return top
+
+    def _node_to_dict(self, index: int) -> dict:
+        return self._range_to_dicts(index, self._subtree_ends[index])[0]
+
+    def to_dict(self) -> dict:
+        """Devuelve el árbol en el formato anidado de `generate_inquiry_tree`."""
+        data = dict(self._meta)
+        if "branches" in data or self._ids:
+            data["branches"] = self._range_to_dicts(0, len(self._ids))
+        return data
+
+    def __repr__(self) -> str:
+        return f"InquiryTree(root={self.root!r}, nodes={len(self)})"
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# MOTOR DE INDAGACIÓN
+# ══════════════════════════════════════════════════════════════════════════════
+
+def generate_inquiry_tree(question: str) -> dict:
+    """
+    Genera el árbol de indagación basado en la pregunta raíz.
+    Implementa la jerarquía interrogativa del Código Deliberativo.
+    """
+    # Árbol de demostración para DPI
+    # En producción, esto se conectaría con el InquiryEngine + LLM
+    return {
+        "root": question,
+        "branches": [
+            {
+                "id": "q1",
+                "question": "¿Cuál es el marco normativo aplicable?",
+                "level": 1,
+                "type": "definitional",
+                "sub_branches": [
+                    {
+                        "id": "q1.1",
+                        "question": "¿Qué establece la legislación nacional vigente?",
+                        "level": 2,
+                        "type": "factual"
+                    },
+                    {
+                        "id": "q1.2",
+                        "question": "¿Existe normativa europea o internacional aplicable?",
+                        "level": 2,
+                        "type": "comparative"
+                    }
+                ]
+            },
+            {
+                "id": "q2",
+                "question": "¿Qué dice la jurisprudencia relevante?",
+                "level": 1,
+                "type": "precedential",
+                "sub_branches": [
+                    {
+                        "id": "q2.1",
+                        "question": "¿Hay sentencias del TJUE aplicables?",
+                        "level": 2,
+                        "type": "factual"
+                    },
+                    {
+                        "id": "q2.2",
+                        "question": "¿Cuál es la línea del Tribunal Supremo español?",
+                        "level": 2,
+                        "type": "factual"
+                    }
+                ]
+            },
+            {
+                "id": "q3",
+                "question": "¿Cuáles son las posiciones doctrinales en conflicto?",
+                "level": 1,
+                "type": "dialectical",
+                "sub_branches": [
+                    {
+                        "id": "q3.1",
+                        "question": "¿Qué argumentos favorecen una interpretación restrictiva?",
+                        "level": 2,
+                        "type": "argumentative"
+                    },
+                    {
+                        "id": "q3.2",
+                        "question": "¿Qué argumentos favorecen una interpretación extensiva?",
+                        "level": 2,
+                        "type": "argumentative"
+                    }
+                ]
+            },
+            {
+                "id": "q4",
+                "question": "¿Cuáles son las implicaciones prácticas de cada interpretación?",
+                "level": 1,
+                "type": "consequential",
+                "sub_branches": []
+            }
+        ]
+    }
+
+
+class InquiryEngine:
+    """Genera complejos de indagación como `InquiryTree`."""
+
+    def generate(self, question: str) -> InquiryTree:
+        return InquiryTree.from_dict(generate_inquiry_tree(question))
@@ -0,0 +1,273 @@
+"""
+Instrumentación de los caminos críticos
+=======================================
+Streamlit vuelve a ejecutar el script entero con cada clic. La
+instrumentación mide en qué se va el tiempo de cada ejecución: inyección
+del tema, renderizado del árbol y de las métricas EEE, generación de
+perspectivas, firma, etc.
+
+- Tramos: `with instruments.span("nombre"):` o el decorador
+  `@instruments.timed()`. Desactivada la instrumentación, `span` devuelve un
+  contexto vacío compartido y `timed` la función sin envolver, de modo que
+  el coste es prácticamente nulo.
+- Ejecuciones: `run()` delimita una ejecución del script. Los tramos se
+  acumulan por ejecución (un nodo renderizado 25 veces suma sus 25
+  llamadas) y, al cerrarla, cada total se añade a su histograma junto con
+  la duración de la ejecución completa (tramo "rerun"). Cada hilo acumula
+  su propia ejecución, así que varias sesiones pueden compartir la
+  instancia. Un tramo fuera de cualquier ejecución cuenta por sí solo.
+- Exportación: `to_prometheus()` (formato de texto de Prometheus, apto
+  para el recolector de archivos de node_exporter) y `to_dict()` (JSON).
+  Con `DELIBERA_METRICS_PATH` se escriben a ese archivo (JSON si termina en
+  `.json`) al cerrar las ejecuciones, como mucho cada `write_interval`
+  segundos.
+
+Se activa con `DELIBERA_DEBUG=true`, que además muestra los tiempos en la
+barra lateral, o al configurar `DELIBERA_METRICS_PATH`.
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from pathlib import Path
+from typing import Optional
+
+from ..config import Settings, get_settings
+
+
+# Límites superiores de los buckets de los histogramas (ms)
+DEFAULT_BUCKETS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Tramo con la duración de cada ejecución completa
+RUN_SPAN = "rerun"
+
+# Contexto de los tramos con la instrumentación desactivada
+_NULL_SPAN = nullcontext()
+
+
+class Histogram:
+    """Histograma de duraciones (ms) con buckets fijos, como los de Prometheus."""
+
+    __slots__ = ("bounds", "counts", "count", "sum", "max")
+
+    def __init__(self, bounds: tuple = DEFAULT_BUCKETS):
+        self.bounds = tuple(bounds)
+        # Un bucket por límite más el de desbordamiento (+Inf)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Cuantil estimado por interpolación lineal dentro de su bucket, como `histogram_quantile`."""
+        if not self.count:
+            return 0.0
+        rank, seen, lower = q * self.count, 0, 0.0
+        for bound, count in zip(self.bounds, self.counts):
+            if count and seen + count >= rank:
+                return min(lower + (bound - lower) * (rank - seen) / count, self.max)
+            seen += count
+            lower = bound
+        return self.max
+
+    def cumulative(self) -> list:
+        """Recuentos acumulados por bucket, incluido +Inf."""
+        total, counts = 0, []
+        for count in self.counts:
+            total += count
+            counts.append(total)
+        return counts
+
+
+class _Span:
+    __slots__ = ("instruments", "name", "start")
+
+    def __init__(self, instruments: "Instruments", name: str):
+        self.instruments = instruments
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.instruments.record(self.name, (time.perf_counter() - self.start) * 1000)
+        return False
+
+
+class Instruments:
+    """
+    Tramos de tiempo agregados por ejecución en histogramas.
+    Es segura entre hilos, por lo que puede compartirse entre sesiones.
+    """
+
+    def __init__(self, enabled: bool = False, metrics_path: Optional[Path] = None,
+                 write_interval: float = 10.0, buckets: tuple = DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.metrics_path = Path(metrics_path) if metrics_path else None
+        self.write_interval = write_interval
+        self.buckets = tuple(buckets)
+        self.runs = 0
+        self._histograms = {}
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._last_write = float("-inf")
+
+    @classmethod
+    def from_settings(cls, settings: Optional[Settings] = None, **kwargs) -> "Instruments":
+        """Instrumentación activa con `DELIBERA_DEBUG` o `DELIBERA_METRICS_PATH`."""
+        settings = settings or get_settings()
+        kwargs.setdefault("enabled", settings.debug or settings.metrics_path is not None)
+        kwargs.setdefault("metrics_path", settings.metrics_path)
+        return cls(**kwargs)
+
+    # ── Tramos ────────────────────────────────────────────────────────────────
+
+    def span(self, name: str):
+        """Contexto que mide su bloque como el tramo `name`."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def timed(self, name: Optional[str] = None):
+        """Decorador que mide cada llamada como el tramo `name` (por defecto, el de la función)."""
+        def decorate(func):
+            if not self.enabled:
+                return func
+            span_name = name or func.__name__
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with _Span(self, span_name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def record(self, name: str, elapsed_ms: float):
+        """Suma una llamada al tramo `name` en la ejecución en curso."""
+        timings = getattr(self._local, "run", None)
+        if timings is None:
+            self._observe({name: [elapsed_ms, 1]})
+            return
+        entry = timings.get(name)
+        if entry is None:
+            timings[name] = [elapsed_ms, 1]
+        else:
+            entry[0] += elapsed_ms
+            entry[1] += 1
+
+    # ── Ejecuciones ───────────────────────────────────────────────────────────
+
+    @contextmanager
+    def run(self):
+        """
+        Delimita una ejecución del script. Entrega el diccionario
+        `{tramo: [ms, llamadas]}` de la ejecución, completo al salir (también
+        si sale por una excepción, como la de `st.rerun()`).
+        """
+        timings = {}
+        if not self.enabled:
+            yield timings
+            return
+        previous = getattr(self._local, "run", None)
+        self._local.run = timings
+        start = time.perf_counter()
+        try:
+            yield timings
+        finally:
+            timings[RUN_SPAN] = [(time.perf_counter() - start) * 1000, 1]
+            self._local.run = previous
+            self._observe(timings, run=True)
+            self._maybe_write()
+
+    def _observe(self, timings: dict, run: bool = False):
+        with self._lock:
+            if run:
+                self.runs += 1
+            for name, (elapsed_ms, calls) in timings.items():
+                histogram = self._histograms.get(name)
+                if histogram is None:
+                    histogram = self._histograms[name] = Histogram(self.buckets)
+                histogram.observe(elapsed_ms)
+                self._calls[name] = self._calls.get(name, 0) + calls
+
+    # ── Exportación ───────────────────────────────────────────────────────────
+
+    def to_dict(self) -> dict:
+        """Histogramas por tramo, para JSON."""
+        with self._lock:
+            spans = {}
+            for name, histogram in sorted(self._histograms.items()):
+                spans[name] = {
+                    "count": histogram.count,
+                    "calls": self._calls[name],
+                    "sum_ms": round(histogram.sum, 3),
+                    "max_ms": round(histogram.max, 3),
+                    "p50_ms": round(histogram.quantile(0.5), 3),
+                    "p95_ms": round(histogram.quantile(0.95), 3),
+                    "buckets": dict(zip([str(b) for b in histogram.bounds] + ["+Inf"],
+                                        histogram.cumulative()))
+                }
+            return {"runs": self.runs, "spans": spans}
+
+    def to_prometheus(self, prefix: str = "delibera") -> str:
+        """Histogramas por tramo en el formato de texto de Prometheus (segundos)."""
+        metric = f"{prefix}_span_seconds"
+        lines = [
+            f"# HELP {metric} Tiempo por ejecución del script en cada tramo instrumentado.",
+            f"# TYPE {metric} histogram"
+        ]
+        calls = []
+        with self._lock:
+            for name, histogram in sorted(self._histograms.items()):
+                label = name.replace("\\", "\\\\").replace('"', '\\"')
+                bounds = [f"{b / 1000:g}" for b in histogram.bounds] + ["+Inf"]
+                for bound, count in zip(bounds, histogram.cumulative()):
+                    lines.append(f'{metric}_bucket{{span="{label}",le="{bound}"}} {count}')
+                lines.append(f'{metric}_sum{{span="{label}"}} {histogram.sum / 1000:.6f}')
+                lines.append(f'{metric}_count{{span="{label}"}} {histogram.count}')
+                calls.append(f'{prefix}_span_calls_total{{span="{label}"}} {self._calls[name]}')
+            runs = self.runs
+        lines += [
+            f"# HELP {prefix}_span_calls_total Llamadas a cada tramo instrumentado.",
+            f"# TYPE {prefix}_span_calls_total counter",
+            *calls,
+            f"# HELP {prefix}_runs_total Ejecuciones del script instrumentadas.",
+            f"# TYPE {prefix}_runs_total counter",
+            f"{prefix}_runs_total {runs}"
+        ]
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: Path):
+        """Escribe las métricas en `path` (JSON si termina en .json) de forma atómica."""
+        path = Path(path)
+        if path.suffix == ".json":
+            data = json.dumps(self.to_dict(), indent=2, ensure_ascii=False)
+        else:
+            data = self.to_prometheus()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_text(data, encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    def _maybe_write(self):
+        if self.metrics_path is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_write < self.write_interval:
+                return
+            self._last_write = now
+        self.write(self.metrics_path)
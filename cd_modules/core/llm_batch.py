@@ -0,0 +1,386 @@
+"""
+Peticiones agrupadas al LLM
+===========================
+Empaqueta varias subpreguntas de un mismo árbol en una sola petición
+estructurada al modelo configurado (`OPENAI_MODEL`), en lugar de una
+petición por nodo con el mismo prompt de sistema repetido.
+
+- Los lotes se forman con un presupuesto de tokens (entrada + salida
+  reservada) contado con `tiktoken`.
+- La respuesta es un objeto JSON con un resultado por id de nodo; cada
+  resultado se valida por separado y solo los que faltan o no son válidos se
+  reintentan, reempaquetados en lotes nuevos.
+- El tiempo máximo se aplica a cada petición: una petición lenta solo hace
+  fallar (y reintentar) sus nodos.
+- Lo usan el Generador Contextual (perspectivas de cada nodo) y el Motor de
+  Indagación (subpreguntas de cada rama).
+
+El transporte habla el protocolo de chat de OpenAI sobre HTTP, por lo que
+puede apuntarse (`OPENAI_BASE_URL`) al servidor falso `cd_modules.fake_llm`
+para trabajar sin red.
+"""
+
+import asyncio
+import hashlib
+import json
+import urllib.error
+import urllib.request
+from typing import Callable, NamedTuple, Optional
+
+from ..config import Settings, get_settings
+from .perspective_cache import normalize_question
+from .prefetch import PerspectiveProvider
+from .retrieval import DEFAULT_SOURCE_TYPE, PERSPECTIVE_TYPES
+
+
+class LLMBatchError(RuntimeError):
+    """Un nodo no obtuvo un resultado válido tras agotar los reintentos."""
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# TOKENS Y TRANSPORTE
+# ══════════════════════════════════════════════════════════════════════════════
+
+_encodings = {}
+
+
+def count_tokens(text: str, model: str) -> int:
+    """
+    Tokens de `text` para `model` según tiktoken. Sin tiktoken se usa una
+    estimación conservadora (un token cada tres caracteres).
+    """
+    encoding = _encodings.get(model)
+    if encoding is None:
+        try:
+            import tiktoken
+        except ImportError:
+            return len(text) // 3 + 1
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+        _encodings[model] = encoding
+    return len(encoding.encode(text))
+
+
+class ChatTransport:
+    """Interfaz de envío de una conversación; devuelve el texto de la respuesta."""
+
+    async def complete(self, messages: list, max_tokens: int) -> str:
+        raise NotImplementedError
+
+
+class OpenAICompatibleTransport(ChatTransport):
+    """Cliente mínimo de `/chat/completions` (OpenAI o compatible) sobre urllib."""
+
+    def __init__(self, base_url: str, api_key: str, model: str, temperature: float,
+                 timeout: float = 60.0):
+        self.url = base_url.rstrip("/") + "/chat/completions"
+        self.api_key = api_key
+        self.model = model
+        self.temperature = temperature
+        self.timeout = timeout
+
+    @classmethod
+    def from_settings(cls, settings: Optional[Settings] = None) -> "OpenAICompatibleTransport":
+        settings = settings or get_settings()
+        return cls(settings.openai_base_url, settings.openai_api_key,
+                   settings.openai_model, settings.openai_temperature)
+
+    async def complete(self, messages: list, max_tokens: int) -> str:
+        return await asyncio.to_thread(self._post, messages, max_tokens)
+
+    def _post(self, messages: list, max_tokens: int) -> str:
+        body = json.dumps({
+            "model": self.model,
+            "temperature": self.temperature,
+            "max_tokens": max_tokens,
+            "response_format": {"type": "json_object"},
+            "messages": messages
+        }).encode()
+        request = urllib.request.Request(self.url, data=body, method="POST", headers={
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}"
+        })
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            payload = json.load(response)
+        return payload["choices"][0]["message"]["content"]
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# TAREAS
+# ══════════════════════════════════════════════════════════════════════════════
+
+class BatchTask(NamedTuple):
+    """Tarea agrupable: prompt de sistema, salida reservada y validación por nodo."""
+    name: str
+    system_prompt: str
+    output_tokens_per_item: int
+    parse: Callable[[object], object]
+
+
+def _parse_perspectives(value) -> list:
+    if not isinstance(value, list) or not value:
+        raise ValueError("se esperaba una lista no vacía de perspectivas")
+    perspectives = []
+    for item in value:
+        confidence = float(item["confidence"])
+        if not 0.0 <= confidence <= 1.0:
+            raise ValueError(f"confianza fuera de rango: {confidence}")
+        source_type = item.get("type")
+        perspectives.append({
+            "source": str(item["source"]),
+            "content": str(item["content"]),
+            "confidence": confidence,
+            "type": source_type if source_type in PERSPECTIVE_TYPES else DEFAULT_SOURCE_TYPE
+        })
+    return perspectives
+
+
+def _parse_subquestions(value) -> list:
+    if not isinstance(value, list):
+        raise ValueError("se esperaba una lista de subpreguntas")
+    return [{"question": str(item["question"]), "type": str(item.get("type", "factual"))}
+            for item in value]
+
+
+PERSPECTIVES_TASK = BatchTask(
+    name="perspectivas",
+    system_prompt=(
+        "Eres el Generador Contextual de DELIBERA, un sistema de indagación epistémica "
+        "en Derecho de Propiedad Intelectual. Para cada subpregunta recibida, ofrece entre "
+        "dos y cuatro perspectivas diversas (normativa, jurisprudencia, doctrina, posiciones "
+        "críticas) citando su fuente. No decides: abres el espacio de deliberación. "
+        "Responde solo con un objeto JSON {\"resultados\": {<id>: [{\"source\", \"content\", "
+        "\"confidence\" (0-1), \"type\"}]}} con una entrada por id. Tipos válidos: "
+        + ", ".join(PERSPECTIVE_TYPES) + "."
+    ),
+    output_tokens_per_item=450,
+    parse=_parse_perspectives
+)
+
+SUBQUESTIONS_TASK = BatchTask(
+    name="subpreguntas",
+    system_prompt=(
+        "Eres el Motor de Indagación de DELIBERA. Para cada pregunta recibida, propone "
+        "de una a tres subpreguntas que la descompongan en cuestiones más concretas, sin "
+        "responderlas. Responde solo con un objeto JSON {\"resultados\": {<id>: "
+        "[{\"question\", \"type\"}]}} con una entrada por id. Tipos válidos: factual, "
+        "comparative, argumentative, definitional."
+    ),
+    output_tokens_per_item=150,
+    parse=_parse_subquestions
+)
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# AGRUPACIÓN
+# ══════════════════════════════════════════════════════════════════════════════
+
+class BatchItem(NamedTuple):
+    """Nodo a resolver: id y datos que se envían al modelo."""
+    id: str
+    payload: dict
+
+
+class LLMBatcher:
+    """
+    Resuelve nodos en peticiones agrupadas por presupuesto de tokens, con
+    varias peticiones en vuelo y reintento selectivo de los nodos fallidos.
+    """
+
+    def __init__(self, transport: ChatTransport, task: BatchTask, model: str = "gpt-4o",
+                 token_budget: int = 8000, max_retries: int = 2, concurrency: int = 4,
+                 context: str = ""):
+        self.transport = transport
+        self.task = task
+        self.model = model
+        self.token_budget = token_budget
+        self.max_retries = max_retries
+        self.concurrency = concurrency
+        self.context = context
+
+        self.requests = 0
+        self.retried_items = 0
+        self.prompt_tokens = 0
+
+    @classmethod
+    def from_settings(cls, task: BatchTask, settings: Optional[Settings] = None,
+                      transport: Optional[ChatTransport] = None, **kwargs) -> "LLMBatcher":
+        settings = settings or get_settings()
+        return cls(transport or OpenAICompatibleTransport.from_settings(settings), task,
+                   model=settings.openai_model, token_budget=settings.llm_batch_tokens, **kwargs)
+
+    def _messages(self, batch: list) -> list:
+        content = {"tarea": self.task.name, "subpreguntas": [
+            {"id": item.id, **item.payload} for item in batch
+        ]}
+        if self.context:
+            content["pregunta_raiz"] = self.context
+        return [
+            {"role": "system", "content": self.task.system_prompt},
+            {"role": "user", "content": json.dumps(content, ensure_ascii=False)}
+        ]
+
+    def pack(self, items: list) -> list:
+        """
+        Agrupa los nodos, en orden, sin superar el presupuesto de tokens
+        (prompt fijo + nodos + salida reservada). Un nodo que por sí solo lo
+        supera viaja en un lote propio.
+        """
+        base = sum(count_tokens(m["content"], self.model) for m in self._messages([]))
+        batches, current, used = [], [], base
+        for item in items:
+            cost = (count_tokens(json.dumps(item.payload, ensure_ascii=False), self.model)
+                    + self.task.output_tokens_per_item + 8)
+            if current and used + cost > self.token_budget:
+                batches.append(current)
+                current, used = [], base
+            current.append(item)
+            used += cost
+        if current:
+            batches.append(current)
+        return batches
+
+    async def _request(self, batch: list, timeout: Optional[float] = None) -> dict:
+        messages = self._messages(batch)
+        self.requests += 1
+        self.prompt_tokens += sum(count_tokens(m["content"], self.model) for m in messages)
+        try:
+            text = await asyncio.wait_for(self.transport.complete(
+                messages, max_tokens=self.task.output_tokens_per_item * len(batch)
+            ), timeout)
+            results = json.loads(text)["resultados"]
+        except asyncio.TimeoutError:
+            error = f"Tiempo agotado ({timeout}s)"
+            return {item.id: LLMBatchError(error) for item in batch}
+        except (OSError, urllib.error.URLError, ValueError, KeyError, TypeError) as exc:
+            error = f"{type(exc).__name__}: {exc}"
+            return {item.id: LLMBatchError(error) for item in batch}
+
+        parsed = {}
+        for item in batch:
+            try:
+                parsed[item.id] = self.task.parse(results[item.id])
+            except (KeyError, ValueError, TypeError) as exc:
+                parsed[item.id] = LLMBatchError(f"Resultado no válido para {item.id}: {exc!r}")
+        return parsed
+
+    async def run(self, items: list, timeout: Optional[float] = None) -> dict:
+        """
+        Devuelve `{id: resultado}`; los nodos que siguen fallando tras los
+        reintentos tienen como resultado una `LLMBatchError`. `timeout` es el
+        tiempo máximo de cada petición.
+        """
+        semaphore = asyncio.Semaphore(max(1, self.concurrency))
+        results = {}
+        pending = list(items)
+
+        async def send(batch: list) -> dict:
+            async with semaphore:
+                return await self._request(batch, timeout)
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.retried_items += len(pending)
+                await asyncio.sleep(0.5 * 2 ** (attempt - 1))
+            for batch_results in await asyncio.gather(*map(send, self.pack(pending))):
+                results.update(batch_results)
+            pending = [item for item in pending if isinstance(results[item.id], Exception)]
+            if not pending:
+                break
+        return results
+
+    def stats(self) -> dict:
+        return {"requests": self.requests, "retried_items": self.retried_items,
+                "prompt_tokens": self.prompt_tokens}
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# MOTORES
+# ══════════════════════════════════════════════════════════════════════════════
+
+class BatchedLLMPerspectiveProvider(PerspectiveProvider):
+    """
+    Proveedor de perspectivas con el LLM: la precarga envía todos los nodos
+    del árbol en peticiones agrupadas. Los nodos que fallan se devuelven como
+    excepción para que la precarga los informe por separado.
+    """
+
+    supports_batch = True
+
+    def __init__(self, batcher: LLMBatcher):
+        self.batcher = batcher
+
+    @property
+    def name(self) -> str:
+        """
+        Generador en las claves de caché. El prompt lleva la pregunta raíz
+        como contexto, así que las perspectivas de una deliberación no se
+        sirven a otra con otra pregunta raíz.
+        """
+        if not self.batcher.context:
+            return "openai"
+        digest = hashlib.sha256(normalize_question(self.batcher.context).encode()).hexdigest()
+        return f"openai:{digest[:16]}"
+
+    @classmethod
+    def from_settings(cls, settings: Optional[Settings] = None, context: str = "",
+                      **kwargs) -> "BatchedLLMPerspectiveProvider":
+        return cls(LLMBatcher.from_settings(PERSPECTIVES_TASK, settings, context=context, **kwargs))
+
+    async def agenerate(self, node_id: str, question: str, node_type: str) -> list:
+        result = (await self.agenerate_batch([(node_id, question, node_type)]))[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def agenerate_batch(self, nodes: list, timeout: Optional[float] = None) -> list:
+        items = [BatchItem(node_id, {"question": question, "type": node_type})
+                 for node_id, question, node_type in nodes]
+        results = await self.batcher.run(items, timeout)
+        return [results[item.id] for item in items]
+
+
+async def aexpand_inquiry_tree(tree: dict, batcher: LLMBatcher) -> dict:
+    """
+    Completa las subpreguntas de las ramas de primer nivel que no tienen con
+    una petición agrupada para todo el árbol. Las ramas cuyo resultado no es
+    válido se dejan como estaban.
+    """
+    branches = [b for b in tree.get("branches", []) if not b.get("sub_branches")]
+    items = [BatchItem(b["id"], {"question": b["question"], "type": b.get("type", "")})
+             for b in branches]
+    results = await batcher.run(items)
+    for branch in branches:
+        subquestions = results[branch["id"]]
+        if isinstance(subquestions, Exception):
+            continue
+        branch["sub_branches"] = [{
+            "id": f"{branch['id']}.{n}",
+            "question": sub["question"],
+            "level": branch.get("level", 1) + 1,
+            "type": sub["type"]
+        } for n, sub in enumerate(subquestions, start=1)]
+    return tree
+
+
+def expand_inquiry_tree(tree: dict, settings: Optional[Settings] = None,
+                        context: str = "") -> dict:
+    """Versión síncrona de `aexpand_inquiry_tree` con el modelo configurado."""
+    batcher = LLMBatcher.from_settings(SUBQUESTIONS_TASK, settings, context=context)
+    return asyncio.run(aexpand_inquiry_tree(tree, batcher))
+
+
+def default_perspective_provider(settings: Optional[Settings] = None,
+                                 context: str = "") -> Optional[PerspectiveProvider]:
+    """
+    Proveedor LLM agrupado si hay un modelo configurado (API key de OpenAI o
+    `DELIBERA_LLM_PROVIDER=openai`); None para usar el generador local.
+    """
+    settings = settings or get_settings()
+    if settings.llm_provider == "local":
+        return None
+    if settings.has_openai_key or settings.llm_provider == "openai":
+        return BatchedLLMPerspectiveProvider.from_settings(settings, context=context)
+    return None
@@ -0,0 +1,227 @@
+"""
+Caché de perspectivas
+=====================
+Caché direccionada por contenido para las perspectivas del Generador
+Contextual. La clave es un hash de la pregunta normalizada, el tipo de nodo,
+el generador que produjo las perspectivas (local, o el LLM con un hash de la
+pregunta raíz que recibe como contexto), la configuración del modelo
+(`OPENAI_MODEL`, `OPENAI_TEMPERATURE`) y la generación del índice de fuentes,
+de modo que una misma subpregunta se sirve sin regenerarla aunque la
+planteen expertos o sesiones distintas, y deja de servirse cuando se ingiere
+un corpus nuevo.
+
+Dos niveles:
+- Memoria: LRU acotado por número de entradas, propio de cada proceso.
+- Disco: un archivo JSON por clave bajo `DATA_DIR/perspectives`, acotado por
+  tamaño total; al superarlo se eliminan las entradas usadas hace más tiempo.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Optional
+
+from ..config import Settings, get_settings
+from .contextual_generator import generate_perspectives
+from .providers import registry
+from .retrieval import index_generation
+
+
+# Se incrementa si cambia el formato de las perspectivas almacenadas
+CACHE_FORMAT_VERSION = 3
+
+# Nombre del generador local (sin LLM) en las claves de caché
+LOCAL_GENERATOR = "local"
+
+
+def normalize_question(question: str) -> str:
+    """Normaliza una pregunta para que variantes triviales compartan clave."""
+    text = unicodedata.normalize("NFC", question).casefold()
+    return " ".join(text.split())
+
+
+def perspective_cache_key(question: str, node_type: str, settings: Settings,
+                          generator_name: Optional[str] = None) -> str:
+    """
+    Calcula la clave de caché de una subpregunta. `generator_name` es el
+    proveedor que genera las perspectivas; por defecto, el LLM configurado.
+    """
+    payload = json.dumps([
+        CACHE_FORMAT_VERSION,
+        normalize_question(question),
+        node_type,
+        generator_name or registry.default_name("llm", settings),
+        settings.openai_model,
+        settings.openai_temperature,
+        index_generation(settings)
+    ], ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class PerspectiveCache:
+    """
+    Caché de perspectivas en dos niveles (memoria LRU + disco).
+    Es segura entre hilos, por lo que puede compartirse entre sesiones.
+    """
+
+    def __init__(self, directory: Path, settings: Optional[Settings] = None,
+                 max_memory_items: int = 512, max_disk_bytes: int = 64 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.settings = settings or get_settings()
+        self.max_memory_items = max_memory_items
+        self.max_disk_bytes = max_disk_bytes
+
+        self._memory = OrderedDict()
+        self._disk_index: Optional[OrderedDict] = None
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_settings(cls, settings: Optional[Settings] = None, **kwargs) -> "PerspectiveCache":
+        """Crea la caché en el directorio de datos configurado."""
+        settings = settings or get_settings()
+        return cls(settings.data_dir / "perspectives", settings=settings, **kwargs)
+
+    # ── Consulta ──────────────────────────────────────────────────────────────
+
+    def key(self, question: str, node_type: str, generator_name: Optional[str] = None) -> str:
+        return perspective_cache_key(question, node_type, self.settings, generator_name)
+
+    def get(self, question: str, node_type: str,
+            generator_name: Optional[str] = None) -> Optional[list]:
+        """Devuelve las perspectivas almacenadas, o None si no están en caché."""
+        key = self.key(question, node_type, generator_name)
+        with self._lock:
+            perspectives = self._memory.get(key)
+            if perspectives is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return perspectives
+
+            perspectives = self._read_disk(key)
+            if perspectives is not None:
+                self._remember(key, perspectives)
+                self.disk_hits += 1
+                return perspectives
+
+            self.misses += 1
+            return None
+
+    def put(self, question: str, node_type: str, perspectives: list,
+            generator_name: Optional[str] = None):
+        """Almacena las perspectivas de una subpregunta en ambos niveles."""
+        key = self.key(question, node_type, generator_name)
+        with self._lock:
+            self._remember(key, perspectives)
+            self._write_disk(key, perspectives)
+
+    def get_or_generate(self, node_id: str, question: str, node_type: str = "general",
+                        generator: Callable[[str, str], list] = generate_perspectives,
+                        generator_name: str = LOCAL_GENERATOR) -> list:
+        """
+        Devuelve las perspectivas de la caché o las genera y almacena, bajo
+        la clave de `generator_name` (el del generador local por defecto).
+        Las listas devueltas se comparten entre sesiones y no deben modificarse.
+        """
+        perspectives = self.get(question, node_type, generator_name)
+        if perspectives is None:
+            perspectives = generator(node_id, question)
+            self.put(question, node_type, perspectives, generator_name)
+        return perspectives
+
+    def stats(self) -> dict:
+        """Contadores de aciertos y fallos de la caché."""
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "memory_items": len(self._memory),
+            "disk_bytes": self._disk_bytes
+        }
+
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
+
+    # ── Nivel de memoria ──────────────────────────────────────────────────────
+
+    def _remember(self, key: str, perspectives: list):
+        self._memory[key] = perspectives
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    # ── Nivel de disco ────────────────────────────────────────────────────────
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _load_disk_index(self) -> OrderedDict:
+        # Índice de entradas ordenado por último uso (mtime), cargado una vez
+        if self._disk_index is None:
+            entries = []
+            if self.directory.exists():
+                for path in self.directory.glob("*/*.json"):
+                    stat = path.stat()
+                    entries.append((stat.st_mtime, path.stem, stat.st_size))
+            entries.sort()
+            self._disk_index = OrderedDict((key, size) for _, key, size in entries)
+            self._disk_bytes = sum(self._disk_index.values())
+        return self._disk_index
+
+    def _read_disk(self, key: str) -> Optional[list]:
+        index = self._load_disk_index()
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                perspectives = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            self._disk_bytes -= index.pop(key, 0)
+            return None
+
+        # La entrada pudo escribirla otro proceso después de cargar el índice
+        if key not in index:
+            index[key] = path.stat().st_size
+            self._disk_bytes += index[key]
+        index.move_to_end(key)
+        return perspectives
+
+    def _write_disk(self, key: str, perspectives: list):
+        index = self._load_disk_index()
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps(perspectives, ensure_ascii=False).encode()
+
+        # Escritura atómica para que otros procesos nunca lean un archivo a medias
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        self._disk_bytes += len(data) - index.pop(key, 0)
+        index[key] = len(data)
+        self._evict_disk(index)
+
+    def _evict_disk(self, index: OrderedDict):
+        while self._disk_bytes > self.max_disk_bytes and len(index) > 1:
+            key, size = index.popitem(last=False)
+            try:
+                self._path(key).unlink()
+            except FileNotFoundError:
+                pass
+            self._disk_bytes -= size
+            self.evictions += 1
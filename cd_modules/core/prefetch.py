@@ -0,0 +1,264 @@
+"""
+Precarga de perspectivas
+========================
+Genera en paralelo las perspectivas de todos los nodos de un complejo de
+indagación, de modo que al abrir la fase de deliberación cada rama ya esté
+preparada en lugar de pagar la latencia del generador en cada clic.
+
+La concurrencia se limita con un semáforo y cada llamada tiene su propio
+tiempo máximo. Los resultados se entregan en orden de finalización. Los
+proveedores con generación por lotes (`supports_batch`) reciben todos los
+nodos no cacheados en una sola llamada, con el tiempo máximo aplicado a
+cada petición que hagan. Las perspectivas se guardan en caché bajo el
+nombre del proveedor que las generó.
+"""
+
+import asyncio
+import time
+from typing import AsyncIterator, Callable, Iterable, NamedTuple, Optional, Union
+
+from .contextual_generator import generate_perspectives, generate_perspectives_batch
+from .inquiry_engine import InquiryTree
+from .perspective_cache import LOCAL_GENERATOR, PerspectiveCache
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# PROVEEDORES
+# ══════════════════════════════════════════════════════════════════════════════
+
+class PerspectiveProvider:
+    """Interfaz asíncrona de generación de perspectivas para un nodo."""
+
+    # Si es True, `iter_prefetch` usa `agenerate_batch` para todos los nodos
+    supports_batch = False
+
+    # Generador en las claves de la caché (None: el LLM configurado)
+    name: Optional[str] = None
+
+    async def agenerate(self, node_id: str, question: str, node_type: str) -> list:
+        raise NotImplementedError
+
+    async def agenerate_batch(self, nodes: list, timeout: Optional[float] = None) -> list:
+        """
+        Perspectivas de varios nodos `(node_id, question, node_type)`, en
+        orden. Un nodo fallido puede devolverse como excepción. `timeout` es
+        el tiempo máximo de cada petición que haga el proveedor.
+        """
+        raise NotImplementedError
+
+
+class LocalPerspectiveProvider(PerspectiveProvider):
+    """
+    Ejecuta un generador síncrono en un hilo para no bloquear el bucle.
+    Con el generador por defecto, todo el árbol se resuelve en una sola
+    búsqueda por lotes en el índice de fuentes.
+    """
+
+    def __init__(self, generator: Callable[[str, str], list] = generate_perspectives,
+                 batch_generator: Optional[Callable[[list], list]] = None,
+                 name: str = LOCAL_GENERATOR):
+        self.generator = generator
+        self.name = name
+        if batch_generator is None and generator is generate_perspectives:
+            batch_generator = generate_perspectives_batch
+        self.batch_generator = batch_generator
+        self.supports_batch = batch_generator is not None
+
+    async def agenerate(self, node_id: str, question: str, node_type: str) -> list:
+        return await asyncio.to_thread(self.generator, node_id, question)
+
+    async def agenerate_batch(self, nodes: list, timeout: Optional[float] = None) -> list:
+        # Una sola búsqueda por lotes: una sola petición
+        pairs = [(node_id, question) for node_id, question, _ in nodes]
+        return await asyncio.wait_for(asyncio.to_thread(self.batch_generator, pairs), timeout)
+
+
+class StubPerspectiveProvider(PerspectiveProvider):
+    """
+    Proveedor local para pruebas sin red: simula la latencia de un modelo
+    remoto y puede fallar en nodos concretos. Registra las llamadas y la
+    concurrencia máxima alcanzada.
+    """
+
+    name = LOCAL_GENERATOR
+
+    def __init__(self, latency: float = 0.05, fail_on: Iterable[str] = ()):
+        self.latency = latency
+        self.fail_on = set(fail_on)
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def agenerate(self, node_id: str, question: str, node_type: str) -> list:
+        self.calls.append(node_id)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            if node_id in self.fail_on:
+                raise RuntimeError(f"Fallo simulado en {node_id}")
+            return generate_perspectives(node_id, question)
+        finally:
+            self.in_flight -= 1
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# PRECARGA
+# ══════════════════════════════════════════════════════════════════════════════
+
+class PrefetchResult(NamedTuple):
+    """Resultado de la precarga de un nodo."""
+    node_id: str
+    perspectives: Optional[list]
+    error: Optional[str] = None
+    cached: bool = False
+
+
+async def iter_prefetch(tree: Union[InquiryTree, dict],
+                        concurrency: int = 8,
+                        timeout: float = 30.0,
+                        provider: Optional[PerspectiveProvider] = None,
+                        cache: Optional[PerspectiveCache] = None,
+                        skip: Iterable[str] = ()) -> AsyncIterator[PrefetchResult]:
+    """Genera las perspectivas de cada nodo y las entrega según terminan."""
+    if isinstance(tree, dict):
+        tree = InquiryTree.from_dict(tree)
+    provider = provider or LocalPerspectiveProvider()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    skip = set(skip)
+
+    async def run(node_id: str, question: str, node_type: str) -> PrefetchResult:
+        if cache is not None:
+            perspectives = cache.get(question, node_type, provider.name)
+            if perspectives is not None:
+                return PrefetchResult(node_id, perspectives, cached=True)
+        async with semaphore:
+            try:
+                perspectives = await asyncio.wait_for(
+                    provider.agenerate(node_id, question, node_type), timeout
+                )
+            except asyncio.TimeoutError:
+                return PrefetchResult(node_id, None, f"Tiempo agotado ({timeout}s)")
+            except Exception as exc:
+                return PrefetchResult(node_id, None, f"{type(exc).__name__}: {exc}")
+        if cache is not None:
+            cache.put(question, node_type, perspectives, provider.name)
+        return PrefetchResult(node_id, perspectives)
+
+    nodes = [(node.id, node.question, node.type) for node in tree if node.id not in skip]
+    if provider.supports_batch:
+        async for result in _prefetch_batch(nodes, timeout, provider, cache):
+            yield result
+        return
+
+    tasks = [asyncio.ensure_future(run(*node)) for node in nodes]
+    try:
+        for completed in asyncio.as_completed(tasks):
+            yield await completed
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def _prefetch_batch(nodes: list, timeout: float, provider: PerspectiveProvider,
+                          cache: Optional[PerspectiveCache]) -> AsyncIterator[PrefetchResult]:
+    # Los nodos en caché se entregan de inmediato; el resto, en una sola llamada
+    pending = []
+    for node_id, question, node_type in nodes:
+        perspectives = (cache.get(question, node_type, provider.name)
+                        if cache is not None else None)
+        if perspectives is not None:
+            yield PrefetchResult(node_id, perspectives, cached=True)
+        else:
+            pending.append((node_id, question, node_type))
+    if not pending:
+        return
+
+    try:
+        batch = list(await provider.agenerate_batch(pending, timeout=timeout))
+    except asyncio.TimeoutError:
+        error = f"Tiempo agotado ({timeout}s)"
+    except Exception as exc:
+        error = f"{type(exc).__name__}: {exc}"
+    else:
+        for (node_id, question, node_type), perspectives in zip(pending, batch):
+            if isinstance(perspectives, Exception):
+                yield PrefetchResult(node_id, None, f"{type(perspectives).__name__}: {perspectives}")
+                continue
+            if cache is not None:
+                cache.put(question, node_type, perspectives, provider.name)
+            yield PrefetchResult(node_id, perspectives)
+        # Un proveedor que devuelve menos resultados que nodos no los pierde en silencio
+        for node_id, _, _ in pending[len(batch):]:
+            yield PrefetchResult(node_id, None, f"Sin resultado del proveedor "
+                                                f"({len(batch)} de {len(pending)} nodos)")
+        return
+    for node_id, _, _ in pending:
+        yield PrefetchResult(node_id, None, error)
+
+
+async def prefetch_perspectives(tree: Union[InquiryTree, dict],
+                                concurrency: int = 8,
+                                timeout: float = 30.0,
+                                provider: Optional[PerspectiveProvider] = None,
+                                cache: Optional[PerspectiveCache] = None,
+                                sink: Optional[dict] = None,
+                                on_result: Optional[Callable[[PrefetchResult], None]] = None) -> dict:
+    """
+    Precarga las perspectivas de todo el árbol.
+
+    Cada resultado correcto se escribe en `sink` (por ejemplo, un diccionario
+    de `st.session_state`) en cuanto termina; los nodos ya presentes en `sink`
+    no se regeneran. Devuelve un resumen con los nodos completados, los
+    servidos desde caché y los errores por nodo.
+    """
+    sink = {} if sink is None else sink
+    summary = {"completed": 0, "cached": 0, "failed": {}, "elapsed": 0.0}
+    start = time.perf_counter()
+
+    async for result in iter_prefetch(tree, concurrency, timeout, provider, cache, skip=list(sink)):
+        if result.error is None:
+            sink[result.node_id] = result.perspectives
+            summary["completed"] += 1
+            summary["cached"] += result.cached
+        else:
+            summary["failed"][result.node_id] = result.error
+        if on_result is not None:
+            on_result(result)
+
+    summary["elapsed"] = round(time.perf_counter() - start, 4)
+    return summary
+
+
+def run_prefetch(tree: Union[InquiryTree, dict], **kwargs) -> dict:
+    """Versión síncrona de `prefetch_perspectives` para scripts y la interfaz."""
+    return asyncio.run(prefetch_perspectives(tree, **kwargs))
+
+
+def generate_node_perspectives(node_id: str, question: str, node_type: str,
+                               provider: Optional[PerspectiveProvider] = None,
+                               cache: Optional[PerspectiveCache] = None,
+                               timeout: float = 30.0) -> list:
+    """
+    Perspectivas de un nodo que la precarga no dejó listas. Se piden al
+    proveedor (el mismo de la precarga) y, si falla o no hay proveedor, al
+    generador local; cada resultado se guarda en caché bajo el generador que
+    lo produjo.
+    """
+    if provider is not None:
+        perspectives = cache.get(question, node_type, provider.name) if cache is not None else None
+        if perspectives is not None:
+            return perspectives
+        try:
+            perspectives = asyncio.run(asyncio.wait_for(
+                provider.agenerate(node_id, question, node_type), timeout
+            ))
+        except Exception:
+            pass
+        else:
+            if cache is not None:
+                cache.put(question, node_type, perspectives, provider.name)
+            return perspectives
+    if cache is not None:
+        return cache.get_or_generate(node_id, question, node_type)
+    return generate_perspectives(node_id, question)
@@ -0,0 +1,192 @@
+"""
+Registro de proveedores
+=======================
+Resuelve de forma perezosa los backends de LLM, embeddings y almacén
+vectorial. Cada proveedor se registra como una fábrica (o su ruta
+`"módulo:función"`) que importa su backend al invocarse, de modo que
+langchain, openai o chromadb solo se cargan la primera vez que se pide ese
+proveedor, nunca al importar `cd_modules`.
+
+Tipos de proveedor:
+- "llm": modelo de chat (por defecto OpenAI si hay `OPENAI_API_KEY`)
+- "embeddings": modelo de embeddings
+- "vectorstore": almacén vectorial persistente (por defecto Chroma si está
+  instalado; si no, la matriz `np.memmap` de `embedding_store` con NumPy,
+  o el índice BM25 local de `retrieval`)
+- "sessions": almacén del estado de las deliberaciones en curso (por
+  defecto SQLite bajo `DATA_DIR`; "memory" lo guarda solo en el proceso)
+"""
+
+import hashlib
+import importlib
+import importlib.util
+import math
+import threading
+from typing import Callable, Optional, Union
+
+from ..config import Settings, get_settings
+
+
+PROVIDER_KINDS = ("llm", "embeddings", "vectorstore", "sessions")
+
+
+class ProviderNotAvailable(RuntimeError):
+    """El proveedor pedido no está registrado o faltan sus dependencias."""
+
+
+class ProviderRegistry:
+    """
+    Registro de fábricas de proveedores con resolución perezosa.
+    Las instancias se crean una vez por proceso y configuración (`Settings`)
+    y se reutilizan: pedir un proveedor con otra configuración (otro
+    `DATA_DIR`, otro modelo) crea una instancia propia.
+    """
+
+    def __init__(self):
+        self._factories = {kind: {} for kind in PROVIDER_KINDS}
+        self._instances = {}
+        self._lock = threading.RLock()
+
+    def register(self, kind: str, name: str, factory: Union[str, Callable[[Settings], object]]):
+        """Registra una fábrica (invocable o ruta `"módulo:función"`)."""
+        if kind not in self._factories:
+            raise ValueError(f"Tipo de proveedor desconocido: {kind}")
+        self._factories[kind][name] = factory
+        with self._lock:
+            for key in [key for key in self._instances if key[:2] == (kind, name)]:
+                del self._instances[key]
+
+    def names(self, kind: str) -> list:
+        return list(self._factories[kind])
+
+    def default_name(self, kind: str, settings: Settings) -> str:
+        configured = {
+            "llm": settings.llm_provider,
+            "embeddings": settings.embeddings_provider,
+            "vectorstore": settings.vector_store,
+            "sessions": settings.session_backend
+        }[kind]
+        if configured:
+            return configured
+        if kind == "sessions":
+            return "sqlite"
+        if kind == "vectorstore":
+            if importlib.util.find_spec("chromadb"):
+                return "chroma"
+            return "memmap" if importlib.util.find_spec("numpy") else "local"
+        return "openai" if settings.has_openai_key else "local"
+
+    def get(self, kind: str, name: Optional[str] = None, settings: Optional[Settings] = None):
+        """Devuelve el proveedor, importando su backend en el primer uso."""
+        settings = settings or get_settings()
+        name = name or self.default_name(kind, settings)
+        key = (kind, name, settings)
+        with self._lock:
+            if key in self._instances:
+                return self._instances[key]
+            factory = self._factories.get(kind, {}).get(name)
+            if factory is None:
+                raise ProviderNotAvailable(f"Proveedor {kind!r} no registrado: {name!r}")
+            if isinstance(factory, str):
+                factory = _resolve(factory)
+            try:
+                instance = factory(settings)
+            except ImportError as exc:
+                raise ProviderNotAvailable(
+                    f"Faltan dependencias para el proveedor {kind}:{name} ({exc.name})"
+                ) from exc
+            self._instances[key] = instance
+            return instance
+
+    def loaded(self) -> list:
+        """Proveedores ya instanciados en este proceso."""
+        return sorted({f"{kind}:{name}" for kind, name, _ in self._instances})
+
+    def reset(self, kind: Optional[str] = None):
+        """Descarta las instancias creadas (todas, o solo las de `kind`)."""
+        with self._lock:
+            for key in [key for key in self._instances if kind in (None, key[0])]:
+                del self._instances[key]
+
+
+def _resolve(path: str) -> Callable:
+    module_name, _, attribute = path.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# PROVEEDORES LOCALES
+# ══════════════════════════════════════════════════════════════════════════════
+
+class HashingEmbeddings:
+    """
+    Embeddings locales sin red ni dependencias: proyección por hashing de
+    los tokens (y sus trigramas de caracteres) normalizada a norma 1.
+    Implementa la interfaz `embed_documents` / `embed_query` de langchain.
+    """
+
+    def __init__(self, dimensions: int = 256):
+        self.dimensions = dimensions
+
+    def _embed(self, text: str) -> list:
+        vector = [0.0] * self.dimensions
+        for token in text.casefold().split():
+            features = [token] + [token[i:i + 3] for i in range(max(len(token) - 2, 0))]
+            for feature in features:
+                digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+                value = int.from_bytes(digest, "little")
+                sign = 1.0 if value & 1 else -1.0
+                vector[(value >> 1) % self.dimensions] += sign
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: list) -> list:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list:
+        return self._embed(text)
+
+
+def _local_llm(settings: Settings):
+    # Sin LLM configurado, los motores usan sus heurísticas locales
+    return None
+
+
+def _local_embeddings(settings: Settings):
+    return HashingEmbeddings()
+
+
+def _openai_llm(settings: Settings):
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(model=settings.openai_model, temperature=settings.openai_temperature)
+
+
+def _openai_embeddings(settings: Settings):
+    from langchain_openai import OpenAIEmbeddings
+    return OpenAIEmbeddings()
+
+
+def _chroma_vectorstore(settings: Settings):
+    from langchain_community.vectorstores import Chroma
+    return Chroma(
+        collection_name="delibera_perspectives",
+        embedding_function=registry.get("embeddings", settings=settings),
+        persist_directory=str(settings.chroma_persist_dir)
+    )
+
+
+registry = ProviderRegistry()
+registry.register("llm", "local", _local_llm)
+registry.register("llm", "openai", _openai_llm)
+registry.register("embeddings", "local", _local_embeddings)
+registry.register("embeddings", "openai", _openai_embeddings)
+registry.register("vectorstore", "chroma", _chroma_vectorstore)
+registry.register("vectorstore", "memmap", f"{__package__}.embedding_store:_memmap_vectorstore")
+registry.register("vectorstore", "local", f"{__package__}.retrieval:_local_vectorstore")
+registry.register("sessions", "sqlite", f"{__package__}.session_store:_sqlite_sessions")
+registry.register("sessions", "memory", f"{__package__}.session_store:_memory_sessions")
+
+
+def get_provider(kind: str, name: Optional[str] = None):
+    """Atajo para `registry.get`."""
+    return registry.get(kind, name)
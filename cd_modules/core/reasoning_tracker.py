@@ -0,0 +1,242 @@
+"""
+Reasoning Tracker — Rastreador de Razonamiento
+==============================================
+Registra todo el recorrido de razonamiento de una deliberación para generar
+un historial auditable.
+
+El registro es de solo adición y con memoria acotada: las últimas entradas se
+conservan en un búfer circular para la interfaz, y el resto se vuelca a
+segmentos JSONL compactos bajo `DATA_DIR/reasoning/<sesión>`. La exportación
+recorre el registro completo en streaming, segmento a segmento.
+
+Los segmentos llevan el prefijo del escritor (cada registro y cada copia
+restaurada de uno tiene el suyo), de modo que dos copias de la misma sesión
+(dos pestañas o dos procesos) nunca sobrescriben los segmentos de la otra.
+"""
+
+import itertools
+import json
+import shutil
+import threading
+import uuid
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import Enum
+from pathlib import Path
+from typing import Iterator, Optional
+
+from ..config import get_settings
+from .signature import MerkleTrail
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# TIPOS
+# ══════════════════════════════════════════════════════════════════════════════
+
+class ActionType(str, Enum):
+    """Acciones registradas durante la deliberación."""
+    INICIO_DELIBERACION = "INICIO_DELIBERACIÓN"
+    EXPLORAR_NODO = "EXPLORAR_NODO"
+    VALIDAR_NODO = "VALIDAR_NODO"
+    REVISAR_NODO = "REVISAR_NODO"
+    FIRMA_EPISTEMICA = "FIRMA_EPISTÉMICA"
+
+
+@dataclass
+class ReasoningStep:
+    """Entrada del registro de razonamiento."""
+    action: str
+    timestamp: str = field(default_factory=lambda: datetime.now().isoformat())
+    data: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, entry: dict) -> "ReasoningStep":
+        data = {k: v for k, v in entry.items() if k not in ("timestamp", "action")}
+        return cls(action=entry["action"], timestamp=entry["timestamp"], data=data)
+
+    def to_dict(self) -> dict:
+        """Formato de `registro_razonamiento` en el certificado."""
+        action = self.action.value if isinstance(self.action, ActionType) else self.action
+        return {"timestamp": self.timestamp, "action": action, **self.data}
+
+
+@dataclass
+class SessionSummary:
+    """Resumen agregado del registro de una sesión."""
+    session_id: str
+    total_steps: int
+    action_counts: dict
+    first_timestamp: Optional[str]
+    last_timestamp: Optional[str]
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# REGISTRO
+# ══════════════════════════════════════════════════════════════════════════════
+
+class ReasoningTracker:
+    """
+    Registro de razonamiento de solo adición.
+
+    - `append` añade una entrada (diccionario con `timestamp` y `action`).
+    - `tail(n)` devuelve las últimas entradas desde memoria.
+    - Iterar el registro lo recorre completo en orden, leyendo los segmentos
+      de disco en streaming.
+    - `trail` acumula el árbol de Merkle del registro para la firma.
+
+    Con `directory=None` no se vuelca a disco y todo queda en memoria.
+    Los segmentos ya escritos no se modifican: un registro restaurado con
+    pickle los sigue leyendo y escribe los nuevos con su propio prefijo.
+    """
+
+    def __init__(self, session_id: Optional[str] = None, directory: Optional[Path] = None,
+                 tail_size: int = 50, segment_size: int = 500):
+        self.session_id = session_id or uuid.uuid4().hex
+        self.directory = Path(directory) if directory is not None else None
+        self.segment_size = segment_size
+
+        self._tail = deque(maxlen=tail_size)
+        self._pending = []
+        self._segments = []
+        self._new_writer()
+        self._count = 0
+        self._action_counts = Counter()
+        self._first_timestamp = None
+        self._last_timestamp = None
+        self.trail = MerkleTrail()
+
+    def _new_writer(self):
+        self.writer = uuid.uuid4().hex[:12]
+        self._written = 0
+
+    def __setstate__(self, state):
+        # Una copia restaurada es un escritor distinto del original
+        self.__dict__.update(state)
+        self._new_writer()
+
+    @classmethod
+    def from_settings(cls, session_id: Optional[str] = None, **kwargs) -> "ReasoningTracker":
+        """Crea un registro que vuelca sus segmentos bajo `DATA_DIR/reasoning`."""
+        session_id = session_id or uuid.uuid4().hex
+        directory = get_settings().data_dir / "reasoning" / session_id
+        return cls(session_id, directory, **kwargs)
+
+    # ── Escritura ─────────────────────────────────────────────────────────────
+
+    def append(self, entry: dict):
+        """Añade una entrada al registro."""
+        if isinstance(entry, ReasoningStep):
+            entry = entry.to_dict()
+        self._tail.append(entry)
+        self._count += 1
+        self._action_counts[entry.get("action")] += 1
+        if self._first_timestamp is None:
+            self._first_timestamp = entry.get("timestamp")
+        self._last_timestamp = entry.get("timestamp")
+        self.trail.append_entry(entry)
+
+        if self.directory is None:
+            self._pending.append(entry)
+            return
+        self._pending.append(json.dumps(entry, ensure_ascii=False, separators=(",", ":")))
+        if len(self._pending) >= self.segment_size:
+            self.flush()
+
+    def record(self, action: ActionType, **data) -> dict:
+        """Crea y añade una entrada con la marca de tiempo actual."""
+        entry = ReasoningStep(action=action, data=data).to_dict()
+        self.append(entry)
+        return entry
+
+    def flush(self):
+        """Vuelca las entradas pendientes a un nuevo segmento en disco."""
+        if self.directory is None or not self._pending:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"segment-{self.writer}-{self._written:06d}.jsonl"
+        with open(path, "x", encoding="utf-8") as f:
+            f.write("\n".join(self._pending))
+            f.write("\n")
+        self._written += 1
+        self._segments.append(path)
+        self._pending = []
+
+    def discard(self):
+        """Elimina los segmentos en disco de la sesión."""
+        if self.directory is not None:
+            shutil.rmtree(self.directory, ignore_errors=True)
+        self._segments = []
+
+    # ── Lectura ───────────────────────────────────────────────────────────────
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[dict]:
+        """Recorre el registro completo en orden, sin cargarlo entero en memoria."""
+        for path in list(self._segments):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    yield json.loads(line)
+        for entry in list(self._pending):
+            yield json.loads(entry) if self.directory is not None else entry
+
+    def since(self, start: int) -> Iterator[dict]:
+        """
+        Entradas a partir de la posición `start`. Si siguen en el búfer de
+        memoria se sirven sin leer disco; si no, se recorre el registro.
+        """
+        new = self._count - start
+        if new <= 0:
+            return iter(())
+        if new <= len(self._tail):
+            return iter(list(self._tail)[-new:])
+        return itertools.islice(iter(self), start, None)
+
+    def steps(self) -> Iterator[ReasoningStep]:
+        for entry in self:
+            yield ReasoningStep.from_dict(entry)
+
+    def tail(self, n: int = 10) -> list:
+        """Últimas `n` entradas (como máximo `tail_size`), de la más antigua a la última."""
+        if n <= 0:
+            return []
+        return list(self._tail)[-n:]
+
+    def summary(self) -> SessionSummary:
+        return SessionSummary(
+            session_id=self.session_id,
+            total_steps=self._count,
+            action_counts=dict(self._action_counts),
+            first_timestamp=self._first_timestamp,
+            last_timestamp=self._last_timestamp
+        )
+
+    def __repr__(self) -> str:
+        return f"ReasoningTracker({self.session_id!r}, steps={self._count})"
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# REGISTRO POR SESIÓN
+# ══════════════════════════════════════════════════════════════════════════════
+
+_trackers = {}
+_trackers_lock = threading.Lock()
+
+
+def get_tracker(session_id: str) -> ReasoningTracker:
+    """Devuelve el registro de la sesión, creándolo si no existe."""
+    with _trackers_lock:
+        tracker = _trackers.get(session_id)
+        if tracker is None:
+            tracker = _trackers[session_id] = ReasoningTracker.from_settings(session_id)
+        return tracker
+
+
+def reset_tracker(session_id: str):
+    """Descarta el registro de la sesión y sus segmentos en disco."""
+    with _trackers_lock:
+        tracker = _trackers.pop(session_id, None)
+    if tracker is not None:
+        tracker.discard()
@@ -0,0 +1,445 @@
+"""
+Índice de fuentes — Recuperación para el Generador Contextual
+=============================================================
+Índice persistente de resoluciones judiciales, normativa y doctrina sobre el
+que el Generador Contextual busca las perspectivas de cada subpregunta.
+
+El almacén se obtiene del registro de proveedores ("vectorstore"):
+- "chroma": búsqueda densa con Chroma en `CHROMA_PERSIST_DIR`; los textos se
+  embeben por lotes al ingerirlos.
+- "memmap": matriz de embeddings en `np.memmap` con búsqueda vectorizada
+  por lotes (`embedding_store`).
+- "local": índice invertido BM25 en disco bajo `CHROMA_PERSIST_DIR/local`,
+  sin dependencias externas.
+
+Cada ingesta actualiza el manifiesto `delibera_index.json`, cuya generación
+forma parte de la clave de la caché de perspectivas: al cambiar el corpus,
+las perspectivas en caché dejan de servirse.
+"""
+
+import heapq
+import json
+import math
+import os
+import pickle
+import re
+import threading
+import unicodedata
+import uuid
+from array import array
+from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+from ..config import Settings, get_settings
+from .providers import registry
+
+
+MANIFEST_NAME = "delibera_index.json"
+
+# Perspectivas devueltas por subpregunta
+DEFAULT_TOP_K = 4
+
+# Tipos de perspectiva que distingue la interfaz (`render_perspectives`)
+PERSPECTIVE_TYPES = ("legal", "eu_law", "case_law", "doctrine", "critical", "analysis", "general")
+
+# Tipo de fuente por defecto si el registro ingerido no lo indica
+DEFAULT_SOURCE_TYPE = "general"
+
+_TOKEN_RE = re.compile(r"\w+")
+
+_STOPWORDS = frozenset("""
+    a al ante bajo como con contra cual cuando de del desde donde el ella ellas
+    ellos en entre era es esa ese esta este esto fue ha hay la las le les lo los
+    mas me mi no o para pero por que se ser si sin sobre son su sus tambien te
+    tiene un una uno unos unas y ya
+""".split())
+
+
+def tokenize(text: str, keep: frozenset = frozenset()) -> list:
+    """
+    Términos de búsqueda: minúsculas, sin tildes ni palabras vacías. Las de
+    `keep` se conservan aunque sean palabras vacías.
+    """
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return [t for t in _TOKEN_RE.findall(text)
+            if t in keep or (len(t) > 1 and t not in _STOPWORDS)]
+
+
+def read_manifest(directory: Path) -> Optional[dict]:
+    try:
+        with open(Path(directory) / MANIFEST_NAME, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def index_generation(settings: Optional[Settings] = None) -> str:
+    """Generación del índice configurado ("" si aún no se ha ingerido nada)."""
+    settings = settings or get_settings()
+    manifest = read_manifest(settings.chroma_persist_dir)
+    return manifest["generation"] if manifest else ""
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# ALMACÉN LOCAL (BM25)
+# ══════════════════════════════════════════════════════════════════════════════
+
+class SourceHit(NamedTuple):
+    """Documento recuperado (misma interfaz que `langchain` Document)."""
+    page_content: str
+    metadata: dict
+
+
+class LocalSourceStore:
+    """
+    Índice invertido BM25 en disco.
+
+    Los documentos se añaden a `documents.jsonl` (solo adición) y el índice
+    se guarda como instantánea (`postings.pickle`) con listas de apariciones
+    en arrays compactos. Los textos no se mantienen en memoria: se leen del
+    JSONL por desplazamiento al devolver resultados. Borrar un documento
+    añade al JSONL una marca `[id, null, null]` y lo quita de las listas de
+    apariciones; su posición queda vacía.
+    Expone `add_texts`, `delete` y `similarity_search_with_relevance_scores`
+    como los almacenes vectoriales de langchain.
+    """
+
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self._documents_path = self.directory / "documents.jsonl"
+        self._snapshot_path = self.directory / "postings.pickle"
+        self._lock = threading.Lock()
+
+        # Término → (ids de documento, frecuencias)
+        self._postings = {}
+        self._lengths = array("I")
+        self._offsets = array("Q")
+        self._ids = {}
+        self._deleted = set()
+        self._total_length = 0
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._lengths) - len(self._deleted)
+
+    # ── Ingesta ───────────────────────────────────────────────────────────────
+
+    def add_texts(self, texts: list, metadatas: Optional[list] = None,
+                  ids: Optional[list] = None) -> list:
+        """Añade documentos; los ids ya indexados se ignoran."""
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [uuid.uuid4().hex for _ in texts]
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with self._lock, open(self._documents_path, "ab") as f:
+            offset = f.tell()
+            for doc_id, text, metadata in zip(ids, texts, metadatas):
+                if doc_id in self._ids:
+                    continue
+                line = json.dumps([doc_id, text, metadata], ensure_ascii=False).encode() + b"\n"
+                f.write(line)
+                self._index(doc_id, text, offset)
+                offset += len(line)
+        return ids
+
+    def delete(self, ids: list) -> int:
+        """Borra documentos por id; los desconocidos se ignoran. Devuelve cuántos borra."""
+        with self._lock:
+            ids = [doc_id for doc_id in dict.fromkeys(ids) if doc_id in self._ids]
+            if not ids:
+                return 0
+            with open(self._documents_path, "ab") as f:
+                for doc_id in ids:
+                    f.write(json.dumps([doc_id, None, None]).encode() + b"\n")
+            self._unindex({self._ids.pop(doc_id) for doc_id in ids})
+        return len(ids)
+
+    def persist(self):
+        """Guarda la instantánea del índice (tras una ingesta en bloque)."""
+        with self._lock:
+            ids = [None] * len(self._lengths)
+            for doc_id, doc in self._ids.items():
+                ids[doc] = doc_id
+            snapshot = {
+                "documents": len(self._lengths),
+                "lengths": self._lengths,
+                "offsets": self._offsets,
+                "ids": ids,
+                "postings": self._postings
+            }
+            tmp_path = self._snapshot_path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "wb") as f:
+                pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._snapshot_path)
+
+    def _index(self, doc_id: str, text: str, offset: int):
+        doc = len(self._lengths)
+        terms = tokenize(text)
+        frequencies = {}
+        for term in terms:
+            frequencies[term] = frequencies.get(term, 0) + 1
+        for term, tf in frequencies.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = (array("I"), array("H"))
+            postings[0].append(doc)
+            postings[1].append(min(tf, 0xFFFF))
+        self._lengths.append(len(terms))
+        self._offsets.append(offset)
+        self._ids[doc_id] = doc
+        self._total_length += len(terms)
+
+    def _unindex(self, docs: set):
+        # Quita los documentos de las listas de apariciones de sus términos,
+        # que se obtienen releyendo su texto del JSONL
+        terms = set()
+        with open(self._documents_path, "rb") as f:
+            for doc in docs:
+                terms.update(tokenize(self._document(f, doc).page_content))
+        for term in terms:
+            doc_list, tfs = self._postings[term]
+            kept = [(doc, tf) for doc, tf in zip(doc_list, tfs) if doc not in docs]
+            if kept:
+                self._postings[term] = (array("I", [doc for doc, _ in kept]),
+                                        array("H", [tf for _, tf in kept]))
+            else:
+                del self._postings[term]
+        for doc in docs:
+            self._total_length -= self._lengths[doc]
+            self._lengths[doc] = 0
+        self._deleted.update(docs)
+
+    # ── Carga ─────────────────────────────────────────────────────────────────
+
+    def _load(self):
+        try:
+            with open(self._snapshot_path, "rb") as f:
+                snapshot = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            snapshot = None
+
+        if snapshot is not None:
+            self._postings = snapshot["postings"]
+            self._lengths = snapshot["lengths"]
+            self._offsets = snapshot["offsets"]
+            self._ids = {doc_id: doc for doc, doc_id in enumerate(snapshot["ids"])
+                         if doc_id is not None}
+            self._deleted = {doc for doc, doc_id in enumerate(snapshot["ids"]) if doc_id is None}
+            self._total_length = sum(self._lengths)
+            start = self._offsets[-1] if len(self._offsets) else 0
+            skip = 1 if len(self._offsets) else 0
+        else:
+            start = skip = 0
+
+        # Documentos añadidos después de la última instantánea
+        if not self._documents_path.exists():
+            return
+        with open(self._documents_path, "rb") as f:
+            f.seek(start)
+            offset = start
+            for n, line in enumerate(f):
+                if n >= skip:
+                    doc_id, text, _ = json.loads(line)
+                    if text is None:
+                        if doc_id in self._ids:
+                            self._unindex({self._ids.pop(doc_id)})
+                    else:
+                        self._index(doc_id, text, offset)
+                offset += len(line)
+
+    # ── Consulta ──────────────────────────────────────────────────────────────
+
+    def _document(self, f, doc: int) -> SourceHit:
+        f.seek(self._offsets[doc])
+        _, text, metadata = json.loads(f.readline())
+        return SourceHit(text, metadata)
+
+    def similarity_search_with_relevance_scores(self, query: str, k: int = DEFAULT_TOP_K) -> list:
+        """
+        Los `k` documentos con mayor puntuación BM25. La relevancia se
+        normaliza a [0, 1] dividiendo por la puntuación máxima alcanzable
+        para la consulta.
+        """
+        n_docs = len(self)
+        if not n_docs:
+            return []
+        avg_length = self._total_length / n_docs or 1.0
+        k1, b = self.K1, self.B
+
+        scores = {}
+        max_score = 0.0
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            docs, tfs = postings
+            idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            max_score += idf * (k1 + 1)
+            lengths = self._lengths
+            for doc, tf in zip(docs, tfs):
+                norm = k1 * (1 - b + b * lengths[doc] / avg_length)
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+        if not scores:
+            return []
+
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        with open(self._documents_path, "rb") as f:
+            return [(self._document(f, doc), score / max_score) for doc, score in best]
+
+
+def _local_vectorstore(settings: Settings) -> LocalSourceStore:
+    return LocalSourceStore(settings.chroma_persist_dir / "local")
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# ÍNDICE DE FUENTES
+# ══════════════════════════════════════════════════════════════════════════════
+
+class SourceIndex:
+    """
+    Índice de fuentes sobre el almacén vectorial configurado.
+
+    Los registros que se ingieren son diccionarios con `content` y, de forma
+    opcional, `source`, `type` e `id` (para que reingerir sea idempotente).
+    Las búsquedas devuelven perspectivas con la forma
+    `{source, content, confidence, type}`.
+    """
+
+    def __init__(self, store, directory: Path, backend: str):
+        self.store = store
+        self.directory = Path(directory)
+        self.backend = backend
+
+    @classmethod
+    def from_settings(cls, settings: Optional[Settings] = None,
+                      backend: Optional[str] = None) -> "SourceIndex":
+        settings = settings or get_settings()
+        backend = backend or registry.default_name("vectorstore", settings)
+        store = registry.get("vectorstore", backend, settings=settings)
+        return cls(store, settings.chroma_persist_dir, backend)
+
+    def add(self, records: Iterable[dict], batch_size: int = 256) -> int:
+        """
+        Ingiere registros por lotes (un lote = una llamada de embeddings en
+        los almacenes densos) y actualiza el manifiesto. Devuelve cuántos
+        registros se han procesado.
+        """
+        total = 0
+        for batch in _batches(records, batch_size):
+            texts = [record["content"] for record in batch]
+            metadatas = [{
+                "source": record.get("source") or "Fuente sin título",
+                "type": record.get("type") or DEFAULT_SOURCE_TYPE
+            } for record in batch]
+            ids = [str(record["id"]) if record.get("id") is not None else uuid.uuid4().hex
+                   for record in batch]
+            self.store.add_texts(texts, metadatas=metadatas, ids=ids)
+            total += len(batch)
+
+        if total:
+            if isinstance(self.store, LocalSourceStore):
+                self.store.persist()
+            self._write_manifest(total)
+        return total
+
+    def search(self, question: str, k: int = DEFAULT_TOP_K) -> list:
+        """Perspectivas más relevantes para una subpregunta."""
+        hits = self.store.similarity_search_with_relevance_scores(question, k=k)
+        return _perspectives(hits)
+
+    def search_batch(self, questions: list, k: int = DEFAULT_TOP_K) -> list:
+        """
+        Perspectivas de varias subpreguntas. Los almacenes con búsqueda por
+        lotes (`similarity_search_batch`) las resuelven en una sola pasada.
+        """
+        if hasattr(self.store, "similarity_search_batch"):
+            return [_perspectives(hits)
+                    for hits in self.store.similarity_search_batch(list(questions), k=k)]
+        return [self.search(question, k) for question in questions]
+
+    def delete(self, ids: Iterable[str]) -> int:
+        """
+        Borra registros por id y actualiza el manifiesto. Devuelve cuántos
+        se han borrado (todos los pedidos si el almacén no lo informa).
+        """
+        ids = [str(doc_id) for doc_id in ids]
+        if not ids:
+            return 0
+        deleted = self.store.delete(ids=ids)
+        if isinstance(deleted, bool) or not isinstance(deleted, int):
+            deleted = len(ids)
+        if deleted:
+            self._write_manifest(-deleted)
+        return deleted
+
+    def _write_manifest(self, delta: int):
+        manifest = read_manifest(self.directory) or {"records": 0}
+        manifest.update({
+            "backend": self.backend,
+            "records": max(0, manifest["records"] + delta),
+            "generation": uuid.uuid4().hex
+        })
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.directory / f"{MANIFEST_NAME}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.directory / MANIFEST_NAME)
+
+
+def _perspectives(hits: list) -> list:
+    return [{
+        "source": hit.metadata.get("source", "Fuente sin título"),
+        "content": hit.page_content,
+        "confidence": round(max(0.0, min(1.0, score)), 2),
+        "type": hit.metadata.get("type", DEFAULT_SOURCE_TYPE)
+    } for hit, score in hits]
+
+
+def _batches(records: Iterable[dict], size: int) -> Iterator[list]:
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# Índice compartido por proceso, abierto en la primera búsqueda
+_index: Optional[SourceIndex] = None
+_index_generation = ""
+_index_lock = threading.Lock()
+
+
+def get_source_index(settings: Optional[Settings] = None) -> Optional[SourceIndex]:
+    """
+    Índice de fuentes del proceso, o None si todavía no se ha ingerido
+    ningún corpus. Se reabre si otra ingesta ha cambiado la generación.
+    """
+    global _index, _index_generation
+    settings = settings or get_settings()
+    manifest = read_manifest(settings.chroma_persist_dir)
+    if manifest is None:
+        return None
+    with _index_lock:
+        if _index is None or manifest["generation"] != _index_generation:
+            registry.reset("vectorstore")
+            _index = SourceIndex.from_settings(settings, backend=manifest["backend"])
+            _index_generation = manifest["generation"]
+        return _index
+
+
+def retrieve_perspectives(question: str, k: int = DEFAULT_TOP_K) -> list:
+    """Perspectivas recuperadas del índice ([] si no hay índice)."""
+    index = get_source_index()
+    return index.search(question, k) if index is not None else []
+
+
+def retrieve_perspectives_batch(questions: list, k: int = DEFAULT_TOP_K) -> list:
+    """Perspectivas recuperadas para varias subpreguntas en una pasada."""
+    index = get_source_index()
+    return index.search_batch(questions, k) if index is not None else [[] for _ in questions]
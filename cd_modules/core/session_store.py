@@ -0,0 +1,421 @@
+"""
+Almacén de sesiones
+===================
+Estado de las deliberaciones en curso fuera de la memoria del proceso de
+Streamlit, para que una deliberación sobreviva al reinicio de un worker y
+pueda continuar en cualquier proceso detrás de un balanceador.
+
+Cada sesión se guarda campo a campo (`inquiry_tree`, `validated_nodes`,
+`perspectives`, `reasoning_log`...) serializado con pickle:
+
+- Escritura: al final de cada ejecución del script solo se escriben los
+  campos cuyo contenido cambió (se compara un resumen BLAKE2 de cada campo
+  con el de la última escritura).
+- Lectura perezosa: una sesión solo se lee del almacén la primera vez que
+  su navegador ejecuta el script en un proceso, y solo los campos que ese
+  proceso aún no tiene.
+- Concurrencia optimista: cada sesión tiene un número de versión que sube en
+  cada escritura. Un estado solo se escribe si la versión guardada es la que
+  leyó o escribió por última vez; si otra pestaña o proceso escribió antes,
+  `save` lanza `SessionConflict` sin escribir nada, en lugar de mezclar
+  campos de ambos.
+- Expiración: las sesiones sin actividad durante `DELIBERA_SESSION_TTL`
+  segundos se eliminan junto con los segmentos de su registro de
+  razonamiento.
+
+Backends (tipo de proveedor "sessions"):
+- "sqlite": `DATA_DIR/sessions.sqlite3` en modo WAL, compartible entre
+  varios procesos de la misma máquina o volumen.
+- "memory": diccionario del proceso, sustituto local sin persistencia.
+"""
+
+import hashlib
+import pickle
+import re
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Iterable, MutableMapping, Optional, Tuple
+
+from ..config import Settings, get_settings
+from .providers import registry
+
+
+# Claves (no persistidas) con los resúmenes de los campos ya escritos, el
+# momento de la última actividad registrada y la versión de la sesión leída
+# o escrita por última vez
+DIGESTS_KEY = "_session_digests"
+TOUCHED_KEY = "_session_touched"
+VERSION_KEY = "_session_version"
+
+_SESSION_ID = re.compile(r"[0-9a-f]{32}")
+
+# Intervalo mínimo entre actualizaciones de la última actividad (segundos)
+TOUCH_INTERVAL = 60
+
+# Intervalo mínimo entre barridos de sesiones inactivas (segundos)
+EVICTION_INTERVAL = 600
+
+
+class SessionConflict(RuntimeError):
+    """La sesión se escribió desde otro estado después de la última lectura de este."""
+
+
+def new_session_id() -> str:
+    return uuid.uuid4().hex
+
+
+def is_session_id(value) -> bool:
+    """Comprueba el formato de un id de sesión (p. ej. el de la URL)."""
+    return isinstance(value, str) and _SESSION_ID.fullmatch(value) is not None
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# BACKENDS
+# ══════════════════════════════════════════════════════════════════════════════
+
+class SessionBackend:
+    """Almacén clave-valor de campos serializados por sesión."""
+
+    def load(self, session_id: str, fields: Iterable[str]) -> Tuple[dict, int]:
+        """
+        Devuelve `({campo: bytes}, versión)` con los campos guardados de la
+        sesión; la versión de una sesión que no existe es 0.
+        """
+        raise NotImplementedError
+
+    def save(self, session_id: str, values: dict, now: float, version: int) -> int:
+        """
+        Escribe los campos dados y registra `now` como última actividad si la
+        versión guardada es `version`; si no, lanza `SessionConflict`.
+        Devuelve la nueva versión.
+        """
+        raise NotImplementedError
+
+    def touch(self, session_id: str, now: float):
+        raise NotImplementedError
+
+    def delete(self, session_id: str):
+        raise NotImplementedError
+
+    def expire(self, before: float) -> list:
+        """Elimina las sesiones inactivas desde antes de `before` y devuelve sus ids."""
+        raise NotImplementedError
+
+
+class MemorySessionBackend(SessionBackend):
+    """Backend en memoria del proceso (sin persistencia entre reinicios)."""
+
+    def __init__(self):
+        self._sessions = {}
+        self._last_seen = {}
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def load(self, session_id: str, fields: Iterable[str]) -> Tuple[dict, int]:
+        with self._lock:
+            stored = self._sessions.get(session_id, {})
+            values = {field: stored[field] for field in fields if field in stored}
+            return values, self._versions.get(session_id, 0)
+
+    def save(self, session_id: str, values: dict, now: float, version: int) -> int:
+        with self._lock:
+            current = self._versions.get(session_id, 0)
+            if current != version:
+                raise SessionConflict(f"Sesión {session_id} en la versión {current}, "
+                                      f"no en la {version}")
+            self._sessions.setdefault(session_id, {}).update(values)
+            self._last_seen[session_id] = now
+            self._versions[session_id] = version + 1
+            return version + 1
+
+    def touch(self, session_id: str, now: float):
+        with self._lock:
+            if session_id in self._sessions:
+                self._last_seen[session_id] = now
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            self._last_seen.pop(session_id, None)
+            self._versions.pop(session_id, None)
+
+    def expire(self, before: float) -> list:
+        with self._lock:
+            expired = [sid for sid, seen in self._last_seen.items() if seen < before]
+            for session_id in expired:
+                del self._sessions[session_id]
+                del self._last_seen[session_id]
+                self._versions.pop(session_id, None)
+        return expired
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+class SQLiteSessionBackend(SessionBackend):
+    """
+    Backend SQLite. Una fila por campo (`session_fields`) y otra por sesión
+    con su última actividad y su versión (`sessions`); la conexión es única
+    por proceso y se serializa con un cerrojo. La comprobación de versión y
+    la escritura van en la misma transacción `IMMEDIATE`, de modo que también
+    son atómicas entre procesos.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                last_seen REAL NOT NULL,
+                version INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS sessions_last_seen ON sessions (last_seen);
+            CREATE TABLE IF NOT EXISTS session_fields (
+                session_id TEXT NOT NULL,
+                field TEXT NOT NULL,
+                value BLOB NOT NULL,
+                PRIMARY KEY (session_id, field)
+            ) WITHOUT ROWID;
+        """)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(sessions)")}
+        if "version" not in columns:
+            self._conn.execute("ALTER TABLE sessions ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
+    def load(self, session_id: str, fields: Iterable[str]) -> Tuple[dict, int]:
+        fields = list(fields)
+        placeholders = ",".join("?" * len(fields))
+        with self._lock:
+            # Campos y versión de la misma instantánea
+            self._conn.execute("BEGIN")
+            try:
+                version = self._version(session_id)
+                rows = self._conn.execute(
+                    f"SELECT field, value FROM session_fields "
+                    f"WHERE session_id = ? AND field IN ({placeholders})",
+                    [session_id, *fields]
+                ).fetchall() if fields else []
+            finally:
+                self._conn.execute("COMMIT")
+        return dict(rows), version
+
+    def save(self, session_id: str, values: dict, now: float, version: int) -> int:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                current = self._version(session_id)
+                if current != version:
+                    raise SessionConflict(f"Sesión {session_id} en la versión {current}, "
+                                          f"no en la {version}")
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO session_fields (session_id, field, value) "
+                    "VALUES (?, ?, ?)",
+                    [(session_id, field, value) for field, value in values.items()]
+                )
+                self._conn.execute(
+                    "INSERT INTO sessions (session_id, last_seen, version) VALUES (?, ?, ?) "
+                    "ON CONFLICT (session_id) DO UPDATE SET last_seen = excluded.last_seen, "
+                    "version = excluded.version",
+                    (session_id, now, version + 1)
+                )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return version + 1
+
+    def _version(self, session_id: str) -> int:
+        row = self._conn.execute("SELECT version FROM sessions WHERE session_id = ?",
+                                 (session_id,)).fetchone()
+        return row[0] if row else 0
+
+    def touch(self, session_id: str, now: float):
+        with self._lock:
+            self._conn.execute("UPDATE sessions SET last_seen = ? WHERE session_id = ?",
+                               (now, session_id))
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute("DELETE FROM session_fields WHERE session_id = ?", (session_id,))
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._conn.execute("COMMIT")
+
+    def expire(self, before: float) -> list:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            expired = [row[0] for row in self._conn.execute(
+                "SELECT session_id FROM sessions WHERE last_seen < ?", (before,)
+            )]
+            self._conn.executemany("DELETE FROM session_fields WHERE session_id = ?",
+                                   [(sid,) for sid in expired])
+            self._conn.execute("DELETE FROM sessions WHERE last_seen < ?", (before,))
+            self._conn.execute("COMMIT")
+        return expired
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+def _sqlite_sessions(settings: Settings) -> SQLiteSessionBackend:
+    return SQLiteSessionBackend(settings.data_dir / "sessions.sqlite3")
+
+
+def _memory_sessions(settings: Settings) -> MemorySessionBackend:
+    return MemorySessionBackend()
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# SINCRONIZACIÓN CON EL ESTADO DE LA SESIÓN
+# ══════════════════════════════════════════════════════════════════════════════
+
+class SessionStore:
+    """
+    Sincroniza un subconjunto de campos de un estado de sesión (como
+    `st.session_state`) con un backend. Es segura entre hilos y puede
+    compartirse entre todas las sesiones del proceso.
+    """
+
+    def __init__(self, backend: SessionBackend, fields: Iterable[str],
+                 ttl: Optional[float] = None, reasoning_dir: Optional[Path] = None):
+        self.backend = backend
+        self.fields = tuple(fields)
+        self.ttl = ttl
+        self.reasoning_dir = Path(reasoning_dir) if reasoning_dir is not None else None
+        self._last_eviction = 0.0
+        self._lock = threading.Lock()
+
+        self.loads = 0
+        self.writes = 0
+        self.skipped = 0
+        self.conflicts = 0
+
+    @classmethod
+    def from_settings(cls, fields: Iterable[str], settings: Optional[Settings] = None,
+                      backend: Optional[str] = None) -> "SessionStore":
+        """Almacén con el backend configurado en `DELIBERA_SESSION_BACKEND`."""
+        settings = settings or get_settings()
+        return cls(
+            registry.get("sessions", backend, settings=settings),
+            fields,
+            ttl=settings.session_ttl,
+            reasoning_dir=settings.data_dir / "reasoning"
+        )
+
+    def restore(self, session_id: str, state: MutableMapping) -> int:
+        """
+        Carga en `state` los campos guardados de la sesión que aún no estén
+        en él. Devuelve el número de campos cargados; un campo que no se
+        puede deserializar se omite y conserva su valor por defecto.
+        """
+        missing = [field for field in self.fields if field not in state]
+        if not missing:
+            return 0
+        digests = state.setdefault(DIGESTS_KEY, {})
+        values, state[VERSION_KEY] = self.backend.load(session_id, missing)
+        loaded = 0
+        for field, blob in values.items():
+            try:
+                state[field] = pickle.loads(blob)
+            except Exception:
+                continue
+            digests[field] = _digest(blob)
+            loaded += 1
+        self.loads += loaded
+        return loaded
+
+    def save(self, session_id: str, state: MutableMapping, now: Optional[float] = None) -> int:
+        """
+        Escribe los campos de `state` que cambiaron desde la última escritura.
+        Si la sesión se escribió desde otro estado después de la última
+        lectura o escritura de este, lanza `SessionConflict` (ver `reload`).
+        """
+        now = time.time() if now is None else now
+        digests = state.get(DIGESTS_KEY)
+        if digests is None:
+            digests = state[DIGESTS_KEY] = {}
+
+        changed = {}
+        for field in self.fields:
+            if field not in state:
+                continue
+            blob = pickle.dumps(state[field], protocol=pickle.HIGHEST_PROTOCOL)
+            digest = _digest(blob)
+            if digests.get(field) != digest:
+                changed[field] = (blob, digest)
+
+        if changed:
+            try:
+                state[VERSION_KEY] = self.backend.save(
+                    session_id, {field: blob for field, (blob, _) in changed.items()}, now,
+                    state.get(VERSION_KEY, 0)
+                )
+            except SessionConflict:
+                self.conflicts += 1
+                raise
+            for field, (_, digest) in changed.items():
+                digests[field] = digest
+            state[TOUCHED_KEY] = now
+            self.writes += len(changed)
+        else:
+            self.skipped += 1
+            if now - state.get(TOUCHED_KEY, 0) >= TOUCH_INTERVAL:
+                self.backend.touch(session_id, now)
+                state[TOUCHED_KEY] = now
+
+        self.evict_idle(now)
+        return len(changed)
+
+    def reload(self, session_id: str, state: MutableMapping) -> int:
+        """
+        Descarta los campos de `state` y los vuelve a cargar del almacén (tras
+        un `SessionConflict`). Los campos que no estén guardados quedan
+        ausentes para que se completen con sus valores por defecto.
+        """
+        for key in (*self.fields, DIGESTS_KEY, VERSION_KEY):
+            state.pop(key, None)
+        return self.restore(session_id, state)
+
+    def delete(self, session_id: str):
+        """Elimina la sesión del almacén y los segmentos de su registro."""
+        self.backend.delete(session_id)
+        self._discard_reasoning(session_id)
+
+    def evict_idle(self, now: Optional[float] = None, force: bool = False) -> list:
+        """
+        Elimina las sesiones inactivas más de `ttl` segundos. Salvo con
+        `force`, el barrido se hace como mucho una vez cada `EVICTION_INTERVAL`.
+        """
+        now = time.time() if now is None else now
+        if not self.ttl:
+            return []
+        with self._lock:
+            if not force and now - self._last_eviction < EVICTION_INTERVAL:
+                return []
+            self._last_eviction = now
+        expired = self.backend.expire(now - self.ttl)
+        for session_id in expired:
+            self._discard_reasoning(session_id)
+        return expired
+
+    def _discard_reasoning(self, session_id: str):
+        if self.reasoning_dir is not None and is_session_id(session_id):
+            shutil.rmtree(self.reasoning_dir / session_id, ignore_errors=True)
+
+    def stats(self) -> dict:
+        return {"loads": self.loads, "writes": self.writes, "skipped": self.skipped,
+                "conflicts": self.conflicts}
+
+
+def _digest(blob: bytes) -> bytes:
+    return hashlib.blake2b(blob, digest_size=16).digest()
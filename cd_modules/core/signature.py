@@ -0,0 +1,343 @@
+"""
+Firma Epistémica
+================
+Hash de firma del experto sobre la deliberación.
+
+Esquema original (`generate_signature_hash`): SHA-256 de la cabecera del
+certificado (experto, fecha, pregunta raíz, nodos validados, síntesis y EEE).
+
+Esquema Merkle (`merkle-sha256-v2`): además de la cabecera, la firma cubre
+todo el rastro de la deliberación. Cada entrada del registro de razonamiento,
+y cada anotación que contiene, es una hoja de un árbol de Merkle (RFC 6962)
+que `MerkleTrail` acumula a medida que se añaden entradas, guardando solo
+O(log n) hashes. Firmar cuesta O(log n) y cada anotación admite una prueba
+de inclusión verificable sin el certificado completo.
+
+La cabecera firmada incluye también la especialización del experto, las
+anotaciones, todas las dimensiones del EEE y su evidencia. Los certificados
+`merkle-sha256-v1` (sin esos campos) siguen verificándose; en ambos esquemas
+las anotaciones del certificado deben coincidir con las hojas de anotación
+del rastro firmado.
+"""
+
+import hashlib
+import json
+from typing import Iterable, Iterator, Optional
+
+
+MERKLE_SCHEME = "merkle-sha256-v2"
+MERKLE_SCHEME_V1 = "merkle-sha256-v1"
+
+
+def generate_signature_hash(content: dict, expert: str, timestamp: str) -> str:
+    """
+    Genera el hash de firma epistémica.
+    Garantiza la trazabilidad y la responsabilidad del experto.
+    """
+    signature_content = json.dumps({
+        "expert": expert,
+        "timestamp": timestamp,
+        "root_question": content.get("root_question", ""),
+        "validated_nodes": list(content.get("validated_nodes", [])),
+        "synthesis": content.get("synthesis", ""),
+        "eee_score": content.get("eee_score", 0)
+    }, sort_keys=True, ensure_ascii=False)
+
+    return hashlib.sha256(signature_content.encode()).hexdigest()
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# HOJAS DEL RASTRO
+# ══════════════════════════════════════════════════════════════════════════════
+
+def _canonical(value) -> bytes:
+    return json.dumps(value, sort_keys=True, ensure_ascii=False,
+                      separators=(",", ":")).encode()
+
+
+def leaf_hash(leaf: dict) -> bytes:
+    """Hash de hoja (prefijo 0x00, RFC 6962)."""
+    return hashlib.sha256(b"\x00" + _canonical(leaf)).digest()
+
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    """Hash de nodo interno (prefijo 0x01, RFC 6962)."""
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+
+def entry_leaves(entry: dict) -> Iterator[dict]:
+    """
+    Hojas que aporta una entrada del registro: la propia entrada y, si valida
+    un nodo con anotación, la anotación del experto sobre ese nodo.
+    """
+    yield {"registro": entry}
+    if entry.get("action") == "VALIDAR_NODO" and entry.get("annotation"):
+        yield {"anotacion": {"node_id": entry["node_id"], "annotation": entry["annotation"]}}
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# ÁRBOL DE MERKLE INCREMENTAL
+# ══════════════════════════════════════════════════════════════════════════════
+
+class MerkleTrail:
+    """
+    Acumulador de Merkle de solo adición.
+
+    Guarda la frontera del árbol: la raíz de cada subárbol perfecto pendiente
+    (como los bits de un contador binario), así que añadir una hoja cuesta
+    O(1) amortizado y calcular la raíz O(log n).
+    """
+
+    __slots__ = ("size", "_frontier")
+
+    def __init__(self):
+        self.size = 0
+        self._frontier = []
+
+    def append_hash(self, leaf: bytes):
+        self._frontier.append(leaf)
+        self.size += 1
+        # Fusiona subárboles de igual tamaño: tantos como ceros finales tenga size
+        size = self.size
+        while size % 2 == 0:
+            right = self._frontier.pop()
+            left = self._frontier.pop()
+            self._frontier.append(node_hash(left, right))
+            size //= 2
+
+    def append_leaf(self, leaf: dict):
+        self.append_hash(leaf_hash(leaf))
+
+    def append_entry(self, entry: dict):
+        """Añade las hojas de una entrada del registro de razonamiento."""
+        for leaf in entry_leaves(entry):
+            self.append_leaf(leaf)
+
+    def root(self) -> str:
+        """Raíz actual del árbol en hexadecimal."""
+        if not self._frontier:
+            return hashlib.sha256(b"").hexdigest()
+        root = self._frontier[-1]
+        for left in reversed(self._frontier[:-1]):
+            root = node_hash(left, root)
+        return root.hex()
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[dict], size: Optional[int] = None) -> "MerkleTrail":
+        """
+        Reconstruye el árbol desde un registro. Con `size`, se detiene al
+        alcanzar ese número de hojas (las entradas posteriores a la firma no
+        forman parte del rastro firmado).
+        """
+        trail = cls()
+        for entry in entries:
+            if size is not None and trail.size >= size:
+                break
+            trail.append_entry(entry)
+        return trail
+
+
+def signing_payload(content: dict, expert: str, timestamp: str, trail_root: str,
+                    trail_size: int, scheme: str = MERKLE_SCHEME) -> dict:
+    payload = {
+        "scheme": scheme,
+        "expert": expert,
+        "timestamp": timestamp,
+        "root_question": content.get("root_question", ""),
+        "validated_nodes": sorted(content.get("validated_nodes", [])),
+        "synthesis": content.get("synthesis", ""),
+        "eee_score": content.get("eee_score", 0),
+        "trail_root": trail_root,
+        "trail_size": trail_size
+    }
+    if scheme != MERKLE_SCHEME_V1:
+        payload.update({
+            "expert_role": content.get("expert_role", ""),
+            "annotations": dict(content.get("annotations") or {}),
+            "eee_metrics": dict(content.get("eee_metrics") or {}),
+            "eee_evidence": content.get("eee_evidence")
+        })
+    return payload
+
+
+def sign_deliberation(content: dict, expert: str, timestamp: str, trail: MerkleTrail) -> dict:
+    """
+    Firma la cabecera de la deliberación junto con la raíz del rastro.
+    `content` lleva los campos del certificado que cubre la firma:
+    `root_question`, `validated_nodes`, `synthesis`, `eee_score`,
+    `expert_role`, `annotations`, `eee_metrics` y `eee_evidence`.
+    Devuelve los campos de firma del certificado.
+    """
+    root = trail.root()
+    payload = signing_payload(content, expert, timestamp, root, trail.size)
+    return {
+        "hash": hashlib.sha256(_canonical(payload)).hexdigest(),
+        "timestamp": timestamp,
+        "algoritmo": "SHA-256",
+        "esquema": MERKLE_SCHEME,
+        "raiz_merkle": root,
+        "hojas": trail.size
+    }
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# PRUEBAS DE INCLUSIÓN
+# ══════════════════════════════════════════════════════════════════════════════
+
+def _largest_power_of_two_below(n: int) -> int:
+    return 1 << ((n - 1).bit_length() - 1)
+
+
+def _subtree_root(leaves: list, start: int, end: int) -> bytes:
+    if end - start == 1:
+        return leaves[start]
+    k = _largest_power_of_two_below(end - start)
+    return node_hash(_subtree_root(leaves, start, start + k),
+                     _subtree_root(leaves, start + k, end))
+
+
+def _audit_path(leaves: list, index: int, start: int, end: int) -> list:
+    if end - start == 1:
+        return []
+    k = _largest_power_of_two_below(end - start)
+    if index < start + k:
+        return _audit_path(leaves, index, start, start + k) + [_subtree_root(leaves, start + k, end)]
+    return _audit_path(leaves, index, start + k, end) + [_subtree_root(leaves, start, start + k)]
+
+
+def trail_leaves(entries: Iterable[dict], size: Optional[int] = None) -> Iterator[dict]:
+    """Hojas del rastro en orden, hasta `size` hojas si se indica."""
+    count = 0
+    for entry in entries:
+        if size is not None and count >= size:
+            return
+        for leaf in entry_leaves(entry):
+            count += 1
+            yield leaf
+
+
+def inclusion_proof(entries: Iterable[dict], index: int, size: Optional[int] = None) -> dict:
+    """Prueba de inclusión de la hoja `index` en el rastro firmado."""
+    leaves = list(trail_leaves(entries, size))
+    hashes = [leaf_hash(leaf) for leaf in leaves]
+    if not 0 <= index < len(hashes):
+        raise IndexError(f"Hoja {index} fuera del rastro ({len(hashes)} hojas)")
+    return {
+        "esquema": MERKLE_SCHEME,
+        "hoja": leaves[index],
+        "indice": index,
+        "hojas": len(hashes),
+        "ruta": [h.hex() for h in _audit_path(hashes, index, 0, len(hashes))],
+        "raiz_merkle": _subtree_root(hashes, 0, len(hashes)).hex()
+    }
+
+
+def annotation_proof(certificate: dict, node_id: str) -> dict:
+    """
+    Prueba de inclusión de la última anotación firmada sobre un nodo.
+    Basta con la prueba y la raíz firmada del certificado para verificarla.
+    """
+    firma = certificate["firma"]
+    size = firma["hojas"]
+    index = None
+    for position, leaf in enumerate(trail_leaves(certificate["registro_razonamiento"], size)):
+        if leaf.get("anotacion", {}).get("node_id") == node_id:
+            index = position
+    if index is None:
+        raise KeyError(f"No hay anotación firmada para el nodo {node_id}")
+    return inclusion_proof(certificate["registro_razonamiento"], index, size)
+
+
+def verify_inclusion_proof(proof: dict, root: str) -> bool:
+    """
+    Verifica una prueba de inclusión (RFC 9162, 2.1.3.2) frente a `root`, la
+    raíz de Merkle firmada del certificado. La `raiz_merkle` que trae la
+    propia prueba no cuenta: quien forja la prueba también la elige.
+    """
+    if not root:
+        raise ValueError("Hace falta la raíz de Merkle esperada")
+    try:
+        return _check_audit_path(proof, root)
+    except (KeyError, TypeError, AttributeError, ValueError):
+        return False
+
+
+def _check_audit_path(proof: dict, root: str) -> bool:
+    index, size = proof["indice"], proof["hojas"]
+    if not 0 <= index < size:
+        return False
+    fn, sn = index, size - 1
+    result = leaf_hash(proof["hoja"])
+    for sibling in proof["ruta"]:
+        sibling = bytes.fromhex(sibling)
+        if sn == 0:
+            return False
+        if fn & 1 or fn == sn:
+            result = node_hash(sibling, result)
+            while not fn & 1 and fn != 0:
+                fn >>= 1
+                sn >>= 1
+        else:
+            result = node_hash(result, sibling)
+        fn >>= 1
+        sn >>= 1
+    return sn == 0 and result.hex() == root.lower()
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# VERIFICACIÓN DE CERTIFICADOS
+# ══════════════════════════════════════════════════════════════════════════════
+
+def _certificate_content(certificate: dict) -> dict:
+    return {
+        "root_question": certificate.get("pregunta_raiz", ""),
+        "validated_nodes": certificate.get("nodos_validados", []),
+        "synthesis": certificate.get("sintesis", ""),
+        "eee_score": certificate.get("metricas_eee", {}).get("total", 0),
+        "expert_role": certificate.get("experto", {}).get("especialización", ""),
+        "annotations": certificate.get("anotaciones") or {},
+        "eee_metrics": certificate.get("metricas_eee") or {},
+        "eee_evidence": certificate.get("evidencia_eee")
+    }
+
+
+def signed_annotations(entries: Iterable[dict], size: Optional[int] = None) -> dict:
+    """Última anotación de cada nodo en las hojas del rastro firmado."""
+    annotations = {}
+    for leaf in trail_leaves(entries, size):
+        if "anotacion" in leaf:
+            annotations[leaf["anotacion"]["node_id"]] = leaf["anotacion"]["annotation"]
+    return annotations
+
+
+def recompute_certificate_hash(certificate: dict) -> str:
+    """
+    Recalcula el hash de firma de un certificado exportado según su esquema.
+    Devuelve una cadena vacía si el rastro no coincide con la firma o las
+    anotaciones del certificado no son las del rastro.
+    """
+    firma = certificate["firma"]
+    expert = certificate.get("experto", {}).get("nombre", "")
+    content = _certificate_content(certificate)
+    scheme = firma.get("esquema")
+    if scheme not in (MERKLE_SCHEME, MERKLE_SCHEME_V1):
+        return generate_signature_hash(content, expert, firma["timestamp"])
+
+    log = certificate.get("registro_razonamiento", [])
+    trail = MerkleTrail.from_entries(log, firma["hojas"])
+    root = trail.root()
+    if trail.size != firma["hojas"] or root != firma.get("raiz_merkle"):
+        return ""
+    # Las anotaciones que se archivan e indexan son las del rastro firmado
+    if content["annotations"] != signed_annotations(log, firma["hojas"]):
+        return ""
+    payload = signing_payload(content, expert, firma["timestamp"], root, trail.size, scheme)
+    return hashlib.sha256(_canonical(payload)).hexdigest()
+
+
+def verify_certificate(certificate: dict) -> bool:
+    """Comprueba que el hash de firma corresponde al contenido del certificado."""
+    try:
+        return recompute_certificate_hash(certificate) == certificate["firma"]["hash"]
+    except (KeyError, TypeError, AttributeError, ValueError):
+        return False
@@ -0,0 +1,313 @@
+"""
+Caché de árboles de indagación
+==============================
+Delante del Motor de Indagación: antes de generar el árbol de una pregunta
+raíz se buscan árboles ya generados para preguntas casi idénticas («¿Puede
+una obra generada por IA…?»), que el experto puede reutilizar o bifurcar.
+
+- Normalización: los términos de `archive.search_terms` (minúsculas, sin
+  tildes, palabras vacías ni flexión de género y número), salvo las
+  negaciones y los términos de polaridad («no», «sin», «nunca», «contra»,
+  «más»…), que se conservan: «¿Puede…?» y «¿No puede…?» son preguntas
+  distintas.
+- Similitud: coseno entre embeddings (proveedor "embeddings") de las
+  preguntas normalizadas; cuenta como acierto el árbol más parecido que
+  supere `DELIBERA_TREE_CACHE_THRESHOLD` y tenga los mismos términos de
+  polaridad que la pregunta. Solo se comparan árboles del mismo generador
+  (LLM, modelo y temperatura) y del mismo modelo de embeddings.
+- Errores: si el modelo de embeddings falla (red, API), la consulta cuenta
+  como fallo y el árbol no se guarda; la generación sigue como siempre.
+- Almacenamiento: `DATA_DIR/trees.sqlite3` en modo WAL, compartido por los
+  procesos de la máquina; cada proceso mantiene en memoria la matriz de
+  embeddings y la recarga cuando otro proceso escribe.
+- Expiración: los árboles generados hace más de `DELIBERA_TREE_CACHE_TTL`
+  segundos se eliminan, y si el total supera `max_bytes` se eliminan los
+  usados hace más tiempo.
+
+Métricas (`stats`): consultas, aciertos y ratio de aciertos, árboles
+reutilizados y bifurcados, errores de embeddings y el tiempo ahorrado, es
+decir, el tiempo que costó generar cada árbol servido desde la caché.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from ..config import Settings, get_settings
+from .archive import stem
+from .providers import ProviderNotAvailable, registry
+from .retrieval import tokenize
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trees (
+    id INTEGER PRIMARY KEY,
+    question TEXT NOT NULL,
+    generator TEXT NOT NULL,
+    embedder TEXT NOT NULL,
+    embedding BLOB NOT NULL,
+    tree TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    generation_ms REAL NOT NULL,
+    forked_from INTEGER,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    uses INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS trees_generator ON trees (generator, embedder);
+CREATE INDEX IF NOT EXISTS trees_created_at ON trees (created_at);
+"""
+
+
+# Negaciones y términos que invierten o acotan la pregunta (minúsculas, sin
+# tildes). Varios son palabras vacías para la búsqueda, pero no aquí.
+_POLARITY_TERMS = frozenset("""
+    no ni nunca jamas tampoco nada nadie ningun ninguno ninguna ningunos ningunas
+    sin contra excepto salvo menos mas solo
+""".split())
+
+
+def _root_terms(question: str) -> list:
+    return [term if term in _POLARITY_TERMS else stem(term)
+            for term in tokenize(question or "", keep=_POLARITY_TERMS)]
+
+
+def normalize_root_question(question: str) -> str:
+    """Forma normalizada de una pregunta raíz, la que se embebe."""
+    return " ".join(_root_terms(question))
+
+
+def _polarity(question: str) -> Counter:
+    return Counter(term for term in _root_terms(question) if term in _POLARITY_TERMS)
+
+
+class TreeMatch(NamedTuple):
+    """Árbol en caché para una pregunta parecida."""
+    id: int
+    question: str
+    similarity: float
+    generation_ms: float
+
+
+class InquiryTreeCache:
+    """
+    Caché de árboles de indagación por similitud de la pregunta raíz.
+    Es segura entre hilos, por lo que puede compartirse entre sesiones.
+    """
+
+    def __init__(self, path: Path, settings: Optional[Settings] = None,
+                 threshold: float = 0.9, ttl: Optional[float] = 30 * 24 * 3600,
+                 max_bytes: int = 32 * 1024 * 1024):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.settings = settings or get_settings()
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+        self.generator = json.dumps([
+            registry.default_name("llm", self.settings),
+            self.settings.openai_model,
+            self.settings.openai_temperature
+        ])
+        self.embedder = registry.default_name("embeddings", self.settings)
+        self._embeddings = None
+        # Sin las dependencias del modelo de embeddings, la caché no
+        # encuentra ni guarda árboles y el árbol se genera como siempre
+        self.available = True
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        # (data_version, ids, matriz) de los embeddings vigentes
+        self._matrix = None
+
+        self.hits = 0
+        self.misses = 0
+        self.reused = 0
+        self.forked = 0
+        self.time_saved_ms = 0.0
+        self.evictions = 0
+        self.embed_errors = 0
+
+    @classmethod
+    def from_settings(cls, settings: Optional[Settings] = None, **kwargs) -> "InquiryTreeCache":
+        """Caché en `DATA_DIR/trees.sqlite3` con el umbral y la vigencia configurados."""
+        settings = settings or get_settings()
+        kwargs.setdefault("threshold", settings.tree_cache_threshold)
+        kwargs.setdefault("ttl", settings.tree_cache_ttl)
+        return cls(settings.data_dir / "trees.sqlite3", settings=settings, **kwargs)
+
+    def close(self):
+        self._conn.close()
+
+    # ── Consulta ──────────────────────────────────────────────────────────────
+
+    def lookup(self, question: str, now: Optional[float] = None) -> Optional[TreeMatch]:
+        """
+        Árbol en caché más parecido a `question` que supere el umbral y tenga
+        sus mismas negaciones y términos de polaridad.
+        """
+        now = time.time() if now is None else now
+        vector = self._embed(question)
+        with self._lock:
+            ids, matrix = self._load_matrix(now)
+            if len(ids) and vector is not None and matrix.shape[1] == vector.shape[0]:
+                scores = matrix @ vector
+                polarity = _polarity(question)
+                for index in np.argsort(-scores, kind="stable"):
+                    if scores[index] < self.threshold:
+                        break
+                    row = self._conn.execute(
+                        "SELECT question, generation_ms FROM trees WHERE id = ? AND created_at >= ?",
+                        (ids[index], now - self.ttl if self.ttl else 0)
+                    ).fetchone()
+                    if row is not None and _polarity(row[0]) == polarity:
+                        self.hits += 1
+                        return TreeMatch(ids[index], row[0], round(float(scores[index]), 4), row[1])
+            self.misses += 1
+            return None
+
+    def reuse(self, match: TreeMatch, now: Optional[float] = None) -> Optional[dict]:
+        """
+        Árbol de `match` tal cual (con su pregunta raíz), en el formato de
+        `generate_inquiry_tree`. None si entretanto se ha eliminado.
+        """
+        tree = self._use(match, now)
+        if tree is not None:
+            self.reused += 1
+        return tree
+
+    def fork(self, match: TreeMatch, question: str, now: Optional[float] = None) -> Optional[dict]:
+        """
+        Copia del árbol de `match` con `question` como pregunta raíz. La copia
+        se guarda como un árbol propio para las preguntas parecidas a esta.
+        """
+        tree = self._use(match, now)
+        if tree is None:
+            return None
+        tree["root"] = question
+        self.put(question, tree, match.generation_ms, forked_from=match.id, now=now)
+        self.forked += 1
+        return tree
+
+    def _use(self, match: TreeMatch, now: Optional[float]) -> Optional[dict]:
+        now = time.time() if now is None else now
+        with self._lock:
+            row = self._conn.execute("SELECT tree FROM trees WHERE id = ?", (match.id,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE trees SET uses = uses + 1, last_used = ? WHERE id = ?", (now, match.id))
+            self.time_saved_ms += match.generation_ms
+        return json.loads(row[0])
+
+    # ── Inserción y expiración ────────────────────────────────────────────────
+
+    def put(self, question: str, tree: dict, generation_ms: float,
+            forked_from: Optional[int] = None, now: Optional[float] = None) -> Optional[int]:
+        """
+        Guarda el árbol generado para `question` y lo que costó generarlo.
+        Devuelve su id, o None si la pregunta no tiene términos que embeber
+        o no hay modelo de embeddings (o ha fallado).
+        """
+        now = time.time() if now is None else now
+        vector = self._embed(question)
+        if vector is None:
+            return None
+        data = json.dumps(tree, ensure_ascii=False)
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO trees (question, generator, embedder, embedding, tree, size, "
+                "generation_ms, forked_from, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (question, self.generator, self.embedder, vector.tobytes(), data,
+                 len(data.encode()), generation_ms, forked_from, now, now)
+            )
+            self._matrix = None
+            self._evict(now)
+        return cursor.lastrowid
+
+    def _evict(self, now: float):
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self.ttl:
+                self.evictions += self._conn.execute(
+                    "DELETE FROM trees WHERE created_at < ?", (now - self.ttl,)).rowcount
+            total, expired = 0, []
+            for tree_id, size in self._conn.execute(
+                    "SELECT id, size FROM trees ORDER BY last_used DESC"):
+                total += size
+                if total > self.max_bytes:
+                    expired.append((tree_id,))
+            self._conn.executemany("DELETE FROM trees WHERE id = ?", expired)
+            self.evictions += len(expired)
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    # ── Embeddings ────────────────────────────────────────────────────────────
+
+    def _embed(self, question: str) -> Optional[np.ndarray]:
+        text = normalize_root_question(question)
+        if not text or not self.available:
+            return None
+        try:
+            if self._embeddings is None:
+                self._embeddings = registry.get("embeddings", settings=self.settings)
+            vector = np.asarray(self._embeddings.embed_query(text), dtype=np.float32)
+        except ProviderNotAvailable:
+            self.available = False
+            return None
+        except Exception:
+            # Un fallo de red o de la API no debe impedir generar el árbol
+            self.embed_errors += 1
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def _load_matrix(self, now: float) -> tuple:
+        # La matriz se recarga si otro proceso escribió (data_version cambia
+        # con los commits de otras conexiones) o si lo hizo este (`put`)
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if self._matrix is None or self._matrix[0] != version:
+            rows = self._conn.execute(
+                "SELECT id, embedding FROM trees WHERE generator = ? AND embedder = ? "
+                "AND created_at >= ?",
+                (self.generator, self.embedder, now - self.ttl if self.ttl else 0)
+            ).fetchall()
+            ids = [row[0] for row in rows]
+            matrix = (np.vstack([np.frombuffer(row[1], dtype=np.float32) for row in rows])
+                      if rows else np.empty((0, 0), dtype=np.float32))
+            self._matrix = (version, ids, matrix)
+        return self._matrix[1], self._matrix[2]
+
+    def stats(self) -> dict:
+        """Contadores de aciertos, árboles servidos y tiempo ahorrado del proceso."""
+        lookups = self.hits + self.misses
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM trees").fetchone()
+        return {
+            "lookups": lookups,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "reused": self.reused,
+            "forked": self.forked,
+            "time_saved_s": round(self.time_saved_ms / 1000, 3),
+            "evictions": self.evictions,
+            "embed_errors": self.embed_errors,
+            "entries": entries,
+            "bytes": size
+        }
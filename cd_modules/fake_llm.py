@@ -0,0 +1,157 @@
+"""
+delibera-fake-llm — Servidor de modelo falso
+============================================
+Servidor HTTP local compatible con `/v1/chat/completions` de OpenAI que
+responde a las peticiones agrupadas de `cd_modules.core.llm_batch` sin red:
+perspectivas de demostración para cada subpregunta y subpreguntas genéricas
+para cada rama. Puede simular latencia, errores del servidor y nodos que
+faltan en la respuesta para probar los reintentos.
+
+Uso:
+    python -m cd_modules.fake_llm --port 8765 --drop-rate 0.2
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=fake streamlit run streamlit_app.py
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .core.contextual_generator import demo_perspectives
+
+
+def _fraction(*parts) -> float:
+    # Valor determinista en [0, 1) para decidir fallos simulados
+    digest = hashlib.sha256("|".join(map(str, parts)).encode()).digest()
+    return int.from_bytes(digest[:8], "big") / 2 ** 64
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    """
+    Servidor de modelo falso. `drop_rate` es la fracción de nodos que se
+    omiten la primera vez que se piden; `error_rate`, la de peticiones que
+    fallan con HTTP 500.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0), latency: float = 0.0,
+                 drop_rate: float = 0.0, error_rate: float = 0.0):
+        super().__init__(address, _Handler)
+        self.latency = latency
+        self.drop_rate = drop_rate
+        self.error_rate = error_rate
+        self.requests = 0
+        self.items = 0
+        self._attempts = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeLLMServer":
+        """Atiende peticiones en un hilo de fondo."""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self._thread is not None:
+            self.shutdown()
+            self._thread.join()
+        super().__exit__(*exc)
+
+    def respond(self, request: dict) -> dict:
+        content = json.loads(request["messages"][-1]["content"])
+        with self._lock:
+            self.requests += 1
+            self.items += len(content["subpreguntas"])
+            request_number = self.requests
+        if self.latency:
+            time.sleep(self.latency)
+        if _fraction("error", request_number) < self.error_rate:
+            raise RuntimeError("Error simulado del modelo")
+
+        results = {}
+        for item in content["subpreguntas"]:
+            with self._lock:
+                attempt = self._attempts[item["id"]] = self._attempts.get(item["id"], 0) + 1
+            if attempt == 1 and _fraction("drop", item["id"]) < self.drop_rate:
+                continue
+            if content["tarea"] == "subpreguntas":
+                results[item["id"]] = [
+                    {"question": f"¿Qué fuentes normativas responden a: {item['question']}", "type": "factual"},
+                    {"question": f"¿Qué posiciones se oponen en: {item['question']}", "type": "argumentative"}
+                ]
+            else:
+                results[item["id"]] = demo_perspectives(item["id"])
+
+        text = json.dumps({"resultados": results}, ensure_ascii=False)
+        prompt = sum(len(m["content"]) for m in request["messages"]) // 4
+        return {
+            "id": f"fake-{request_number}",
+            "object": "chat.completion",
+            "model": request.get("model", "fake"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": text}}],
+            "usage": {"prompt_tokens": prompt, "completion_tokens": len(text) // 4,
+                      "total_tokens": prompt + len(text) // 4}
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            payload = self.server.respond(json.loads(self.rfile.read(length)))
+        except Exception as exc:
+            self.send_error(500, str(exc))
+            return
+        body = json.dumps(payload, ensure_ascii=False).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="delibera-fake-llm",
+        description="Servidor de modelo falso compatible con OpenAI para trabajar sin red."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Segundos por petición")
+    parser.add_argument("--drop-rate", type=float, default=0.0,
+                        help="Fracción de nodos omitidos en su primera petición")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Fracción de peticiones que responden HTTP 500")
+    args = parser.parse_args(argv)
+
+    server = FakeLLMServer((args.host, args.port), args.latency, args.drop_rate, args.error_rate)
+    print(f"Modelo falso en {server.base_url}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
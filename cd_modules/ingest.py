@@ -0,0 +1,363 @@
+"""
+delibera-ingest — Ingesta del corpus de perspectivas
+====================================================
+Recorre un directorio de normativa, resoluciones y doctrina (PDF, DOCX, TXT
+y Markdown), extrae y trocea el texto en streaming y lo añade al índice de
+fuentes del Generador Contextual. No importa Streamlit.
+
+- Los archivos se procesan en un pool de procesos con un número acotado de
+  archivos en vuelo.
+- Cada fragmento se identifica por el hash de su contenido normalizado, de
+  modo que los duplicados (en el mismo archivo, entre archivos o entre
+  ejecuciones) se indexan una sola vez.
+- Cada fragmento se etiqueta con un tipo de perspectiva (legal, eu_law,
+  case_law, doctrine...) según la ruta y el texto, o con `--type`.
+- Las ejecuciones son incrementales: el estado (`ingest_state.json`, junto
+  al índice) guarda el hash y los ids de los fragmentos de cada archivo. Los
+  no modificados se omiten; de los modificados y los borrados se retiran del
+  índice los fragmentos que ya no aparecen en ningún archivo.
+
+Uso:
+    python -m cd_modules.ingest corpus/
+    python -m cd_modules.ingest --workers 8 --type case_law sentencias/
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Tuple
+
+from .config import get_settings
+from .core.retrieval import PERSPECTIVE_TYPES, SourceIndex
+
+
+SUPPORTED_SUFFIXES = (".pdf", ".docx", ".txt", ".md")
+
+STATE_NAME = "ingest_state.json"
+
+# Tamaño objetivo de un fragmento y mínimo para indexarlo (en caracteres)
+CHUNK_SIZE = 1200
+MIN_CHUNK_SIZE = 80
+
+_HASH_BLOCK = 1024 * 1024
+
+# Tarea para un proceso: (ruta, hash conocido, tipo forzado)
+Task = Tuple[str, Optional[str], Optional[str]]
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# EXTRACCIÓN
+# ══════════════════════════════════════════════════════════════════════════════
+
+def file_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def iter_text(path: Path) -> Iterator[str]:
+    """Bloques de texto del documento (páginas o párrafos), en orden."""
+    suffix = path.suffix.lower()
+    if suffix == ".pdf":
+        from pypdf import PdfReader
+        for page in PdfReader(path).pages:
+            yield page.extract_text() or ""
+    elif suffix == ".docx":
+        import docx
+        for paragraph in docx.Document(str(path)).paragraphs:
+            yield paragraph.text
+    else:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            yield from f
+
+
+def document_title(path: Path) -> str:
+    """Título del documento: metadatos del PDF/DOCX o nombre del archivo."""
+    title = None
+    try:
+        if path.suffix.lower() == ".pdf":
+            from pypdf import PdfReader
+            metadata = PdfReader(path).metadata
+            title = metadata.title if metadata else None
+        elif path.suffix.lower() == ".docx":
+            import docx
+            title = docx.Document(str(path)).core_properties.title
+    except Exception:
+        title = None
+    return (title or path.stem.replace("_", " ")).strip()
+
+
+def iter_chunks(blocks: Iterable[str], chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """
+    Agrupa los párrafos en fragmentos de unos `chunk_size` caracteres sin
+    cortar párrafos salvo que superen por sí solos el tamaño (entonces se
+    cortan por frases). Solo se mantiene en memoria el fragmento en curso.
+    """
+    current = []
+    length = 0
+    for block in blocks:
+        for paragraph in re.split(r"\n\s*\n", block):
+            paragraph = " ".join(paragraph.split())
+            if not paragraph:
+                continue
+            for piece in _split_long(paragraph, chunk_size):
+                if length and length + len(piece) > chunk_size:
+                    yield " ".join(current)
+                    current, length = [], 0
+                current.append(piece)
+                length += len(piece) + 1
+    if current:
+        yield " ".join(current)
+
+
+def _split_long(paragraph: str, chunk_size: int) -> Iterator[str]:
+    if len(paragraph) <= chunk_size:
+        yield paragraph
+        return
+    piece = ""
+    for sentence in re.split(r"(?<=[.;:])\s+", paragraph):
+        while len(sentence) > chunk_size:
+            yield sentence[:chunk_size]
+            sentence = sentence[chunk_size:]
+        if piece and len(piece) + len(sentence) + 1 > chunk_size:
+            yield piece
+            piece = ""
+        piece = f"{piece} {sentence}" if piece else sentence
+    if piece:
+        yield piece
+
+
+def chunk_id(text: str) -> str:
+    """Identificador del fragmento: hash de su contenido normalizado."""
+    return hashlib.sha256(" ".join(text.casefold().split()).encode()).hexdigest()
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# CLASIFICACIÓN
+# ══════════════════════════════════════════════════════════════════════════════
+
+# (tipo, patrón sobre la ruta)
+_PATH_RULES = (
+    ("eu_law", re.compile(r"(^|[/_\- ])(ue|eu|tjue|cjeu|directivas?|reglamentos?[_\- ]ue)([/_\- .]|$)", re.I)),
+    ("case_law", re.compile(r"jurisprudencia|sentencias?|resoluciones|autos|case[_\- ]?law|\bsts\b|\bsap\b", re.I)),
+    ("legal", re.compile(r"legislaci[oó]n|normativa|leyes|estatutos|statutes|\bboe\b", re.I)),
+    ("doctrine", re.compile(r"doctrina|art[ií]culos|monograf[ií]as|comentarios|doctrine", re.I)),
+    ("critical", re.compile(r"cr[ií]tic", re.I)),
+    ("analysis", re.compile(r"an[aá]lisis|informes|impacto", re.I)),
+)
+
+# (tipo, patrón sobre el texto)
+_TEXT_RULES = (
+    ("eu_law", re.compile(r"\b(Directiva|Reglamento) \(UE\)|\bTJUE\b|Tribunal de Justicia de la Uni[oó]n|\bSTJUE\b")),
+    ("case_law", re.compile(r"\b(STS|SAP|STC|SSTS)\b|\bFALLAMOS\b|\bFundamentos? de [Dd]erecho\b|\bSentencia\b")),
+    ("legal", re.compile(r"\bReal Decreto\b|\bLey (Org[aá]nica )?\d+/\d{4}\b|\bBOE\b|^\s*Art[ií]culo \d+", re.M)),
+)
+
+
+def classify(path: Path, text: str) -> str:
+    """Tipo de perspectiva del fragmento: primero por ruta, luego por texto."""
+    location = path.as_posix()
+    for source_type, pattern in _PATH_RULES:
+        if pattern.search(location):
+            return source_type
+    for source_type, pattern in _TEXT_RULES:
+        if pattern.search(text):
+            return source_type
+    return "doctrine"
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# PROCESAMIENTO
+# ══════════════════════════════════════════════════════════════════════════════
+
+def process_file(task: Task) -> dict:
+    """
+    Extrae y trocea un archivo. Si su hash coincide con el conocido se
+    devuelve sin fragmentos (`unchanged`).
+    """
+    path, known_hash, forced_type = task
+    path = Path(path)
+    try:
+        digest = file_hash(path)
+        if digest == known_hash:
+            return {"path": str(path), "hash": digest, "unchanged": True, "chunks": []}
+        title = document_title(path)
+        chunks = []
+        seen = set()
+        for text in iter_chunks(iter_text(path)):
+            if len(text) < MIN_CHUNK_SIZE:
+                continue
+            identifier = chunk_id(text)
+            if identifier in seen:
+                continue
+            seen.add(identifier)
+            chunks.append({
+                "id": identifier,
+                "source": title,
+                "type": forced_type or classify(path, text),
+                "content": text
+            })
+    except Exception as exc:
+        return {"path": str(path), "error": f"{type(exc).__name__}: {exc}", "chunks": []}
+    return {"path": str(path), "hash": digest, "unchanged": False, "chunks": chunks}
+
+
+def iter_documents(paths: Iterable[Path]) -> Iterator[Path]:
+    for path in map(Path, paths):
+        if path.is_dir():
+            for file in sorted(path.rglob("*")):
+                if file.is_file() and file.suffix.lower() in SUPPORTED_SUFFIXES:
+                    yield file
+        elif path.suffix.lower() in SUPPORTED_SUFFIXES:
+            yield path
+
+
+def process_stream(tasks: Iterable[Task], workers: int = 0) -> Iterator[dict]:
+    """Procesa archivos y entrega los resultados según terminan."""
+    if workers <= 1:
+        for task in tasks:
+            yield process_file(task)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for task in tasks:
+            pending.add(pool.submit(process_file, task))
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in pending:
+            yield future.result()
+
+
+def load_state(path: Path) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(path: Path, state: dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, ensure_ascii=False, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def ingest(paths: Iterable[Path], index: SourceIndex, state_path: Path, workers: int = 0,
+           batch_size: int = 256, forced_type: Optional[str] = None,
+           errors=None) -> dict:
+    """
+    Ingiere los documentos de `paths` en `index` de forma incremental.
+    Los fragmentos ya vistos en esta ejecución se descartan antes de indexar;
+    los de ejecuciones anteriores los ignora el índice por su id.
+
+    El estado cuenta cuántos archivos contienen cada fragmento: al cambiar o
+    desaparecer un archivo, sus fragmentos antiguos que ya no figuran en
+    ninguno se borran del índice (los de estados anteriores a `ids` no se
+    conocen y quedan hasta que su archivo se reingiere).
+    Devuelve el resumen de la ejecución.
+    """
+    start = time.perf_counter()
+    state = load_state(state_path)
+    files = dict.fromkeys(str(p) for p in iter_documents(paths))
+    tasks = ((path, state.get(path, {}).get("hash"), forced_type) for path in files)
+    summary = {"files": len(files), "unchanged": 0, "ingested": 0, "failed": 0,
+               "chunks": 0, "duplicates": 0, "removed": 0}
+    seen = set()
+    references = Counter(chunk for entry in state.values() for chunk in entry.get("ids", ()))
+
+    def release(chunks: Iterable[str]):
+        # Borra del índice los fragmentos que ya no contiene ningún archivo
+        references.subtract(chunks)
+        stale = [chunk for chunk in chunks if references[chunk] <= 0]
+        for chunk in stale:
+            del references[chunk]
+        summary["removed"] += index.delete(stale)
+
+    # Los archivos que ya no existen dejan de figurar en el estado
+    for path in [path for path in state if path not in files and not Path(path).exists()]:
+        release(state.pop(path).get("ids", []))
+
+    def records() -> Iterator[dict]:
+        for result in process_stream(tasks, workers):
+            if "error" in result:
+                summary["failed"] += 1
+                if errors is not None:
+                    errors.write(json.dumps(result, ensure_ascii=False) + "\n")
+                continue
+            if result["unchanged"]:
+                summary["unchanged"] += 1
+                continue
+            ids = [chunk["id"] for chunk in result["chunks"]]
+            references.update(ids)
+            release(state.get(result["path"], {}).get("ids", []))
+            added = 0
+            for chunk in result["chunks"]:
+                if chunk["id"] in seen:
+                    summary["duplicates"] += 1
+                    continue
+                seen.add(chunk["id"])
+                added += 1
+                yield chunk
+            summary["ingested"] += 1
+            summary["chunks"] += added
+            state[result["path"]] = {"hash": result["hash"], "chunks": added, "ids": ids}
+
+    if files:
+        index.add(records(), batch_size=batch_size)
+    save_state(state_path, state)
+
+    summary["elapsed"] = round(time.perf_counter() - start, 3)
+    return summary
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# CLI
+# ══════════════════════════════════════════════════════════════════════════════
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="delibera-ingest",
+        description="Ingiere normativa, resoluciones y doctrina en el índice de fuentes."
+    )
+    parser.add_argument("paths", nargs="+", help="Directorios o documentos (PDF, DOCX, TXT, MD)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Procesos de extracción (1 = sin pool)")
+    parser.add_argument("--batch-size", type=int, default=256,
+                        help="Fragmentos por lote de embeddings")
+    parser.add_argument("--type", choices=PERSPECTIVE_TYPES, dest="forced_type",
+                        help="Tipo de perspectiva para todos los fragmentos")
+    parser.add_argument("--backend", help="Almacén vectorial (por defecto, el configurado)")
+    parser.add_argument("--state", help=f"Archivo de estado (por defecto, {STATE_NAME} junto al índice)")
+    args = parser.parse_args(argv)
+
+    settings = get_settings()
+    index = SourceIndex.from_settings(settings, backend=args.backend)
+    state_path = Path(args.state) if args.state else settings.chroma_persist_dir / STATE_NAME
+
+    summary = ingest(args.paths, index, state_path, args.workers, args.batch_size,
+                     args.forced_type, errors=sys.stdout)
+
+    print(f"{summary['files']} archivos · {summary['ingested']} ingeridos · "
+          f"{summary['unchanged']} sin cambios · {summary['failed']} fallos · "
+          f"{summary['chunks']} fragmentos ({summary['duplicates']} duplicados, "
+          f"{summary['removed']} retirados) · "
+          f"{summary['elapsed']} s", file=sys.stderr)
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
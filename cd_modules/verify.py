@@ -0,0 +1,254 @@
+"""
+delibera-verify — Verificación de certificados DELIBERA
+=======================================================
+Recalcula en bloque el hash de firma de certificados exportados y comprueba
+pruebas de inclusión de anotaciones. No importa Streamlit.
+
+Los certificados se leen en streaming desde archivos, directorios (de forma
+recursiva) o tarballs (.tar, .tar.gz, .tgz), se verifican en un pool de
+procesos y las discrepancias se emiten como JSONL. Al terminar se informa
+del rendimiento en certificados por segundo.
+
+Uso:
+    python -m cd_modules.verify certificados/ lote.tar.gz > discrepancias.jsonl
+    python -m cd_modules.verify --all --workers 8 certificados/
+    python -m cd_modules.verify --prove q3.1 certificado.json > prueba.json
+    python -m cd_modules.verify --check-proof prueba.json --root <raíz>
+    python -m cd_modules.verify --check-proof prueba.json certificado.json
+
+Una prueba se comprueba siempre frente a una raíz de confianza: la indicada
+con `--root` o la de un certificado cuya firma se verifica antes.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tarfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, TextIO, Tuple, Union
+
+from .core.signature import (
+    annotation_proof,
+    recompute_certificate_hash,
+    verify_certificate,
+    verify_inclusion_proof,
+)
+
+
+_TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+# Un certificado a verificar: nombre y, si viene de un tarball, su contenido
+Item = Tuple[str, Optional[bytes]]
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# FUENTES
+# ══════════════════════════════════════════════════════════════════════════════
+
+def _is_tarball(path: Path) -> bool:
+    return path.name.endswith(_TAR_SUFFIXES)
+
+
+def iter_sources(paths: Iterable[Union[str, Path]]) -> Iterator[Item]:
+    """
+    Recorre los certificados de las rutas indicadas. Los archivos sueltos se
+    entregan por ruta (los lee el proceso que los verifica); los miembros de
+    un tarball se leen en modo streaming y se entregan con su contenido.
+    """
+    for path in map(Path, paths):
+        if path.is_dir():
+            for file in sorted(path.rglob("*")):
+                if file.is_file() and _is_tarball(file):
+                    yield from _iter_tarball(file)
+                elif file.is_file() and file.suffix == ".json":
+                    yield str(file), None
+        elif _is_tarball(path):
+            yield from _iter_tarball(path)
+        else:
+            yield str(path), None
+
+
+def _iter_tarball(path: Path) -> Iterator[Item]:
+    with tarfile.open(path, mode="r|*") as tar:
+        for member in tar:
+            if member.isfile() and member.name.endswith(".json"):
+                yield f"{path}:{member.name}", tar.extractfile(member).read()
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# VERIFICACIÓN
+# ══════════════════════════════════════════════════════════════════════════════
+
+def verify_item(item: Item) -> dict:
+    """Verifica un certificado y devuelve el resultado como registro JSONL."""
+    source, data = item
+    try:
+        if data is None:
+            with open(source, "rb") as f:
+                data = f.read()
+        certificate = json.loads(data)
+        expected = certificate["firma"]["hash"]
+        computed = recompute_certificate_hash(certificate)
+    except (OSError, ValueError, KeyError, TypeError, AttributeError) as exc:
+        return {"source": source, "ok": False, "error": f"{type(exc).__name__}: {exc}"}
+    return {
+        "source": source,
+        "ok": computed == expected,
+        "expected": expected,
+        "computed": computed,
+        "scheme": certificate["firma"].get("esquema", "sha256-v1")
+    }
+
+
+def _verify_batch(batch: list) -> list:
+    return [verify_item(item) for item in batch]
+
+
+def _batches(items: Iterator[Item], size: int) -> Iterator[list]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def verify_stream(items: Iterable[Item], workers: int = 0,
+                  batch_size: int = 64) -> Iterator[dict]:
+    """
+    Verifica certificados y entrega los resultados según terminan.
+    Con `workers` > 1 se usa un pool de procesos con un número acotado de
+    lotes en vuelo, de modo que la memoria no crece con el tamaño del lote.
+    """
+    batches = _batches(iter(items), batch_size)
+    if workers <= 1:
+        for batch in batches:
+            yield from _verify_batch(batch)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for batch in batches:
+            pending.add(pool.submit(_verify_batch, batch))
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+        for future in pending:
+            yield from future.result()
+
+
+def verify_files(paths: Iterable[Union[str, Path]], output: TextIO, workers: int = 0,
+                 batch_size: int = 64, report_all: bool = False) -> dict:
+    """
+    Verifica los certificados de `paths` y escribe en `output` un registro
+    JSONL por discrepancia (o por certificado con `report_all`).
+    Devuelve el resumen con el rendimiento obtenido.
+    """
+    start = time.perf_counter()
+    total = failures = 0
+    for result in verify_stream(iter_sources(paths), workers, batch_size):
+        total += 1
+        failures += not result["ok"]
+        if report_all or not result["ok"]:
+            output.write(json.dumps(result, ensure_ascii=False) + "\n")
+    elapsed = time.perf_counter() - start
+    return {
+        "certificates": total,
+        "failures": failures,
+        "elapsed": round(elapsed, 3),
+        "certificates_per_second": round(total / elapsed, 1) if elapsed > 0 else 0.0
+    }
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# CLI
+# ══════════════════════════════════════════════════════════════════════════════
+
+def _load(path: Path) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _signed_root(certificate: dict) -> Optional[str]:
+    """Raíz de Merkle de un certificado, solo si su firma es válida."""
+    if not verify_certificate(certificate):
+        return None
+    return certificate["firma"].get("raiz_merkle")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="delibera-verify",
+        description="Verifica la firma epistémica de certificados DELIBERA."
+    )
+    parser.add_argument("paths", nargs="*",
+                        help="Certificados JSON, directorios o tarballs")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Procesos de verificación (1 = sin pool)")
+    parser.add_argument("--batch-size", type=int, default=64,
+                        help="Certificados por tarea enviada al pool")
+    parser.add_argument("--all", action="store_true", dest="report_all",
+                        help="Emite un registro por certificado, no solo las discrepancias")
+    parser.add_argument("-o", "--output", help="Archivo JSONL de salida (por defecto, stdout)")
+    parser.add_argument("--prove", metavar="NODO",
+                        help="Emite la prueba de inclusión de la anotación de un nodo")
+    parser.add_argument("--check-proof", metavar="PRUEBA",
+                        help="Verifica una prueba de inclusión en JSON frente a --root "
+                             "o a la raíz firmada del certificado indicado")
+    parser.add_argument("--root", help="Raíz de Merkle esperada al verificar una prueba")
+    args = parser.parse_args(argv)
+
+    if args.check_proof:
+        root = args.root
+        if not root:
+            if len(args.paths) != 1:
+                parser.error("--check-proof requiere --root o un único certificado")
+            root = _signed_root(_load(Path(args.paths[0])))
+            if root is None:
+                print("FALLO")
+                print("La firma del certificado no es válida", file=sys.stderr)
+                return 1
+        elif args.paths:
+            parser.error("--check-proof admite --root o un certificado, no ambos")
+        ok = verify_inclusion_proof(_load(Path(args.check_proof)), root)
+        print("OK" if ok else "FALLO")
+        return 0 if ok else 1
+
+    if args.prove:
+        if len(args.paths) != 1:
+            parser.error("--prove requiere un único certificado")
+        try:
+            proof = annotation_proof(_load(Path(args.paths[0])), args.prove)
+        except (OSError, ValueError, KeyError, IndexError, TypeError) as exc:
+            # KeyError: el nodo no tiene anotación firmada (o falta la firma)
+            message = exc.args[0] if isinstance(exc, KeyError) and exc.args else exc
+            print(f"{parser.prog}: error: {message}", file=sys.stderr)
+            return 1
+        json.dump(proof, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+        return 0
+
+    if not args.paths:
+        parser.error("indique al menos un certificado, directorio o tarball")
+
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        summary = verify_files(args.paths, output, args.workers, args.batch_size, args.report_all)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    print(f"{summary['certificates']} certificados · {summary['failures']} fallos · "
+          f"{summary['elapsed']} s · {summary['certificates_per_second']} cert/s",
+          file=sys.stderr)
+    return 1 if summary["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -15,11 +15,38 @@ El experto co-construye conocimiento con la IA y firma epistémicamente su traba
 """
 
 import streamlit as st
-import json
-import hashlib
 from datetime import datetime
+from pathlib import Path
 from typing import Optional
+import hashlib
+import html
+import json
 import os
+import time
+
+from cd_modules import (
+    EroteticEvaluator,
+    InquiryNode,
+    InquiryTree,
+    InquiryTreeCache,
+    Instruments,
+    PerspectiveCache,
+    DeliberationArchive,
+    ReasoningTracker,
+    SessionConflict,
+    SessionStore,
+    build_certificate,
+    certificate_tempfile,
+    default_perspective_provider,
+    expand_inquiry_tree,
+    generate_inquiry_tree,
+    generate_node_perspectives,
+    run_prefetch,
+    sign_deliberation,
+)
+from cd_modules.config import get_settings
+from cd_modules.core.retrieval import PERSPECTIVE_TYPES
+from cd_modules.core.session_store import is_session_id, new_session_id
 
 # ══════════════════════════════════════════════════════════════════════════════
 # CONFIGURACIÓN DE PÁGINA Y ESTILOS
@@ -32,379 +59,111 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-# CSS personalizado para estética editorial-jurídica
-st.markdown("""
-<style>
-    /* ═══ TIPOGRAFÍA DISTINTIVA ═══ */
-    @import url('https://fonts.googleapis.com/css2?family=Cormorant+Garamond:ital,wght@0,400;0,600;0,700;1,400&family=JetBrains+Mono:wght@400;500&family=Inter:wght@300;400;500;600&display=swap');
-    
-    /* ═══ VARIABLES DE DISEÑO ═══ */
-    :root {
-        --color-ink: #1a1a1a;
-        --color-paper: #faf9f7;
-        --color-accent: #8b4513;
-        --color-accent-light: #d4a574;
-        --color-sage: #5d6d5e;
-        --color-muted: #6b6b6b;
-        --color-border: #e5e2dd;
-        --color-highlight: #fff8e7;
-        --font-display: 'Cormorant Garamond', Georgia, serif;
-        --font-body: 'Inter', -apple-system, sans-serif;
-        --font-mono: 'JetBrains Mono', monospace;
-    }
-    
-    /* ═══ RESET Y BASE ═══ */
-    .stApp {
-        background: linear-gradient(180deg, var(--color-paper) 0%, #f5f3ef 100%);
-    }
-    
-    .main .block-container {
-        max-width: 1200px;
-        padding: 2rem 3rem 4rem;
-    }
-    
-    /* ═══ HEADER PRINCIPAL ═══ */
-    .delibera-header {
-        text-align: center;
-        padding: 3rem 0 2rem;
-        border-bottom: 1px solid var(--color-border);
-        margin-bottom: 3rem;
-    }
-    
-    .delibera-logo {
-        font-family: var(--font-display);
-        font-size: 3.5rem;
-        font-weight: 700;
-        letter-spacing: 0.15em;
-        color: var(--color-ink);
-        margin: 0;
-        line-height: 1;
-    }
-    
-    .delibera-tagline {
-        font-family: var(--font-display);
-        font-size: 1.1rem;
-        font-style: italic;
-        color: var(--color-muted);
-        margin-top: 0.75rem;
-        letter-spacing: 0.05em;
-    }
-    
-    /* ═══ SECCIONES ═══ */
-    .section-title {
-        font-family: var(--font-display);
-        font-size: 1.5rem;
-        font-weight: 600;
-        color: var(--color-ink);
-        margin: 2.5rem 0 1rem;
-        padding-bottom: 0.5rem;
-        border-bottom: 2px solid var(--color-accent);
-        display: inline-block;
-    }
-    
-    .section-number {
-        font-family: var(--font-mono);
-        font-size: 0.75rem;
-        color: var(--color-accent);
-        letter-spacing: 0.1em;
-        display: block;
-        margin-bottom: 0.25rem;
-    }
-    
-    /* ═══ TARJETAS DE INDAGACIÓN ═══ */
-    .inquiry-card {
-        background: white;
-        border: 1px solid var(--color-border);
-        border-radius: 4px;
-        padding: 1.5rem 2rem;
-        margin: 1rem 0;
-        box-shadow: 0 2px 8px rgba(0,0,0,0.04);
-        transition: all 0.2s ease;
-    }
-    
-    .inquiry-card:hover {
-        box-shadow: 0 4px 16px rgba(0,0,0,0.08);
-        border-color: var(--color-accent-light);
-    }
-    
-    .inquiry-question {
-        font-family: var(--font-display);
-        font-size: 1.25rem;
-        color: var(--color-ink);
-        margin-bottom: 1rem;
-        line-height: 1.4;
-    }
-    
-    .inquiry-meta {
-        font-family: var(--font-mono);
-        font-size: 0.7rem;
-        color: var(--color-muted);
-        letter-spacing: 0.05em;
-        text-transform: uppercase;
-    }
-    
-    /* ═══ PANEL DE PERSPECTIVAS ═══ */
-    .perspective-panel {
-        background: var(--color-highlight);
-        border-left: 3px solid var(--color-accent);
-        padding: 1.25rem 1.5rem;
-        margin: 1rem 0;
-        font-family: var(--font-body);
-        font-size: 0.95rem;
-        line-height: 1.7;
-    }
-    
-    .perspective-label {
-        font-family: var(--font-mono);
-        font-size: 0.65rem;
-        color: var(--color-accent);
-        letter-spacing: 0.15em;
-        text-transform: uppercase;
-        margin-bottom: 0.5rem;
-        display: block;
-    }
-    
-    /* ═══ MÉTRICAS EEE ═══ */
-    .eee-container {
-        background: white;
-        border: 1px solid var(--color-border);
-        border-radius: 4px;
-        padding: 1.5rem;
-        margin: 1.5rem 0;
-    }
-    
-    .eee-title {
-        font-family: var(--font-display);
-        font-size: 1rem;
-        font-weight: 600;
-        color: var(--color-ink);
-        margin-bottom: 1rem;
-    }
-    
-    .eee-metric {
-        display: flex;
-        justify-content: space-between;
-        align-items: center;
-        padding: 0.5rem 0;
-        border-bottom: 1px solid var(--color-border);
-    }
-    
-    .eee-metric:last-child {
-        border-bottom: none;
-    }
-    
-    .eee-label {
-        font-family: var(--font-body);
-        font-size: 0.85rem;
-        color: var(--color-muted);
-    }
-    
-    .eee-value {
-        font-family: var(--font-mono);
-        font-size: 0.9rem;
-        font-weight: 500;
-        color: var(--color-sage);
-    }
-    
-    .eee-score {
-        font-family: var(--font-display);
-        font-size: 2.5rem;
-        font-weight: 700;
-        color: var(--color-sage);
-        text-align: center;
-        margin: 1rem 0;
-    }
-    
-    /* ═══ FIRMA EPISTÉMICA ═══ */
-    .signature-panel {
-        background: linear-gradient(135deg, #2d2d2d 0%, #1a1a1a 100%);
-        color: white;
-        border-radius: 4px;
-        padding: 2rem;
-        margin: 2rem 0;
-    }
-    
-    .signature-title {
-        font-family: var(--font-display);
-        font-size: 1.25rem;
-        font-weight: 600;
-        color: white;
-        margin-bottom: 0.5rem;
-    }
-    
-    .signature-subtitle {
-        font-family: var(--font-body);
-        font-size: 0.85rem;
-        color: rgba(255,255,255,0.7);
-        margin-bottom: 1.5rem;
-    }
-    
-    .signature-hash {
-        font-family: var(--font-mono);
-        font-size: 0.7rem;
-        color: var(--color-accent-light);
-        background: rgba(255,255,255,0.1);
-        padding: 0.75rem 1rem;
-        border-radius: 2px;
-        word-break: break-all;
-        margin-top: 1rem;
-    }
-    
-    .signature-timestamp {
-        font-family: var(--font-mono);
-        font-size: 0.7rem;
-        color: rgba(255,255,255,0.5);
-        margin-top: 0.75rem;
-    }
-    
-    /* ═══ ÁRBOL DE DELIBERACIÓN ═══ */
-    .tree-node {
-        position: relative;
-        padding-left: 1.5rem;
-        margin: 0.75rem 0;
-    }
-    
-    .tree-node::before {
-        content: '';
-        position: absolute;
-        left: 0;
-        top: 0.6rem;
-        width: 8px;
-        height: 8px;
-        border-radius: 50%;
-        background: var(--color-accent);
-    }
-    
-    .tree-node.validated::before {
-        background: var(--color-sage);
-    }
-    
-    .tree-node.pending::before {
-        background: var(--color-border);
-        border: 2px solid var(--color-accent);
-    }
-    
-    .tree-connector {
-        position: absolute;
-        left: 3px;
-        top: 1rem;
-        width: 2px;
-        height: calc(100% + 0.5rem);
-        background: var(--color-border);
-    }
-    
-    /* ═══ BOTONES ═══ */
-    .stButton > button {
-        font-family: var(--font-body) !important;
-        font-weight: 500 !important;
-        letter-spacing: 0.025em !important;
-        border-radius: 2px !important;
-        padding: 0.6rem 1.5rem !important;
-        transition: all 0.2s ease !important;
-    }
-    
-    .stButton > button[kind="primary"] {
-        background: var(--color-ink) !important;
-        color: white !important;
-        border: none !important;
-    }
-    
-    .stButton > button[kind="primary"]:hover {
-        background: var(--color-accent) !important;
-    }
-    
-    /* ═══ INPUTS ═══ */
-    .stTextArea textarea, .stTextInput input {
-        font-family: var(--font-body) !important;
-        border-radius: 2px !important;
-        border-color: var(--color-border) !important;
-    }
-    
-    .stTextArea textarea:focus, .stTextInput input:focus {
-        border-color: var(--color-accent) !important;
-        box-shadow: 0 0 0 1px var(--color-accent) !important;
-    }
-    
-    /* ═══ TABS ═══ */
-    .stTabs [data-baseweb="tab-list"] {
-        gap: 0;
-        border-bottom: 1px solid var(--color-border);
-    }
-    
-    .stTabs [data-baseweb="tab"] {
-        font-family: var(--font-body);
-        font-size: 0.85rem;
-        font-weight: 500;
-        letter-spacing: 0.025em;
-        padding: 0.75rem 1.5rem;
-        color: var(--color-muted);
-        border-bottom: 2px solid transparent;
-        background: transparent;
-    }
-    
-    .stTabs [aria-selected="true"] {
-        color: var(--color-ink) !important;
-        border-bottom-color: var(--color-accent) !important;
-        background: transparent !important;
-    }
-    
-    /* ═══ EXPANDER ═══ */
-    .streamlit-expanderHeader {
-        font-family: var(--font-body);
-        font-size: 0.9rem;
-        font-weight: 500;
-        color: var(--color-ink);
-    }
-    
-    /* ═══ DIVIDERS ═══ */
-    .section-divider {
-        height: 1px;
-        background: var(--color-border);
-        margin: 3rem 0;
-    }
-    
-    /* ═══ SIDEBAR ═══ */
-    [data-testid="stSidebar"] {
-        background: #2d2d2d;
-    }
-    
-    [data-testid="stSidebar"] .stMarkdown {
-        color: rgba(255,255,255,0.9);
-    }
-    
-    /* ═══ ANIMACIONES ═══ */
-    @keyframes fadeIn {
-        from { opacity: 0; transform: translateY(10px); }
-        to { opacity: 1; transform: translateY(0); }
-    }
-    
-    .animate-in {
-        animation: fadeIn 0.4s ease-out;
-    }
-    
-    /* ═══ RESPONSIVE ═══ */
-    @media (max-width: 768px) {
-        .delibera-logo { font-size: 2.5rem; }
-        .main .block-container { padding: 1rem 1.5rem; }
-    }
-</style>
-""", unsafe_allow_html=True)
+
+@st.cache_resource
+def get_instruments() -> Instruments:
+    """Tiempos por ejecución del proceso (activos con DELIBERA_DEBUG o DELIBERA_METRICS_PATH)."""
+    return Instruments.from_settings()
+
+
+# Los tramos de las funciones decoradas se acumulan por ejecución del script;
+# desactivada la instrumentación, el decorador devuelve la función tal cual
+instruments = get_instruments()
+
+
+# Tema editorial-jurídico: hoja de estilos estática en assets/, servida una
+# sola vez por la ruta de componentes de Streamlit. En cada ejecución solo se
+# envía el enlace (versionado con el hash del contenido para invalidar la
+# caché del navegador cuando cambia).
+ASSETS_DIR = Path(__file__).resolve().parent / "assets"
+THEME_STYLESHEET = "delibera.css"
+
+
+@st.cache_resource
+def theme_link(mtime_ns: int) -> str:
+    """Registra `assets/` como recurso estático y devuelve el `<link>` del tema."""
+    from streamlit.components.v1 import declare_component
+
+    assets = declare_component("delibera_assets", path=str(ASSETS_DIR))
+    digest = hashlib.sha256((ASSETS_DIR / THEME_STYLESHEET).read_bytes()).hexdigest()[:12]
+    return (f'<link rel="stylesheet" '
+            f'href="component/{assets.name}/{THEME_STYLESHEET}?v={digest}">')
+
+
+@instruments.timed()
+def inject_theme():
+    """Envía el enlace a la hoja de estilos del tema."""
+    st.markdown(theme_link((ASSETS_DIR / THEME_STYLESHEET).stat().st_mtime_ns),
+                unsafe_allow_html=True)
 
 
 # ══════════════════════════════════════════════════════════════════════════════
 # ESTADO DE LA APLICACIÓN
 # ══════════════════════════════════════════════════════════════════════════════
 
+# Nodos visibles por página del árbol de indagación
+TREE_PAGE_SIZE = 25
+
+# Campos que se guardan en el almacén de sesiones: la deliberación continúa
+# tras reiniciar el proceso o en otro worker (la URL lleva `?sesion=<id>`)
+SESSION_FIELDS = (
+    "current_phase", "root_question", "inquiry_tree", "validated_nodes",
+    "expert_annotations", "perspectives", "prefetched_perspectives",
+    "expanded_nodes", "open_panels", "annotation_drafts", "tree_page",
+    "tree_page_size", "reasoning_log", "eee_metrics", "final_synthesis",
+    "eee_evaluator", "signature_hash", "expert_name", "expert_role",
+    "synthesis_input"
+)
+
+
+@st.cache_resource
+def get_session_store() -> SessionStore:
+    """Almacén de sesiones compartido por todas las sesiones del proceso."""
+    return SessionStore.from_settings(SESSION_FIELDS)
+
+
+def save_session_state():
+    """
+    Guarda la sesión. Si otra pestaña o proceso la escribió antes, no se
+    mezclan los cambios: se recarga el estado guardado y se vuelve a ejecutar.
+    """
+    store = get_session_store()
+    try:
+        store.save(st.session_state.session_id, st.session_state)
+    except SessionConflict:
+        store.reload(st.session_state.session_id, st.session_state)
+        st.session_state.session_reloaded = True
+        st.rerun()
+
+
+@instruments.timed()
 def init_session_state():
-    """Inicializa el estado de la sesión con valores por defecto."""
+    """
+    Inicializa el estado de la sesión: recupera del almacén la deliberación
+    de la URL, si existe, y completa el resto con valores por defecto.
+    """
+    if "session_id" not in st.session_state:
+        session_id = st.query_params.get("sesion")
+        if not is_session_id(session_id):
+            session_id = new_session_id()
+        st.session_state.session_id = session_id
+        st.query_params["sesion"] = session_id
+        get_session_store().restore(session_id, st.session_state)
+    
     defaults = {
         "current_phase": "input",  # input, deliberation, signature
         "root_question": "",
-        "inquiry_tree": {},
+        "inquiry_tree": InquiryTree(),
         "validated_nodes": set(),
         "expert_annotations": {},
         "perspectives": {},
-        "reasoning_log": [],
+        "prefetched_perspectives": {},
+        "expanded_nodes": set(),
+        "open_panels": set(),
+        "annotation_drafts": {},
+        "tree_page": 0,
+        "tree_page_size": TREE_PAGE_SIZE,
+        "reasoning_log": ReasoningTracker.from_settings(st.session_state.session_id),
         "eee_metrics": {
             "profundidad": 0,
             "pluralidad": 0,
@@ -413,6 +172,7 @@ def init_session_state():
             "robustez": 0
         },
         "final_synthesis": "",
+        "eee_evaluator": EroteticEvaluator.from_settings(),
         "signature_hash": None,
         "expert_name": "",
         "expert_role": ""
@@ -420,221 +180,50 @@ def init_session_state():
     for key, value in defaults.items():
         if key not in st.session_state:
             st.session_state[key] = value
-
-init_session_state()
+    
+    if st.session_state.pop("session_reloaded", False):
+        st.warning("La deliberación se modificó desde otra pestaña o proceso; "
+                   "se muestra su último estado guardado.")
 
 
 # ══════════════════════════════════════════════════════════════════════════════
 # FUNCIONES DEL MOTOR DELIBERATIVO
 # ══════════════════════════════════════════════════════════════════════════════
 
-def generate_inquiry_tree(question: str) -> dict:
-    """
-    Genera el árbol de indagación basado en la pregunta raíz.
-    Implementa la jerarquía interrogativa del Código Deliberativo.
-    """
-    # Árbol de demostración para DPI
-    # En producción, esto se conectaría con el InquiryEngine + LLM
-    return {
-        "root": question,
-        "branches": [
-            {
-                "id": "q1",
-                "question": "¿Cuál es el marco normativo aplicable?",
-                "level": 1,
-                "type": "definitional",
-                "sub_branches": [
-                    {
-                        "id": "q1.1",
-                        "question": "¿Qué establece la legislación nacional vigente?",
-                        "level": 2,
-                        "type": "factual"
-                    },
-                    {
-                        "id": "q1.2", 
-                        "question": "¿Existe normativa europea o internacional aplicable?",
-                        "level": 2,
-                        "type": "comparative"
-                    }
-                ]
-            },
-            {
-                "id": "q2",
-                "question": "¿Qué dice la jurisprudencia relevante?",
-                "level": 1,
-                "type": "precedential",
-                "sub_branches": [
-                    {
-                        "id": "q2.1",
-                        "question": "¿Hay sentencias del TJUE aplicables?",
-                        "level": 2,
-                        "type": "factual"
-                    },
-                    {
-                        "id": "q2.2",
-                        "question": "¿Cuál es la línea del Tribunal Supremo español?",
-                        "level": 2,
-                        "type": "factual"
-                    }
-                ]
-            },
-            {
-                "id": "q3",
-                "question": "¿Cuáles son las posiciones doctrinales en conflicto?",
-                "level": 1,
-                "type": "dialectical",
-                "sub_branches": [
-                    {
-                        "id": "q3.1",
-                        "question": "¿Qué argumentos favorecen una interpretación restrictiva?",
-                        "level": 2,
-                        "type": "argumentative"
-                    },
-                    {
-                        "id": "q3.2",
-                        "question": "¿Qué argumentos favorecen una interpretación extensiva?",
-                        "level": 2,
-                        "type": "argumentative"
-                    }
-                ]
-            },
-            {
-                "id": "q4",
-                "question": "¿Cuáles son las implicaciones prácticas de cada interpretación?",
-                "level": 1,
-                "type": "consequential",
-                "sub_branches": []
-            }
-        ]
-    }
+@st.cache_resource
+def get_perspective_cache() -> PerspectiveCache:
+    """Caché de perspectivas compartida por todas las sesiones del proceso."""
+    return PerspectiveCache.from_settings()
 
 
-def generate_perspectives(node_id: str, question: str) -> list:
-    """
-    Genera múltiples perspectivas para una pregunta.
-    Implementa la apertura semántica y la integración del disenso.
-    """
-    # Perspectivas de demostración
-    # En producción, el ContextualGenerator consultaría fuentes reales
-    perspectives_map = {
-        "q1": [
-            {
-                "source": "Marco Normativo Nacional",
-                "content": "El Real Decreto Legislativo 1/1996 establece el régimen general de propiedad intelectual en España. El artículo 10.1 enumera las obras protegibles, exigiendo originalidad como requisito esencial.",
-                "confidence": 0.95,
-                "type": "legal"
-            },
-            {
-                "source": "Directiva UE 2019/790",
-                "content": "La Directiva sobre derechos de autor en el mercado único digital introduce nuevas excepciones y limitaciones, particularmente relevantes para la minería de textos y datos.",
-                "confidence": 0.92,
-                "type": "eu_law"
-            }
-        ],
-        "q2": [
-            {
-                "source": "STJUE C-5/08 Infopaq",
-                "content": "El TJUE estableció que la originalidad requiere que la obra refleje la 'creación intelectual propia del autor'. Este estándar armonizado ha influido en toda la jurisprudencia posterior.",
-                "confidence": 0.98,
-                "type": "case_law"
-            },
-            {
-                "source": "STS 214/2011",
-                "content": "El Tribunal Supremo español ha adoptado progresivamente el criterio europeo de originalidad, abandonando la anterior exigencia de 'altura creativa'.",
-                "confidence": 0.90,
-                "type": "case_law"
-            }
-        ],
-        "q3": [
-            {
-                "source": "Posición Restrictiva (Bercovitz)",
-                "content": "Desde esta perspectiva, el requisito de originalidad debe interpretarse de forma estricta, exigiendo un mínimo de creatividad que excluya las producciones puramente mecánicas o automatizadas.",
-                "confidence": 0.85,
-                "type": "doctrine"
-            },
-            {
-                "source": "Posición Extensiva (Saiz García)",
-                "content": "Esta corriente aboga por un concepto más flexible de originalidad que reconozca valor en las decisiones creativas incluso cuando el resultado pueda parecer simple o funcional.",
-                "confidence": 0.85,
-                "type": "doctrine"
-            },
-            {
-                "source": "Perspectiva Crítica (Tamames)",
-                "content": "La cuestión de la originalidad en obras generadas con IA plantea una ruptura epistémica: el concepto mismo de 'creación intelectual propia' presupone una agencia humana que estos sistemas problematizan.",
-                "confidence": 0.80,
-                "type": "critical"
-            }
-        ],
-        "q4": [
-            {
-                "source": "Análisis de Impacto",
-                "content": "Una interpretación restrictiva protegería la integridad del sistema de derechos de autor pero podría dejar sin protección producciones con valor económico. Una interpretación extensiva ampliaría la protección pero diluiría el concepto de autoría.",
-                "confidence": 0.88,
-                "type": "analysis"
-            }
-        ]
-    }
-    
-    # Extraer el ID base (q1, q2, etc.) para la demo
-    base_id = node_id.split('.')[0] if '.' in node_id else node_id
-    return perspectives_map.get(base_id, [
-        {
-            "source": "Análisis General",
-            "content": "Esta cuestión requiere un análisis detallado del contexto específico y las fuentes aplicables.",
-            "confidence": 0.75,
-            "type": "general"
-        }
-    ])
-
-
-def calculate_eee(validated: set, total_nodes: int, perspectives_count: int) -> dict:
-    """
-    Calcula el Índice de Equilibrio Erotético (EEE).
-    Evalúa la calidad estructural del proceso deliberativo.
-    """
-    total = max(total_nodes, 1)
-    validated_count = len(validated)
-    
-    # D1: Profundidad estructural (niveles explorados)
-    depth = min(1.0, validated_count / total)
-    
-    # D2: Pluralidad semántica (perspectivas consideradas)
-    plurality = min(1.0, perspectives_count / (total * 2))
-    
-    # D3: Trazabilidad (nodos con justificación)
-    traceability = validated_count / total if total > 0 else 0
-    
-    # D4: Reversibilidad (capacidad de revisión - siempre alta en este sistema)
-    reversibility = 0.95
-    
-    # D5: Robustez (coherencia ante disenso)
-    robustness = min(1.0, (validated_count + perspectives_count * 0.5) / (total * 1.5))
-    
-    return {
-        "profundidad": round(depth, 2),
-        "pluralidad": round(plurality, 2),
-        "trazabilidad": round(traceability, 2),
-        "reversibilidad": round(reversibility, 2),
-        "robustez": round(robustness, 2),
-        "total": round((depth + plurality + traceability + reversibility + robustness) / 5, 2)
-    }
+@st.cache_resource
+def get_archive() -> DeliberationArchive:
+    """Archivo de deliberaciones firmadas compartido por el proceso."""
+    return DeliberationArchive.from_settings()
 
 
-def generate_signature_hash(content: dict, expert: str, timestamp: str) -> str:
-    """
-    Genera el hash de firma epistémica.
-    Garantiza la trazabilidad y la responsabilidad del experto.
-    """
-    signature_content = json.dumps({
-        "expert": expert,
-        "timestamp": timestamp,
-        "root_question": content.get("root_question", ""),
-        "validated_nodes": list(content.get("validated_nodes", [])),
-        "synthesis": content.get("synthesis", ""),
-        "eee_score": content.get("eee_score", 0)
-    }, sort_keys=True, ensure_ascii=False)
-    
-    return hashlib.sha256(signature_content.encode()).hexdigest()
+@st.cache_resource
+def get_tree_cache() -> InquiryTreeCache:
+    """Caché de árboles de indagación compartida por el proceso."""
+    return InquiryTreeCache.from_settings()
+
+
+# Opciones ante un árbol en caché para una pregunta parecida
+TREE_CHOICES = {
+    "bifurcar": "Partir de sus subpreguntas con mi formulación",
+    "reutilizar": "Reutilizar el árbol y su pregunta raíz",
+    "nuevo": "Generar un árbol nuevo"
+}
+
+
+@instruments.timed()
+def find_similar_tree(question: str):
+    """Árbol en caché para una pregunta parecida (una consulta por texto)."""
+    cached = st.session_state.get("tree_match")
+    if cached is None or cached[0] != question:
+        cached = (question, get_tree_cache().lookup(question))
+        st.session_state.tree_match = cached
+    return cached[1]
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -651,6 +240,27 @@ def render_header():
     """, unsafe_allow_html=True)
 
 
+@instruments.timed()
+def render_prior_deliberations(question: str, limit: int = 3):
+    """Deliberaciones firmadas del archivo sobre preguntas parecidas."""
+    prior = get_archive().search(question, limit=limit)
+    if not prior:
+        return
+    items = "".join(
+        f"""<li class="prior-item">
+            <p class="prior-question">{html.escape(row['root_question'] or '')}</p>
+            <span class="inquiry-meta">{html.escape(row['expert'] or '')} · {(row['signed_at'] or '')[:10]} · EEE {row['eee_total'] or 0:.0%}</span>
+        </li>"""
+        for row in prior
+    )
+    st.markdown(f"""
+    <div class="prior-deliberations">
+        <span class="perspective-label">Deliberaciones firmadas sobre preguntas similares</span>
+        <ul>{items}</ul>
+    </div>
+    """, unsafe_allow_html=True)
+
+
 def render_input_phase():
     """Renderiza la fase de entrada de la pregunta."""
     st.markdown("""
@@ -660,7 +270,7 @@ def render_input_phase():
     
     st.markdown("""
     <div class="inquiry-card">
-        <p style="font-family: var(--font-body); color: var(--color-muted); font-size: 0.9rem; line-height: 1.6; margin-bottom: 1rem;">
+        <p class="inquiry-intro">
             Formule la cuestión jurídica que desea analizar. El sistema generará un árbol de indagación 
             estructurado, permitiéndole explorar múltiples perspectivas antes de elaborar su síntesis final.
         </p>
@@ -675,6 +285,29 @@ def render_input_phase():
         label_visibility="collapsed"
     )
     
+    tree_match = None
+    if question:
+        render_prior_deliberations(question)
+        tree_match = find_similar_tree(question)
+    
+    if tree_match is not None:
+        saved = ""
+        if tree_match.generation_ms >= 1000:
+            saved = f" · ahorra ~{tree_match.generation_ms / 1000:.0f} s"
+        st.markdown(f"""
+        <div class="tree-match">
+            <span class="perspective-label">Árbol de una pregunta similar · {tree_match.similarity:.0%}{saved}</span>
+            <p class="prior-question">{html.escape(tree_match.question)}</p>
+        </div>
+        """, unsafe_allow_html=True)
+        st.radio(
+            "Árbol de indagación",
+            list(TREE_CHOICES),
+            format_func=TREE_CHOICES.get,
+            key="tree_choice",
+            label_visibility="collapsed"
+        )
+    
     col1, col2 = st.columns([3, 1])
     
     with col1:
@@ -696,17 +329,52 @@ def render_input_phase():
     
     if st.button("⚖️  Iniciar Deliberación", type="primary", use_container_width=True):
         if question and expert_name:
-            st.session_state.root_question = question
             st.session_state.expert_name = expert_name
             st.session_state.expert_role = expert_role
-            st.session_state.inquiry_tree = generate_inquiry_tree(question)
+            
+            # Con un LLM configurado, las ramas y perspectivas se piden en lotes
+            provider = default_perspective_provider(context=question)
+            tree = None
+            choice = st.session_state.get("tree_choice", "bifurcar") if tree_match else "nuevo"
+            if choice == "reutilizar":
+                tree = get_tree_cache().reuse(tree_match)
+            elif choice == "bifurcar":
+                tree = get_tree_cache().fork(tree_match, question)
+            if tree is None:
+                start = time.perf_counter()
+                with instruments.span("generate_inquiry_tree"):
+                    tree = generate_inquiry_tree(question)
+                    if provider is not None:
+                        with st.spinner("Ampliando el árbol de indagación..."):
+                            tree = expand_inquiry_tree(tree, context=question)
+                get_tree_cache().put(question, tree, (time.perf_counter() - start) * 1000)
+                choice = "nuevo"
+            st.session_state.root_question = tree["root"]
+            st.session_state.inquiry_tree = InquiryTree.from_dict(tree)
+            st.session_state.eee_evaluator.load_tree(st.session_state.inquiry_tree)
+            # Las ramas de primer nivel empiezan desplegadas; el resto, plegado
+            st.session_state.expanded_nodes = {b.id for b in st.session_state.inquiry_tree.branches()}
+            st.session_state.tree_page = 0
+            
+            # Precarga de perspectivas de todas las ramas; se muestran al explorar
+            with st.spinner("Preparando perspectivas del árbol de indagación..."), \
+                    instruments.span("prefetch_perspectives"):
+                run_prefetch(
+                    st.session_state.inquiry_tree,
+                    provider=provider,
+                    cache=get_perspective_cache(),
+                    sink=st.session_state.prefetched_perspectives
+                )
             st.session_state.current_phase = "deliberation"
             
             # Log inicial
+            detail = f"Pregunta raíz: {tree['root']}"
+            if choice != "nuevo":
+                detail += f" · árbol de «{tree_match.question}» ({choice})"
             st.session_state.reasoning_log.append({
                 "timestamp": datetime.now().isoformat(),
                 "action": "INICIO_DELIBERACIÓN",
-                "detail": f"Pregunta raíz: {question}"
+                "detail": detail
             })
             
             st.rerun()
@@ -714,55 +382,119 @@ def render_input_phase():
             st.warning("Por favor, introduzca la cuestión jurídica y su nombre.")
 
 
-def render_inquiry_node(node: dict, depth: int = 0):
-    """Renderiza un nodo del árbol de indagación."""
-    node_id = node["id"]
+@instruments.timed()
+def render_inquiry_tree(tree: InquiryTree):
+    """
+    Renderiza la página actual del árbol de indagación. Solo se emiten los
+    nodos visibles (los subárboles plegados no se recorren) y, de ellos, como
+    mucho `tree_page_size` por página.
+    """
+    page_size = st.session_state.tree_page_size
+    visible = list(tree.iter_visible(st.session_state.expanded_nodes))
+    pages = max(1, -(-len(visible) // page_size))
+    page = min(st.session_state.tree_page, pages - 1)
+    
+    for node in visible[page * page_size:(page + 1) * page_size]:
+        render_inquiry_node(node)
+    
+    if pages > 1:
+        col_prev, col_info, col_next = st.columns([0.2, 0.6, 0.2])
+        with col_prev:
+            if st.button("← Anterior", key="tree_prev", disabled=page == 0):
+                st.session_state.tree_page = page - 1
+                st.rerun()
+        with col_info:
+            st.markdown(f"""
+                <p class="inquiry-meta centered">
+                    PÁGINA {page + 1} DE {pages} · {len(visible)} NODOS VISIBLES DE {len(tree)}
+                </p>
+            """, unsafe_allow_html=True)
+        with col_next:
+            if st.button("Siguiente →", key="tree_next", disabled=page >= pages - 1):
+                st.session_state.tree_page = page + 1
+                st.rerun()
+
+
+@instruments.timed()
+def render_inquiry_node(node: InquiryNode):
+    """Renderiza un nodo del árbol de indagación (sin sus descendientes)."""
+    node_id = node.id
     is_validated = node_id in st.session_state.validated_nodes
+    is_explored = node_id in st.session_state.perspectives
+    descendants = node.tree.subtree_size(node_id) - 1
     
-    indent = "　" * depth  # Espacio ideográfico para indentación
+    indent = "　" * (node.level - 1)  # Espacio ideográfico para indentación
     
     status_class = "validated" if is_validated else "pending"
-    status_icon = "✓" if is_validated else "○"
     
     with st.container():
-        col1, col2 = st.columns([0.85, 0.15])
+        col0, col1, col2 = st.columns([0.07, 0.78, 0.15])
+        
+        with col0:
+            if descendants:
+                is_expanded = node_id in st.session_state.expanded_nodes
+                if st.button("▾" if is_expanded else "▸", key=f"toggle_{node_id}",
+                             help=f"{descendants} subpreguntas"):
+                    st.session_state.expanded_nodes ^= {node_id}
+                    st.rerun()
         
         with col1:
             st.markdown(f"""
                 <div class="tree-node {status_class}">
-                    <span class="inquiry-meta">{node.get('type', 'general').upper()} · NIVEL {node['level']}</span>
-                    <p class="inquiry-question">{indent}{node['question']}</p>
+                    <span class="inquiry-meta">{node.type.upper()} · NIVEL {node.level}</span>
+                    <p class="inquiry-question">{indent}{node.question}</p>
                 </div>
             """, unsafe_allow_html=True)
         
         with col2:
-            if st.button(f"{'✓ Validado' if is_validated else 'Explorar'}", 
-                        key=f"btn_{node_id}",
-                        type="secondary" if is_validated else "primary"):
+            if is_explored:
+                label = "✓ Validado" if is_validated else "Perspectivas"
+            else:
+                label = "Explorar"
+            if st.button(label, key=f"btn_{node_id}",
+                         type="secondary" if is_validated else "primary"):
                 
-                if not is_validated:
+                if is_explored:
+                    # El panel de perspectivas se muestra u oculta sin regenerar
+                    st.session_state.open_panels ^= {node_id}
+                else:
                     # Generar perspectivas para este nodo
-                    perspectives = generate_perspectives(node_id, node['question'])
+                    perspectives = st.session_state.prefetched_perspectives.get(node_id)
+                    if perspectives is None:
+                        # La precarga falló para este nodo: mismo proveedor que
+                        # la precarga y, si vuelve a fallar, el generador local
+                        with instruments.span("generate_perspectives"):
+                            perspectives = generate_node_perspectives(
+                                node_id, node.question, node.type,
+                                provider=default_perspective_provider(
+                                    context=st.session_state.root_question),
+                                cache=get_perspective_cache()
+                            )
                     st.session_state.perspectives[node_id] = perspectives
+                    st.session_state.open_panels.add(node_id)
                     
                     # Log
-                    st.session_state.reasoning_log.append({
+                    log_entry = {
                         "timestamp": datetime.now().isoformat(),
                         "action": "EXPLORAR_NODO",
                         "node_id": node_id,
-                        "question": node['question'],
+                        "question": node.question,
+                        "level": node.level,
                         "perspectives_count": len(perspectives)
-                    })
-    
-    # Mostrar perspectivas si existen
-    if node_id in st.session_state.perspectives:
-        render_perspectives(node_id, node['question'])
+                    }
+                    st.session_state.reasoning_log.append(log_entry)
     
-    # Renderizar sub-ramas
-    for sub_node in node.get("sub_branches", []):
-        render_inquiry_node(sub_node, depth + 1)
+    # Las perspectivas y la anotación solo se renderizan con el panel abierto
+    if node_id in st.session_state.open_panels:
+        render_perspectives(node_id, node.question)
 
 
+def save_annotation_draft(node_id: str, annotation_key: str):
+    """Conserva el texto de la anotación aunque su panel deje de renderizarse."""
+    st.session_state.annotation_drafts[node_id] = st.session_state[annotation_key]
+
+
+@instruments.timed()
 def render_perspectives(node_id: str, question: str):
     """Renderiza las perspectivas para un nodo."""
     perspectives = st.session_state.perspectives.get(node_id, [])
@@ -770,39 +502,32 @@ def render_perspectives(node_id: str, question: str):
     if not perspectives:
         return
     
-    st.markdown(f"""
-        <div style="margin-left: 1.5rem; margin-top: 0.5rem;">
-    """, unsafe_allow_html=True)
+    st.markdown('<div class="perspective-group">', unsafe_allow_html=True)
     
     for i, persp in enumerate(perspectives):
-        type_colors = {
-            "legal": "#2d5016",
-            "eu_law": "#1a4d7c",
-            "case_law": "#6b3d1c",
-            "doctrine": "#4a4a4a",
-            "critical": "#7c1a4d",
-            "analysis": "#3d4a6b",
-            "general": "#6b6b6b"
-        }
-        color = type_colors.get(persp["type"], "#6b6b6b")
+        # El color de cada tipo de fuente lo define la hoja de estilos
+        persp_type = persp["type"] if persp["type"] in PERSPECTIVE_TYPES else "general"
         
         st.markdown(f"""
-            <div class="perspective-panel" style="border-left-color: {color};">
-                <span class="perspective-label" style="color: {color};">
+            <div class="perspective-panel perspective-{persp_type}">
+                <span class="perspective-label">
                     {persp['source']} · Confianza: {int(persp['confidence']*100)}%
                 </span>
-                <p style="margin: 0; color: var(--color-ink);">{persp['content']}</p>
+                <p>{persp['content']}</p>
             </div>
         """, unsafe_allow_html=True)
     
-    # Área de anotación del experto
+    # Área de anotación del experto; el borrador sobrevive a plegar el panel
     annotation_key = f"annotation_{node_id}"
     annotation = st.text_area(
         "Anotación del experto",
+        value=st.session_state.annotation_drafts.get(node_id, ""),
         placeholder="Añada su valoración crítica de estas perspectivas...",
         key=annotation_key,
         height=80,
-        label_visibility="collapsed"
+        label_visibility="collapsed",
+        on_change=save_annotation_draft,
+        args=(node_id, annotation_key)
     )
     
     col1, col2 = st.columns(2)
@@ -813,12 +538,13 @@ def render_perspectives(node_id: str, question: str):
             if annotation:
                 st.session_state.expert_annotations[node_id] = annotation
             
-            st.session_state.reasoning_log.append({
+            log_entry = {
                 "timestamp": datetime.now().isoformat(),
                 "action": "VALIDAR_NODO",
                 "node_id": node_id,
                 "annotation": annotation
-            })
+            }
+            st.session_state.reasoning_log.append(log_entry)
             st.rerun()
     
     with col2:
@@ -826,35 +552,26 @@ def render_perspectives(node_id: str, question: str):
             if node_id in st.session_state.validated_nodes:
                 st.session_state.validated_nodes.discard(node_id)
             
-            st.session_state.reasoning_log.append({
+            log_entry = {
                 "timestamp": datetime.now().isoformat(),
                 "action": "REVISAR_NODO",
                 "node_id": node_id
-            })
+            }
+            st.session_state.reasoning_log.append(log_entry)
             st.rerun()
     
     st.markdown("</div>", unsafe_allow_html=True)
 
 
+@instruments.timed()
 def render_eee_metrics():
     """Renderiza el panel de métricas EEE."""
-    tree = st.session_state.inquiry_tree
-    
-    # Contar nodos totales
-    def count_nodes(branches):
-        count = len(branches)
-        for b in branches:
-            count += count_nodes(b.get("sub_branches", []))
-        return count
-    
-    total_nodes = count_nodes(tree.get("branches", []))
-    perspectives_count = sum(len(p) for p in st.session_state.perspectives.values())
-    
-    metrics = calculate_eee(
-        st.session_state.validated_nodes,
-        total_nodes,
-        perspectives_count
-    )
+    # El evaluador solo aplica las entradas del registro que aún no ha visto
+    evaluator = st.session_state.eee_evaluator
+    if not evaluator.tree_depth and len(st.session_state.inquiry_tree):
+        evaluator.load_tree(st.session_state.inquiry_tree)
+    evaluator.sync(st.session_state.reasoning_log)
+    metrics = evaluator.metrics()
     
     st.session_state.eee_metrics = metrics
     
@@ -864,9 +581,9 @@ def render_eee_metrics():
     """, unsafe_allow_html=True)
     
     # Score principal
-    score_color = "#5d6d5e" if metrics["total"] >= 0.6 else "#8b4513"
+    score_class = "eee-score" if metrics["total"] >= 0.6 else "eee-score low"
     st.markdown(f"""
-        <p class="eee-score" style="color: {score_color};">{metrics['total']:.0%}</p>
+        <p class="{score_class}">{metrics['total']:.0%}</p>
     """, unsafe_allow_html=True)
     
     # Métricas individuales
@@ -886,9 +603,7 @@ def render_eee_metrics():
                 <span class="eee-label">{label}</span>
                 <span class="eee-value">{value:.0%}</span>
             </div>
-            <div style="background: var(--color-border); height: 4px; border-radius: 2px; margin-bottom: 0.5rem;">
-                <div style="background: var(--color-sage); height: 100%; width: {bar_width}%; border-radius: 2px;"></div>
-            </div>
+            <div class="eee-bar"><div class="eee-bar-fill" style="width: {bar_width}%;"></div></div>
         """, unsafe_allow_html=True)
     
     st.markdown("</div>", unsafe_allow_html=True)
@@ -908,16 +623,14 @@ def render_deliberation_phase():
         
         # Mostrar pregunta raíz
         st.markdown(f"""
-            <div class="inquiry-card" style="border-left: 4px solid var(--color-accent);">
+            <div class="inquiry-card root-card">
                 <span class="inquiry-meta">PREGUNTA RAÍZ</span>
-                <p class="inquiry-question" style="font-size: 1.35rem;">{st.session_state.root_question}</p>
+                <p class="inquiry-question">{st.session_state.root_question}</p>
             </div>
         """, unsafe_allow_html=True)
         
         # Renderizar árbol
-        tree = st.session_state.inquiry_tree
-        for branch in tree.get("branches", []):
-            render_inquiry_node(branch)
+        render_inquiry_tree(st.session_state.inquiry_tree)
         
         st.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
         
@@ -949,12 +662,11 @@ def render_deliberation_phase():
         
         # Reasoning log
         with st.expander("📋 Registro de Razonamiento", expanded=False):
-            for log in reversed(st.session_state.reasoning_log[-10:]):
+            for log in reversed(st.session_state.reasoning_log.tail(10)):
                 st.markdown(f"""
-                    <div style="font-family: var(--font-mono); font-size: 0.7rem; padding: 0.5rem; 
-                                background: var(--color-highlight); margin-bottom: 0.5rem; border-radius: 2px;">
+                    <div class="log-entry">
                         <strong>{log['action']}</strong><br>
-                        <span style="color: var(--color-muted);">{log['timestamp'][:19]}</span>
+                        <span>{log['timestamp'][:19]}</span>
                     </div>
                 """, unsafe_allow_html=True)
 
@@ -968,7 +680,7 @@ def render_signature_phase():
     
     st.markdown("""
     <div class="inquiry-card">
-        <p style="font-family: var(--font-body); color: var(--color-muted); font-size: 0.9rem; line-height: 1.7;">
+        <p class="inquiry-intro">
             Al firmar este documento, usted certifica que ha participado activamente en el proceso 
             de deliberación, ha evaluado críticamente las perspectivas presentadas, y asume la 
             responsabilidad intelectual sobre la síntesis elaborada. La IA ha sido una herramienta 
@@ -983,7 +695,7 @@ def render_signature_phase():
     with col1:
         st.markdown(f"""
         <div class="eee-container">
-            <h4 style="font-family: var(--font-display); margin-bottom: 1rem;">Resumen del Proceso</h4>
+            <h4 class="eee-subtitle">Resumen del Proceso</h4>
             <div class="eee-metric">
                 <span class="eee-label">Nodos explorados</span>
                 <span class="eee-value">{len(st.session_state.perspectives)}</span>
@@ -1006,9 +718,8 @@ def render_signature_phase():
     with col2:
         st.markdown(f"""
         <div class="eee-container">
-            <h4 style="font-family: var(--font-display); margin-bottom: 1rem;">Síntesis Elaborada</h4>
-            <p style="font-family: var(--font-body); font-size: 0.9rem; color: var(--color-ink); 
-                      line-height: 1.6; max-height: 150px; overflow-y: auto;">
+            <h4 class="eee-subtitle">Síntesis Elaborada</h4>
+            <p class="synthesis-preview">
                 {st.session_state.final_synthesis[:500]}{'...' if len(st.session_state.final_synthesis) > 500 else ''}
             </p>
         </div>
@@ -1026,16 +737,26 @@ def render_signature_phase():
         if st.button("✍️  Firmar Documento", type="primary", use_container_width=True):
             timestamp = datetime.now().isoformat()
             
-            signature_hash = generate_signature_hash(
-                {
-                    "root_question": st.session_state.root_question,
-                    "validated_nodes": st.session_state.validated_nodes,
-                    "synthesis": st.session_state.final_synthesis,
-                    "eee_score": st.session_state.eee_metrics["total"]
-                },
-                st.session_state.expert_name,
-                timestamp
-            )
+            eee_evidence = st.session_state.eee_evaluator.evidence().to_dict()
+            
+            # La raíz de Merkle del registro ya está calculada: firmar es O(log n)
+            with instruments.span("sign_deliberation"):
+                signature = sign_deliberation(
+                    {
+                        "root_question": st.session_state.root_question,
+                        "validated_nodes": st.session_state.validated_nodes,
+                        "synthesis": st.session_state.final_synthesis,
+                        "eee_score": st.session_state.eee_metrics["total"],
+                        "expert_role": st.session_state.expert_role,
+                        "annotations": st.session_state.expert_annotations,
+                        "eee_metrics": st.session_state.eee_metrics,
+                        "eee_evidence": eee_evidence
+                    },
+                    st.session_state.expert_name,
+                    timestamp,
+                    st.session_state.reasoning_log.trail
+                )
+            signature_hash = signature["hash"]
             
             st.session_state.signature_hash = signature_hash
             
@@ -1053,28 +774,26 @@ def render_signature_phase():
                 <h3 class="signature-title">Documento Firmado</h3>
                 <p class="signature-subtitle">Certificación de Autoría Deliberada</p>
                 
-                <div style="display: flex; justify-content: space-between; margin: 1.5rem 0;">
+                <div class="signature-fields">
                     <div>
-                        <span style="font-family: var(--font-mono); font-size: 0.65rem; color: rgba(255,255,255,0.5); 
-                                     text-transform: uppercase; letter-spacing: 0.1em;">Experto</span>
-                        <p style="font-family: var(--font-display); font-size: 1.25rem; margin: 0.25rem 0 0;">
+                        <span class="signature-field-label">Experto</span>
+                        <p class="signature-expert">
                             {st.session_state.expert_name}
                         </p>
-                        <span style="font-family: var(--font-body); font-size: 0.8rem; color: rgba(255,255,255,0.7);">
+                        <span class="signature-role">
                             {st.session_state.expert_role}
                         </span>
                     </div>
-                    <div style="text-align: right;">
-                        <span style="font-family: var(--font-mono); font-size: 0.65rem; color: rgba(255,255,255,0.5); 
-                                     text-transform: uppercase; letter-spacing: 0.1em;">Índice EEE</span>
-                        <p style="font-family: var(--font-display); font-size: 2rem; margin: 0; color: var(--color-accent-light);">
+                    <div class="score-field">
+                        <span class="signature-field-label">Índice EEE</span>
+                        <p class="signature-score">
                             {st.session_state.eee_metrics['total']:.0%}
                         </p>
                     </div>
                 </div>
                 
                 <div class="signature-hash">
-                    <span style="color: rgba(255,255,255,0.5);">SHA-256:</span> {signature_hash}
+                    <span>SHA-256:</span> {signature_hash}
                 </div>
                 
                 <p class="signature-timestamp">Firmado el {timestamp[:10]} a las {timestamp[11:19]} UTC</p>
@@ -1082,29 +801,39 @@ def render_signature_phase():
             """, unsafe_allow_html=True)
             
             # Botón para exportar
-            export_data = {
-                "documento": "DELIBERA - Certificación de Autoría Deliberada",
-                "version": "1.0",
-                "experto": {
-                    "nombre": st.session_state.expert_name,
-                    "especialización": st.session_state.expert_role
-                },
-                "pregunta_raiz": st.session_state.root_question,
-                "sintesis": st.session_state.final_synthesis,
-                "metricas_eee": st.session_state.eee_metrics,
-                "nodos_validados": list(st.session_state.validated_nodes),
-                "anotaciones": st.session_state.expert_annotations,
-                "registro_razonamiento": st.session_state.reasoning_log,
-                "firma": {
-                    "hash": signature_hash,
-                    "timestamp": timestamp,
-                    "algoritmo": "SHA-256"
-                }
-            }
+            export_data = build_certificate(
+                expert_name=st.session_state.expert_name,
+                expert_role=st.session_state.expert_role,
+                root_question=st.session_state.root_question,
+                synthesis=st.session_state.final_synthesis,
+                eee_metrics=st.session_state.eee_metrics,
+                validated_nodes=st.session_state.validated_nodes,
+                annotations=st.session_state.expert_annotations,
+                reasoning_log=st.session_state.reasoning_log,
+                signature_hash=signature_hash,
+                timestamp=timestamp,
+                signature_fields=signature,
+                eee_evidence=eee_evidence
+            )
+            
+            # Archivo local indexado de deliberaciones firmadas
+            with instruments.span("archive_add"):
+                get_archive().add(
+                    export_data,
+                    tree=st.session_state.inquiry_tree,
+                    perspectives=st.session_state.perspectives
+                )
             
+            # Streamlit guarda en memoria los datos de download_button, así que
+            # el certificado queda una vez en bytes. Se codifica en streaming a
+            # un temporal (a disco por encima de 1 MB) y se lee de una vez, sin
+            # la lista del registro ni la cadena de json.dumps: el pico es el
+            # tamaño del certificado, no varias veces él
+            with instruments.span("encode_certificate"), certificate_tempfile(export_data) as f:
+                certificate_bytes = f.read()
             st.download_button(
                 "📄 Descargar Certificado (JSON)",
-                json.dumps(export_data, indent=2, ensure_ascii=False),
+                certificate_bytes,
                 f"delibera_certificado_{timestamp[:10]}.json",
                 "application/json",
                 use_container_width=True
@@ -1114,15 +843,14 @@ def render_signature_phase():
 def render_footer():
     """Renderiza el pie de página."""
     st.markdown("""
-        <div style="text-align: center; padding: 3rem 0 1rem; border-top: 1px solid var(--color-border); margin-top: 3rem;">
-            <p style="font-family: var(--font-body); font-size: 0.75rem; color: var(--color-muted);">
+        <div class="delibera-footer">
+            <p>
                 DELIBERA · Sistema de Indagación Epistémica<br>
-                <span style="font-family: var(--font-mono); font-size: 0.65rem;">
+                <span>
                     Basado en el Código Deliberativo (Tamames, 2025)
                 </span>
             </p>
-            <p style="font-family: var(--font-display); font-style: italic; font-size: 0.85rem; 
-                      color: var(--color-muted); margin-top: 0.5rem;">
+            <p class="delibera-motto">
                 "Computar no para decidir, sino para deliberar"
             </p>
         </div>
@@ -1135,6 +863,57 @@ def render_footer():
 
 def main():
     """Punto de entrada principal de la aplicación."""
+    with instruments.run() as timings:
+        inject_theme()
+        init_session_state()
+        try:
+            render_app()
+        finally:
+            # También al salir por st.rerun(): solo se escriben los campos modificados
+            with instruments.span("save_session"):
+                save_session_state()
+    
+    if get_settings().debug:
+        render_debug_panel(timings)
+
+
+def render_debug_panel(timings: dict):
+    """
+    Tiempos de la ejecución que acaba de terminar y percentiles del proceso
+    (DELIBERA_DEBUG), más los contadores de la caché de árboles (también en la
+    exportación JSON). Los tramos incluyen a los anidados: `render_inquiry_tree`
+    contiene los `render_inquiry_node` de la página.
+    """
+    aggregated = instruments.to_dict()
+    aggregated["tree_cache"] = tree_cache = get_tree_cache().stats()
+    rows = "".join(
+        f"<tr><td>{html.escape(name)}</td><td>{calls}</td><td>{elapsed_ms:.1f}</td>"
+        f"<td>{aggregated['spans'][name]['p50_ms']:.1f}</td>"
+        f"<td>{aggregated['spans'][name]['p95_ms']:.1f}</td></tr>"
+        for name, (elapsed_ms, calls) in sorted(timings.items(), key=lambda item: -item[1][0])
+    )
+    with st.sidebar:
+        with st.expander(f"⏱ Tiempos · {aggregated['runs']} ejecuciones", expanded=False):
+            st.markdown(f"""
+                <table class="debug-timings">
+                    <tr><th>Tramo</th><th>Llam.</th><th>ms</th><th>p50</th><th>p95</th></tr>
+                    {rows}
+                </table>
+            """, unsafe_allow_html=True)
+            st.caption(
+                f"Caché de árboles: {tree_cache['hits']}/{tree_cache['lookups']} aciertos "
+                f"({tree_cache['hit_ratio']:.0%}), {tree_cache['time_saved_s']:.1f} s ahorrados, "
+                f"{tree_cache['entries']} árboles, {tree_cache['embed_errors']} errores de embeddings"
+            )
+            st.download_button("Exportar (Prometheus)", instruments.to_prometheus(),
+                               "delibera_metrics.prom", "text/plain")
+            st.download_button("Exportar (JSON)",
+                               json.dumps(aggregated, indent=2, ensure_ascii=False),
+                               "delibera_metrics.json", "application/json")
+
+
+def render_app():
+    """Renderiza la fase actual y la barra lateral."""
     render_header()
     
     # Navegación por fases
@@ -1150,8 +929,8 @@ def main():
     # Botón de reinicio (siempre visible en sidebar)
     with st.sidebar:
         st.markdown("""
-            <div style="padding: 1rem;">
-                <h3 style="font-family: 'Cormorant Garamond', serif; color: white; margin-bottom: 1rem;">
+            <div class="sidebar-block">
+                <h3>
                     DELIBERA
                 </h3>
             </div>
@@ -1159,15 +938,18 @@ def main():
         
         if st.session_state.current_phase != "input":
             if st.button("← Nueva deliberación"):
+                st.session_state.reasoning_log.discard()
+                get_session_store().delete(st.session_state.session_id)
+                st.query_params.clear()
                 for key in list(st.session_state.keys()):
                     del st.session_state[key]
                 init_session_state()
                 st.rerun()
         
         st.markdown("""
-            <div style="padding: 1rem; margin-top: 2rem;">
-                <p style="font-family: 'Inter', sans-serif; font-size: 0.75rem; color: rgba(255,255,255,0.6);">
-                    Este sistema implementa los principios del <strong style="color: rgba(255,255,255,0.9);">Código Deliberativo</strong>: 
+            <div class="sidebar-block note">
+                <p>
+                    Este sistema implementa los principios del <strong>Código Deliberativo</strong>: 
                     una arquitectura computacional orientada a la organización reflexiva del juicio.
                 </p>
             </div>
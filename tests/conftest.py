@@ -0,0 +1,46 @@
+"""
+Configuración común de las pruebas: el repositorio en `sys.path` y una
+configuración aislada (`DATA_DIR` temporal, sin clave de OpenAI) para que
+ninguna prueba escriba en `./data` ni llame a la red.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from cd_modules.config import get_settings  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def isolated_settings(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATA_DIR", str(tmp_path / "data"))
+    for name in ("OPENAI_API_KEY", "DELIBERA_LLM_PROVIDER", "DELIBERA_EMBEDDINGS_PROVIDER",
+                 "DELIBERA_VECTOR_STORE", "DELIBERA_SESSION_BACKEND", "DELIBERA_EEE_WEIGHTS",
+                 "DELIBERA_METRICS_PATH", "DELIBERA_DEBUG"):
+        monkeypatch.delenv(name, raising=False)
+    get_settings.cache_clear()
+    yield get_settings()
+    get_settings.cache_clear()
+
+
+def synthetic_tree(depth: int, branching: int) -> dict:
+    """Árbol completo en el formato de diccionarios de `generate_inquiry_tree`."""
+    types = ("factual", "comparative", "argumentative", "definitional")
+
+    def branches(prefix: str, level: int) -> list:
+        if level > depth:
+            return []
+        return [{
+            "id": f"{prefix}.{n}" if prefix else f"q{n}",
+            "question": f"¿Subpregunta {prefix}.{n} del complejo de indagación?",
+            "level": level,
+            "type": types[(n + level) % len(types)],
+            "sub_branches": branches(f"{prefix}.{n}" if prefix else f"q{n}", level + 1)
+        } for n in range(1, branching + 1)]
+
+    return {"root": "¿Pregunta raíz?", "branches": branches("", 1)}
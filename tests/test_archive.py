@@ -0,0 +1,110 @@
+"""
+Archivo de deliberaciones: inserción de certificados y recálculo del EEE.
+"""
+
+import sqlite3
+
+import pytest
+
+from cd_modules.core import InquiryTree, ReasoningTracker, build_certificate
+from cd_modules.core.archive import DeliberationArchive
+from cd_modules.core.epistemic_validator import EroteticEvaluator
+from conftest import synthetic_tree
+
+
+def _session(seed: int, directory=None):
+    """Árbol, registro y evaluador de una sesión sintética y determinista."""
+    tree = InquiryTree.from_dict(synthetic_tree(3, 3))
+    nodes = list(tree)
+    log = ReasoningTracker(directory=directory, tail_size=8, segment_size=16)
+    for n, node in enumerate(nodes[seed % 5::2]):
+        log.record("EXPLORAR_NODO", node_id=node.id, level=node.level, perspectives_count=n % 4)
+        log.record("VALIDAR_NODO", node_id=node.id, annotation="Motivo" if n % 3 else "")
+        if n % (seed % 4 + 2) == 0:
+            log.record("REVISAR_NODO", node_id=node.id)
+    evaluator = EroteticEvaluator(weights={"pluralidad": seed % 3 + 1})
+    evaluator.load_tree(tree)
+    evaluator.sync(log)
+    return tree, log, evaluator
+
+
+def _certificate(seed: int, log, evaluator) -> dict:
+    metrics = evaluator.metrics()
+    return build_certificate(
+        f"Experto {seed}", "DPI", "¿Pregunta raíz?", "Síntesis", metrics,
+        sorted(evaluator._validated), {}, log, f"{seed:064x}", "2025-07-01T10:00:00",
+        eee_evidence=evaluator.evidence().to_dict()
+    )
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = DeliberationArchive(tmp_path / "archive.sqlite3")
+    yield archive
+    archive.close()
+
+
+def test_rescore_reproduces_the_signed_eee(archive):
+    signed = {}
+    for seed in range(12):
+        tree, log, evaluator = _session(seed)
+        certificate = _certificate(seed, log, evaluator)
+        archive.add(certificate, tree=tree)
+        signed[certificate["firma"]["hash"]] = (evaluator.weights, certificate["metricas_eee"])
+
+    for weights in ({"pluralidad": 1}, {"pluralidad": 2}, {"pluralidad": 3}):
+        scores = archive.rescore(weights)
+        assert len(scores["signature_hash"]) == 12
+        for i, signature_hash in enumerate(scores["signature_hash"]):
+            session_weights, metrics = signed[signature_hash]
+            if session_weights != EroteticEvaluator(weights=weights).weights:
+                continue
+            assert {name: float(scores[name][i]) for name in metrics} == metrics
+
+
+def test_certificates_without_evidence_are_not_rescored(archive):
+    tree, log, evaluator = _session(1)
+    certificate = _certificate(1, log, evaluator)
+    del certificate["evidencia_eee"]
+    archive.add(certificate, tree=tree)
+    assert archive.rescore()["signature_hash"] == []
+
+
+def test_archives_from_before_the_evidence_columns_are_migrated(tmp_path):
+    path = tmp_path / "archive.sqlite3"
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE deliberations (id INTEGER PRIMARY KEY, signature_hash TEXT NOT NULL UNIQUE, "
+        "expert TEXT NOT NULL, expert_role TEXT, root_question TEXT NOT NULL, synthesis TEXT, "
+        "eee_total REAL, eee_profundidad REAL, eee_pluralidad REAL, eee_trazabilidad REAL, "
+        "eee_reversibilidad REAL, eee_robustez REAL, validated_count INTEGER NOT NULL, "
+        "log_size INTEGER NOT NULL, signed_at TEXT NOT NULL, scheme TEXT, merkle_root TEXT)")
+    conn.commit()
+    conn.close()
+
+    archive = DeliberationArchive(path)
+    tree, log, evaluator = _session(2)  # pesos {"pluralidad": 3}
+    archive.add(_certificate(2, log, evaluator), tree=tree)
+    scores = archive.rescore({"pluralidad": 3})
+    assert scores["total"].tolist() == [evaluator.metrics()["total"]]
+    archive.close()
+
+
+def test_tracker_log_is_streamed_into_the_archive(tmp_path, archive):
+    tree, log, evaluator = _session(3, directory=tmp_path / "log")
+    assert log._segments  # parte del registro está en disco
+    certificate = _certificate(3, log, evaluator)
+    deliberation_id = archive.add(certificate, tree=tree)
+
+    conn = archive._conn
+    assert conn.execute("SELECT log_size FROM deliberations WHERE id = ?",
+                        (deliberation_id,)).fetchone()[0] == len(log)
+    rows = conn.execute("SELECT seq, action, node_id FROM log_events WHERE deliberation_id = ? "
+                        "ORDER BY seq", (deliberation_id,)).fetchall()
+    assert [tuple(row) for row in rows] == [(seq, event["action"], event.get("node_id"))
+                    for seq, event in enumerate(log)]
+    explored = {event["node_id"]: event["perspectives_count"]
+                for event in log if event["action"] == "EXPLORAR_NODO"}
+    counts = dict(map(tuple, conn.execute("SELECT node_id, perspectives_count FROM nodes "
+                                          "WHERE deliberation_id = ?", (deliberation_id,))))
+    assert {node_id: counts[node_id] for node_id in explored} == explored
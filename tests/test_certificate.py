@@ -0,0 +1,108 @@
+"""
+Equivalencia byte a byte de la exportación en streaming del certificado con
+`json.dumps(certificado, indent=2, ensure_ascii=False)`, la salida original
+de `render_signature_phase`.
+"""
+
+import gzip
+import io
+import json
+
+import pytest
+from hypothesis import given, settings, strategies as st
+
+from cd_modules.core import ReasoningTracker, build_certificate
+from cd_modules.core.certificate import (
+    COMPACT_SEPARATORS,
+    _LARGE_CONTAINER,
+    certificate_tempfile,
+    iter_certificate_bytes,
+    iter_certificate_json,
+    write_certificate,
+)
+
+
+def original_export(certificate: dict) -> bytes:
+    return json.dumps(certificate, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+def compact_export(certificate: dict) -> bytes:
+    return json.dumps(certificate, separators=COMPACT_SEPARATORS,
+                      ensure_ascii=False).encode("utf-8")
+
+
+json_values = st.recursive(
+    st.none() | st.booleans() | st.integers() | st.floats(allow_nan=False)
+    | st.text(alphabet=st.characters(codec="utf-8")),
+    lambda children: st.lists(children, max_size=6)
+    | st.dictionaries(st.text(max_size=8), children, max_size=6),
+    max_leaves=40,
+)
+
+
+def _log(size: int) -> list:
+    return [{
+        "timestamp": f"2025-01-01T00:00:{n % 60:02d}.{n:06d}",
+        "action": ("EXPLORAR_NODO", "VALIDAR_NODO", "REVISAR_NODO")[n % 3],
+        "node_id": f"q{n % 7 + 1}.{n % 3 + 1}",
+        "perspectives_count": n % 5,
+        "detail": "Validación «motivada» — art. 5 TRLPI\n\t\"cita\" \\ ñ €",
+    } for n in range(size)]
+
+
+def _certificate(log, **extra) -> dict:
+    return build_certificate(
+        "Dra. Ruiz", "Propiedad intelectual", "¿Puede una obra generada por IA ser protegida?",
+        "Síntesis con acentos, comillas \"dobles\" y saltos\nde línea. " * 30,
+        {"profundidad": 0.5, "pluralidad": 0.25, "trazabilidad": 0.3,
+         "reversibilidad": 0.95, "robustez": 0.41, "total": 0.48},
+        [f"q{n}" for n in range(1, 300)], {f"q{n}": f"Anotación {n} ✓" for n in range(1, 40)},
+        log, "a" * 64, "2025-07-01T10:00:00",
+        signature_fields={"esquema": "merkle-sha256", "raiz_merkle": "b" * 64, "hojas": 12},
+        **extra
+    )
+
+
+@settings(max_examples=300, deadline=None)
+@given(st.dictionaries(st.text(max_size=10), json_values, max_size=8))
+def test_random_documents_match_json_dumps(document):
+    assert "".join(iter_certificate_json(document)) == json.dumps(
+        document, indent=2, ensure_ascii=False)
+    assert b"".join(iter_certificate_bytes(document, chunk_size=64)) == original_export(document)
+    assert b"".join(iter_certificate_bytes(document, compact=True)) == compact_export(document)
+
+
+@settings(max_examples=50, deadline=None)
+@given(st.lists(json_values, min_size=1, max_size=8), st.integers(0, 40))
+def test_large_containers_are_streamed_identically(values, extra):
+    # Más elementos que `_LARGE_CONTAINER`: se codifican elemento a elemento
+    items = (values * (_LARGE_CONTAINER + extra))[:_LARGE_CONTAINER + 1 + extra]
+    document = {"items": items, "nested": {"list": items, "dict": dict(enumerate(items))}}
+    reference = json.loads(json.dumps(document))  # claves enteras → texto, como json.dumps
+    assert b"".join(iter_certificate_bytes(document)) == original_export(document)
+    assert json.loads(b"".join(iter_certificate_bytes(document))) == reference
+
+
+@pytest.mark.parametrize("size", [0, 1, _LARGE_CONTAINER, 1000])
+def test_certificate_with_segmented_tracker_matches_the_original_export(tmp_path, size):
+    entries = _log(size)
+    tracker = ReasoningTracker(directory=tmp_path / "log", tail_size=10, segment_size=64)
+    for entry in entries:
+        tracker.append(entry)
+
+    streamed = _certificate(tracker, eee_evidence={"total_nodes": 12, "validated": 3})
+    original = _certificate(entries, eee_evidence={"total_nodes": 12, "validated": 3})
+    expected = original_export(original)
+
+    assert b"".join(iter_certificate_bytes(streamed)) == expected
+    assert b"".join(iter_certificate_bytes(streamed, compact=True)) == compact_export(original)
+    assert gzip.decompress(b"".join(iter_certificate_bytes(streamed, gzip=True))) == expected
+
+    buffer = io.BytesIO()
+    assert write_certificate(streamed, buffer) == len(expected)
+    assert buffer.getvalue() == expected
+    path = tmp_path / "certificado.json"
+    write_certificate(streamed, path)
+    assert path.read_bytes() == expected
+    with certificate_tempfile(streamed) as f:
+        assert f.read() == expected
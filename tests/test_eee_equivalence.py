@@ -0,0 +1,134 @@
+"""
+Equivalencia con el comportamiento original de `streamlit_app.py`: el cálculo
+`calculate_eee` y el recuento recursivo de nodos sobre el árbol de
+diccionarios que hacía `render_eee_metrics` en cada ejecución.
+"""
+
+import random
+
+import pytest
+
+from cd_modules.core import InquiryTree, generate_inquiry_tree
+from cd_modules.core.epistemic_validator import (
+    EEEAccumulator,
+    EroteticEvaluator,
+    auditor,
+    calculate_eee_simple,
+    count_tree_nodes,
+)
+from conftest import synthetic_tree
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# REFERENCIA: CÓDIGO ORIGINAL
+# ══════════════════════════════════════════════════════════════════════════════
+
+def calculate_eee(validated: set, total_nodes: int, perspectives_count: int) -> dict:
+    total = max(total_nodes, 1)
+    validated_count = len(validated)
+    depth = min(1.0, validated_count / total)
+    plurality = min(1.0, perspectives_count / (total * 2))
+    traceability = validated_count / total if total > 0 else 0
+    reversibility = 0.95
+    robustness = min(1.0, (validated_count + perspectives_count * 0.5) / (total * 1.5))
+    return {
+        "profundidad": round(depth, 2),
+        "pluralidad": round(plurality, 2),
+        "trazabilidad": round(traceability, 2),
+        "reversibilidad": round(reversibility, 2),
+        "robustez": round(robustness, 2),
+        "total": round((depth + plurality + traceability + reversibility + robustness) / 5, 2)
+    }
+
+
+def count_nodes(branches):
+    count = len(branches)
+    for b in branches:
+        count += count_nodes(b.get("sub_branches", []))
+    return count
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# PRUEBAS
+# ══════════════════════════════════════════════════════════════════════════════
+
+QUESTIONS = (
+    "¿Puede una obra generada por IA ser objeto de protección por derechos de autor?",
+    "¿Infringe una patente el uso experimental de un compuesto protegido?",
+    "¿Es válida una licencia de software sin cesión expresa de derechos de explotación?",
+)
+
+
+def test_calculate_eee_simple_matches_the_original_formula():
+    # Todas las sesiones válidas (validados <= nodos) de hasta 80 nodos
+    for total_nodes in range(0, 81):
+        for validated_count in range(0, total_nodes + 1):
+            validated = set(range(validated_count))
+            for perspectives in range(0, 4 * total_nodes + 3, 3):
+                assert calculate_eee_simple(validated, total_nodes, perspectives) == \
+                    calculate_eee(validated, total_nodes, perspectives)
+
+
+@pytest.mark.parametrize("depth,branching", [(1, 1), (1, 6), (2, 3), (3, 4), (4, 3), (5, 2)])
+def test_node_count_matches_the_recursive_count(depth, branching):
+    tree = synthetic_tree(depth, branching)
+    expected = count_nodes(tree["branches"])
+    assert count_tree_nodes(tree) == expected
+    assert count_tree_nodes(InquiryTree.from_dict(tree)) == expected
+
+
+@pytest.mark.parametrize("question", QUESTIONS)
+def test_generated_trees_round_trip_through_the_flat_store(question):
+    tree = generate_inquiry_tree(question)
+    flat = InquiryTree.from_dict(tree)
+    assert flat.to_dict() == tree
+    assert count_tree_nodes(flat) == count_nodes(tree["branches"])
+    for node in flat:
+        assert node.to_dict()["id"] == node.id
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_accumulator_counters_match_a_full_recount(seed):
+    """
+    Aplica eventos aleatorios como lo hace la interfaz y compara, tras cada
+    uno, los contadores del evaluador con el recuento completo del estado de
+    la sesión que hacía `render_eee_metrics`. Las dimensiones que no
+    dependen de la evidencia del registro (D2, D5) coinciden con el
+    `calculate_eee` original.
+    """
+    rng = random.Random(seed)
+    tree = synthetic_tree(rng.randint(1, 4), rng.randint(1, 4))
+    node_ids = [node.id for node in InquiryTree.from_dict(tree)]
+    evaluator = EEEAccumulator()
+    evaluator.load_tree(tree)
+    validated, perspectives, log = set(), {}, []
+
+    for _ in range(rng.randint(0, 80)):
+        node_id = rng.choice(node_ids)
+        action = rng.choice(("EXPLORAR_NODO", "VALIDAR_NODO", "REVISAR_NODO"))
+        if action == "EXPLORAR_NODO":
+            perspectives[node_id] = [{}] * rng.randint(0, 6)
+            event = {"action": action, "node_id": node_id,
+                     "perspectives_count": len(perspectives[node_id])}
+        elif action == "VALIDAR_NODO":
+            validated.add(node_id)
+            event = {"action": action, "node_id": node_id}
+        else:
+            validated.discard(node_id)
+            event = {"action": action, "node_id": node_id}
+        log.append(event)
+        evaluator.apply(event)
+
+        total_nodes = count_nodes(tree["branches"])
+        perspectives_count = sum(len(p) for p in perspectives.values())
+        evidence = evaluator.evidence()
+        assert (evidence.total_nodes, evidence.validated, evidence.perspectives) == \
+            (total_nodes, len(validated), perspectives_count)
+
+        original = calculate_eee(validated, total_nodes, perspectives_count)
+        metrics = evaluator.metrics()
+        assert metrics["pluralidad"] == original["pluralidad"]
+        assert metrics["robustez"] == original["robustez"]
+
+    assert evaluator.result() == auditor(tree, log)
+    assert EEEAccumulator is EroteticEvaluator
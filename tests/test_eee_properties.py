@@ -0,0 +1,219 @@
+"""
+Propiedades del EEE derivado del registro de razonamiento (`EroteticEvaluator`),
+comprobadas con hypothesis sobre árboles y registros aleatorios.
+"""
+
+import pickle
+
+import numpy as np
+import pytest
+from hypothesis import given, settings, strategies as st
+
+from cd_modules.core import ReasoningTracker
+from cd_modules.core.epistemic_validator import (
+    REVERSIBILITY_BASELINE,
+    EroteticEvaluator,
+    auditor,
+    calculate_eee_batch,
+    calculate_eee_simple,
+    parse_weights,
+)
+from conftest import synthetic_tree
+
+
+DIMENSIONS = ("profundidad", "pluralidad", "trazabilidad", "reversibilidad", "robustez")
+
+
+@st.composite
+def sessions(draw, max_events: int = 60):
+    """Árbol completo y registro con exploraciones, validaciones y revisiones."""
+    tree = synthetic_tree(draw(st.integers(1, 3)), draw(st.integers(1, 3)))
+    nodes = []
+    stack = list(tree["branches"])
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        stack.extend(node["sub_branches"])
+    event = st.one_of(
+        st.builds(lambda node, count: {"action": "EXPLORAR_NODO", "node_id": node["id"],
+                                       "level": node["level"], "perspectives_count": count},
+                  st.sampled_from(nodes), st.integers(0, 6)),
+        st.builds(lambda node, text: {"action": "VALIDAR_NODO", "node_id": node["id"],
+                                      "annotation": text},
+                  st.sampled_from(nodes), st.sampled_from(["", "  ", "Justificación"])),
+        st.builds(lambda node: {"action": "REVISAR_NODO", "node_id": node["id"]},
+                  st.sampled_from(nodes)),
+        st.just({"action": "INICIO_DELIBERACIÓN"}),
+    )
+    return tree, draw(st.lists(event, max_size=max_events))
+
+
+weights_strategy = st.one_of(
+    st.none(),
+    st.dictionaries(st.sampled_from(DIMENSIONS), st.floats(0.1, 10), min_size=1),
+)
+
+
+def _evaluator(tree, events, weights=None, chunks=()) -> EroteticEvaluator:
+    """Evaluador alimentado con `sync` por tramos, pasando por pickle entre ellos."""
+    evaluator = EroteticEvaluator(weights=weights)
+    evaluator.load_tree(tree)
+    log = []
+    for end in (*sorted(chunks), len(events)):
+        log.extend(events[len(log):end])
+        evaluator.sync(log)
+        evaluator = pickle.loads(pickle.dumps(evaluator))
+    return evaluator
+
+
+@settings(max_examples=200, deadline=None)
+@given(sessions(), weights_strategy)
+def test_dimensions_and_total_are_bounded(session, weights):
+    tree, events = session
+    metrics = auditor(tree, events, weights).to_dict()
+    for value in metrics.values():
+        assert 0.0 <= value <= 1.0
+
+
+@settings(max_examples=200, deadline=None)
+@given(sessions(), weights_strategy, st.lists(st.integers(0, 60), max_size=4))
+def test_incremental_sync_matches_full_replay(session, weights, chunks):
+    tree, events = session
+    chunks = [min(c, len(events)) for c in chunks]
+    evaluator = _evaluator(tree, events, weights, chunks)
+    assert evaluator.events == len(events)
+    assert evaluator.result() == auditor(tree, events, weights)
+
+
+@settings(max_examples=100, deadline=None)
+@given(sessions(), st.integers(0, 60))
+def test_sync_applies_only_new_events(session, split):
+    tree, events = session
+    split = min(split, len(events))
+    evaluator = _evaluator(tree, events[:split])
+    applied = []
+    original_apply = EroteticEvaluator.apply
+
+    class Counting(EroteticEvaluator):
+        __slots__ = ()
+
+        def apply(self, event):
+            applied.append(event)
+            original_apply(self, event)
+
+    evaluator.__class__ = Counting
+    evaluator.sync(events)
+    assert applied == events[split:]
+    evaluator.sync(events)
+    assert applied == events[split:]
+
+
+@settings(max_examples=100, deadline=None)
+@given(sessions(), st.integers(1, 20))
+def test_tracker_sync_matches_list_sync(tmp_path_factory, session, tail_size):
+    tree, events = session
+    directory = tmp_path_factory.mktemp("reasoning")
+    tracker = ReasoningTracker(directory=directory, tail_size=tail_size, segment_size=7)
+    evaluator = EroteticEvaluator()
+    evaluator.load_tree(tree)
+    for event in events:
+        tracker.append({"timestamp": "2025-01-01T00:00:00", **event})
+        if len(tracker) % 5 == 0:
+            evaluator.sync(tracker)
+    evaluator.sync(tracker)
+    assert evaluator.result() == auditor(tree, events)
+
+
+@settings(max_examples=200, deadline=None)
+@given(sessions(), st.dictionaries(st.sampled_from(DIMENSIONS), st.integers(1, 10), min_size=1),
+       st.integers(2, 7))
+def test_weights_are_scale_invariant(session, weights, factor):
+    tree, events = session
+    scaled = {name: weight * factor for name, weight in weights.items()}
+    # Las dimensiones omitidas pesan 1: se escalan también
+    scaled.update({name: factor for name in DIMENSIONS if name not in weights})
+    assert auditor(tree, events, weights).total == pytest.approx(
+        auditor(tree, events, scaled).total, abs=0.011)
+
+
+@settings(max_examples=200, deadline=None)
+@given(sessions())
+def test_no_revisions_keep_the_baseline_reversibility(session):
+    tree, events = session
+    events = [e for e in events if e["action"] != "REVISAR_NODO"]
+    assert auditor(tree, events).reversibilidad == REVERSIBILITY_BASELINE
+
+
+@settings(max_examples=200, deadline=None)
+@given(sessions())
+def test_revising_a_validated_node_never_lowers_reversibility(session):
+    tree, events = session
+    validated = [e["node_id"] for e in events if e["action"] == "VALIDAR_NODO"]
+    if not validated:
+        return
+    before = auditor(tree, events)
+    after = auditor(tree, events + [{"action": "REVISAR_NODO", "node_id": validated[-1]}])
+    assert after.reversibilidad >= before.reversibilidad
+
+
+@settings(max_examples=200, deadline=None)
+@given(sessions())
+def test_depth_follows_the_deepest_explored_level(session):
+    tree, events = session
+    explored = [e["level"] for e in events if e["action"] == "EXPLORAR_NODO"]
+    evaluator = _evaluator(tree, events)
+    expected = max(explored, default=0) / evaluator.tree_depth
+    assert evaluator.result().profundidad == round(expected, 2)
+
+
+@settings(max_examples=200, deadline=None)
+@given(sessions(), weights_strategy)
+def test_count_formulas_reproduce_the_evaluator(session, weights):
+    tree, events = session
+    evaluator = _evaluator(tree, events, weights)
+    evidence = evaluator.evidence()
+    expected = evaluator.metrics()
+
+    assert evidence.result(weights).to_dict() == expected
+    simple = calculate_eee_simple(
+        set(range(evidence.validated)), evidence.total_nodes, evidence.perspectives, weights,
+        max_level=evidence.max_level, tree_depth=evidence.tree_depth,
+        justified=evidence.justified, ever_validated=evidence.ever_validated,
+        reverted=evidence.reverted)
+    assert simple == expected
+
+    batch = calculate_eee_batch(
+        [evidence.validated] * 3, evidence.total_nodes, evidence.perspectives, weights,
+        max_levels=evidence.max_level, tree_depths=evidence.tree_depth,
+        justified=evidence.justified, ever_validated=evidence.ever_validated,
+        reverted=evidence.reverted)
+    for name, value in expected.items():
+        assert batch[name].tolist() == [value] * 3
+
+
+@settings(max_examples=300, deadline=None)
+@given(st.lists(st.tuples(st.integers(0, 400), st.integers(0, 400), st.integers(0, 900),
+                          st.integers(0, 8), st.integers(0, 8), st.integers(0, 400),
+                          st.integers(0, 400), st.integers(0, 400)), min_size=1, max_size=50),
+       weights_strategy)
+def test_batch_matches_simple_elementwise(rows, weights):
+    columns = np.array(rows).T
+    validated, total, perspectives, max_level, depth, justified, ever, reverted = columns
+    batch = calculate_eee_batch(validated, total, perspectives, weights, max_levels=max_level,
+                                tree_depths=depth, justified=justified, ever_validated=ever,
+                                reverted=reverted)
+    for i, row in enumerate(rows):
+        v, t, p, m, d, j, e, r = row
+        expected = calculate_eee_simple(set(range(v)), t, p, weights, max_level=m, tree_depth=d,
+                                        justified=j, ever_validated=e, reverted=r)
+        assert {name: float(values[i]) for name, values in batch.items()} == expected
+
+
+def test_parse_weights_round_trips_declared_weights():
+    assert parse_weights("profundidad=2, pluralidad=0.5") == {"profundidad": 2.0,
+                                                              "pluralidad": 0.5}
+    assert parse_weights("") == {}
+    with pytest.raises(ValueError):
+        parse_weights("claridad=1")
+    with pytest.raises(ValueError):
+        parse_weights("profundidad")
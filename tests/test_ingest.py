@@ -0,0 +1,103 @@
+"""
+Ingesta incremental: los fragmentos de archivos modificados o borrados se
+retiran del índice de fuentes (BM25 local y matriz en memoria mapeada).
+"""
+
+import hashlib
+
+import numpy as np
+import pytest
+
+from cd_modules.core.embedding_store import MemmapEmbeddingStore
+from cd_modules.core.retrieval import LocalSourceStore, SourceIndex, read_manifest
+from cd_modules.ingest import chunk_id, ingest, load_state
+
+
+def _paragraph(topic: str) -> str:
+    # Más de medio fragmento: dos párrafos nunca comparten fragmento
+    return " ".join(f"El {topic} se analiza a la luz de la jurisprudencia del Tribunal "
+                    f"Supremo y de la doctrina sobre el {topic} ({n})." for n in range(6))
+
+
+class HashEmbeddings:
+    """Embeddings deterministas por términos (sin red)."""
+
+    def embed_documents(self, texts):
+        vectors = np.zeros((len(texts), 64), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for term in text.lower().split():
+                vectors[row, int(hashlib.md5(term.encode()).hexdigest(), 16) % 64] += 1
+        return vectors
+
+
+def _stores(directory):
+    return {
+        "local": lambda: LocalSourceStore(directory / "local"),
+        "memmap": lambda: MemmapEmbeddingStore(directory / "memmap", HashEmbeddings()),
+    }
+
+
+def _ids(store) -> set:
+    if isinstance(store, LocalSourceStore):
+        return set(store._ids)
+    return set(store._known_ids())
+
+
+@pytest.mark.parametrize("backend", ["local", "memmap"])
+def test_changed_and_deleted_files_leave_no_stale_chunks(tmp_path, backend):
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    (corpus / "a.txt").write_text(f"{_paragraph('plagio')}\n\n{_paragraph('compartido')}")
+    (corpus / "b.txt").write_text(_paragraph("dominio público"))
+    (corpus / "c.txt").write_text(_paragraph("compartido"))
+    state_path = tmp_path / "index" / "ingest_state.json"
+    open_store = _stores(tmp_path / "index")[backend]
+
+    index = SourceIndex(open_store(), tmp_path / "index", backend)
+    ingest([corpus], index, state_path)
+    assert _ids(index.store) == {chunk_id(_paragraph(t))
+                                 for t in ("plagio", "compartido", "dominio público")}
+
+    # a.txt cambia (el fragmento compartido sigue en c.txt) y b.txt desaparece
+    (corpus / "a.txt").write_text(_paragraph("uso transformativo"))
+    (corpus / "b.txt").unlink()
+    index = SourceIndex(open_store(), tmp_path / "index", backend)
+    summary = ingest([corpus], index, state_path)
+
+    expected = {chunk_id(_paragraph(t)) for t in ("uso transformativo", "compartido")}
+    assert summary["removed"] == 2
+    assert _ids(index.store) == expected
+    assert _ids(open_store()) == expected
+    assert len(open_store()) == 2
+    assert read_manifest(tmp_path / "index")["records"] == 2
+    assert {entry_id for entry in load_state(state_path).values()
+            for entry_id in entry["ids"]} == expected
+
+    hits = open_store().similarity_search_with_relevance_scores("plagio dominio público", k=5)
+    assert {hit.page_content for hit, _ in hits} <= {_paragraph("uso transformativo"),
+                                                     _paragraph("compartido")}
+
+    # Volver a añadir un fragmento retirado lo indexa de nuevo
+    (corpus / "b.txt").write_text(_paragraph("plagio"))
+    index = SourceIndex(open_store(), tmp_path / "index", backend)
+    ingest([corpus], index, state_path)
+    assert chunk_id(_paragraph("plagio")) in _ids(open_store())
+    hits = open_store().similarity_search_with_relevance_scores(_paragraph("plagio"), k=5)
+    assert _paragraph("plagio") in {hit.page_content for hit, _ in hits}
+
+
+def test_local_store_replays_deletions_after_the_snapshot(tmp_path):
+    store = LocalSourceStore(tmp_path)
+    store.add_texts([_paragraph(t) for t in ("autoría", "obra", "licencia")],
+                    ids=["a", "b", "c"])
+    store.persist()
+    store.delete(["b", "desconocido"])
+
+    reloaded = LocalSourceStore(tmp_path)
+    assert set(reloaded._ids) == {"a", "c"} and len(reloaded) == 2
+    assert reloaded._postings == store._postings
+    hits = reloaded.similarity_search_with_relevance_scores("obra", k=3)
+    assert all(hit.page_content != _paragraph("obra") for hit, _ in hits)
+
+    reloaded.persist()
+    assert set(LocalSourceStore(tmp_path)._ids) == {"a", "c"}
@@ -0,0 +1,111 @@
+"""
+Precarga de perspectivas: tiempo máximo por petición, nodos sin resultado y
+claves de caché por generador.
+"""
+
+import asyncio
+import json
+
+from cd_modules.config import get_settings
+from cd_modules.core import PerspectiveCache, generate_perspectives
+from cd_modules.core.llm_batch import (
+    PERSPECTIVES_TASK,
+    BatchedLLMPerspectiveProvider,
+    ChatTransport,
+    LLMBatcher,
+)
+from cd_modules.core.prefetch import (
+    PerspectiveProvider,
+    generate_node_perspectives,
+    run_prefetch,
+)
+from conftest import synthetic_tree
+
+
+class SlowTransport(ChatTransport):
+    """Responde a cada petición; las que incluyen un nodo de `slow` tardan."""
+
+    def __init__(self, slow=(), delay: float = 2.0):
+        self.slow = set(slow)
+        self.delay = delay
+
+    async def complete(self, messages: list, max_tokens: int) -> str:
+        ids = [item["id"] for item in json.loads(messages[-1]["content"])["subpreguntas"]]
+        if self.slow.intersection(ids):
+            await asyncio.sleep(self.delay)
+        return json.dumps({"resultados": {node_id: [{
+            "source": f"Fuente {node_id}", "content": "Perspectiva", "confidence": 0.5,
+            "type": "legal"
+        }] for node_id in ids}})
+
+
+class ShortBatchProvider(PerspectiveProvider):
+    """Proveedor por lotes que pierde los últimos nodos de cada lote."""
+
+    supports_batch = True
+    name = "corto"
+
+    async def agenerate_batch(self, nodes: list, timeout=None) -> list:
+        return [[{"source": node_id, "content": "", "confidence": 1.0, "type": "legal"}]
+                for node_id, _, _ in nodes[:-2]]
+
+
+class FailingProvider(PerspectiveProvider):
+    name = "openai"
+
+    async def agenerate(self, node_id: str, question: str, node_type: str) -> list:
+        raise OSError("sin red")
+
+
+def test_timeout_applies_to_each_llm_request():
+    # Presupuesto mínimo: una petición por nodo, sin reintentos
+    batcher = LLMBatcher(SlowTransport(slow={"q2"}), PERSPECTIVES_TASK, token_budget=1,
+                         max_retries=0)
+    summary = run_prefetch(synthetic_tree(1, 4), provider=BatchedLLMPerspectiveProvider(batcher),
+                           timeout=0.3)
+    assert batcher.requests == 4
+    assert summary["completed"] == 3
+    assert list(summary["failed"]) == ["q2"]
+    assert "Tiempo agotado" in summary["failed"]["q2"]
+
+
+def test_nodes_missing_from_a_batch_are_reported_as_failed():
+    sink = {}
+    summary = run_prefetch(synthetic_tree(1, 5), provider=ShortBatchProvider(), sink=sink)
+    assert summary["completed"] == 3
+    assert set(summary["failed"]) == {"q4", "q5"}
+    assert set(sink) == {"q1", "q2", "q3"}
+
+
+def test_fallback_perspectives_are_cached_under_the_generator_used(monkeypatch, tmp_path):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-prueba")  # el LLM configurado es "openai"
+    get_settings.cache_clear()
+    cache = PerspectiveCache(tmp_path / "perspectives")
+    question = "¿Es original una fotografía generada por IA?"
+
+    perspectives = generate_node_perspectives("q1", question, "factual",
+                                              provider=FailingProvider(), cache=cache)
+    assert perspectives == generate_perspectives("q1", question)
+    assert cache.get(question, "factual") is None
+    assert cache.get(question, "factual", "openai") is None
+    assert cache.get(question, "factual", "local") == perspectives
+
+    llm = [{"source": "LLM", "content": "", "confidence": 0.9, "type": "legal"}]
+    cache.put(question, "factual", llm, "openai")
+    assert generate_node_perspectives("q1", question, "factual",
+                                      provider=FailingProvider(), cache=cache) == llm
+    assert cache.get_or_generate("q1", question, "factual") == perspectives
+
+
+def test_llm_perspectives_are_not_shared_between_root_questions(tmp_path):
+    cache = PerspectiveCache(tmp_path / "perspectives")
+    tree = synthetic_tree(1, 4)
+
+    def prefetch(root: str) -> tuple:
+        batcher = LLMBatcher(SlowTransport(), PERSPECTIVES_TASK, context=root)
+        summary = run_prefetch(tree, provider=BatchedLLMPerspectiveProvider(batcher), cache=cache)
+        return summary["cached"], batcher.requests
+
+    assert prefetch("¿Root A?") == (0, 1)
+    assert prefetch("¿Root B?") == (0, 1)
+    assert prefetch("¿root  a?") == (4, 0)
@@ -0,0 +1,129 @@
+"""
+Escrituras concurrentes de una misma sesión: versión optimista en el almacén
+de sesiones y segmentos del registro de razonamiento por escritor. También,
+el backend que corresponde a la configuración indicada.
+"""
+
+import pickle
+import sqlite3
+
+import pytest
+
+from cd_modules.config import Settings
+from cd_modules.core import ReasoningTracker
+from cd_modules.core.session_store import (
+    MemorySessionBackend,
+    SessionConflict,
+    SessionStore,
+    SQLiteSessionBackend,
+    new_session_id,
+)
+
+
+FIELDS = ("validated_nodes", "final_synthesis", "reasoning_log")
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        backend = MemorySessionBackend()
+    else:
+        backend = SQLiteSessionBackend(tmp_path / "sessions.sqlite3")
+    return SessionStore(backend, FIELDS)
+
+
+def test_stale_state_is_not_saved_over_a_newer_one(store):
+    session_id = new_session_id()
+    first, second = {}, {}
+    store.restore(session_id, first)
+    store.restore(session_id, second)
+
+    first.update(validated_nodes={"q1"}, final_synthesis="Síntesis A")
+    assert store.save(session_id, first) == 2
+    second.update(validated_nodes={"q2"}, final_synthesis="")
+    with pytest.raises(SessionConflict):
+        store.save(session_id, second)
+
+    # Nada de `second` llegó al almacén
+    check = {}
+    store.restore(session_id, check)
+    assert check == {**check, "validated_nodes": {"q1"}, "final_synthesis": "Síntesis A"}
+
+    assert store.reload(session_id, second) == 2
+    assert second["validated_nodes"] == {"q1"}
+    second["validated_nodes"] = {"q1", "q2"}
+    store.save(session_id, second)
+    with pytest.raises(SessionConflict):
+        first["final_synthesis"] = "Síntesis B"
+        store.save(session_id, first)
+    assert store.stats()["conflicts"] == 2
+
+
+def test_unchanged_state_does_not_conflict(store):
+    session_id = new_session_id()
+    first, second = {}, {}
+    store.restore(session_id, first)
+    store.restore(session_id, second)
+    first["final_synthesis"] = "Síntesis"
+    store.save(session_id, first)
+    assert store.save(session_id, second) == 0
+
+
+def test_deleted_session_is_not_resurrected_by_a_stale_state(store):
+    session_id = new_session_id()
+    state = {"final_synthesis": "Síntesis"}
+    store.save(session_id, state)
+    store.delete(session_id)
+    state["final_synthesis"] = "Otra"
+    with pytest.raises(SessionConflict):
+        store.save(session_id, state)
+
+
+def test_sessions_table_without_version_is_migrated(tmp_path):
+    path = tmp_path / "sessions.sqlite3"
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE sessions (session_id TEXT PRIMARY KEY, last_seen REAL NOT NULL);
+        CREATE TABLE session_fields (session_id TEXT NOT NULL, field TEXT NOT NULL,
+            value BLOB NOT NULL, PRIMARY KEY (session_id, field)) WITHOUT ROWID;
+    """)
+    session_id = new_session_id()
+    conn.execute("INSERT INTO sessions VALUES (?, 1.0)", (session_id,))
+    conn.execute("INSERT INTO session_fields VALUES (?, 'final_synthesis', ?)",
+                 (session_id, pickle.dumps("Guardada")))
+    conn.commit()
+    conn.close()
+
+    store = SessionStore(SQLiteSessionBackend(path), FIELDS)
+    state = {}
+    assert store.restore(session_id, state) == 1
+    state["final_synthesis"] = "Nueva"
+    assert store.save(session_id, state) == 1
+
+
+def test_backend_follows_the_settings_passed(tmp_path):
+    first = Settings(data_dir=tmp_path / "a")
+    second = Settings(data_dir=tmp_path / "b")
+    stores = [SessionStore.from_settings(FIELDS, settings=s, backend="sqlite")
+              for s in (first, second, Settings(data_dir=tmp_path / "a"))]
+    assert [store.backend.path.parent for store in stores] == [
+        tmp_path / "a", tmp_path / "b", tmp_path / "a"]
+    assert stores[0].backend is stores[2].backend
+    assert stores[1].reasoning_dir == tmp_path / "b" / "reasoning"
+
+
+def test_tracker_copies_never_overwrite_each_others_segments(tmp_path):
+    original = ReasoningTracker("s", tmp_path, segment_size=2)
+    original.record("INICIO_DELIBERACIÓN", detail="común")
+    copy = pickle.loads(pickle.dumps(original))
+    assert copy.writer != original.writer
+
+    for n in range(5):
+        original.record("EXPLORAR_NODO", node_id=f"a{n}")
+        copy.record("VALIDAR_NODO", node_id=f"b{n}")
+    original.flush()
+    copy.flush()
+
+    assert [e.get("node_id") for e in original] == [None, "a0", "a1", "a2", "a3", "a4"]
+    assert [e.get("node_id") for e in copy] == [None, "b0", "b1", "b2", "b3", "b4"]
+    assert len(list(tmp_path.glob("segment-*.jsonl"))) == 6
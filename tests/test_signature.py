@@ -0,0 +1,153 @@
+"""
+Firma Merkle del rastro: campos cubiertos por la firma, pruebas de inclusión
+de anotaciones, honestas y manipuladas, y su comprobación desde
+`delibera-verify`.
+"""
+
+import copy
+import hashlib
+import json
+
+import pytest
+
+from cd_modules.core import MerkleTrail, build_certificate, sign_deliberation
+from cd_modules.core.signature import (
+    MERKLE_SCHEME,
+    MERKLE_SCHEME_V1,
+    _canonical,
+    annotation_proof,
+    leaf_hash,
+    signed_annotations,
+    signing_payload,
+    verify_certificate,
+    verify_inclusion_proof,
+)
+from cd_modules.verify import main
+
+
+def _log() -> list:
+    log = []
+    for n in range(1, 8):
+        log.append({"timestamp": f"2025-07-01T10:00:{n:02d}", "action": "EXPLORAR_NODO",
+                    "node_id": f"q{n}", "level": 1, "perspectives_count": 3})
+        log.append({"timestamp": f"2025-07-01T10:01:{n:02d}", "action": "VALIDAR_NODO",
+                    "node_id": f"q{n}", "annotation": f"Motivo {n}" if n % 2 else ""})
+    return log
+
+
+def _signed_certificate(scheme: str = MERKLE_SCHEME) -> dict:
+    log = _log()
+    content = {
+        "root_question": "¿Pregunta raíz?", "validated_nodes": {"q1", "q2", "q3"},
+        "synthesis": "Síntesis", "eee_score": 0.5, "expert_role": "DPI",
+        "annotations": signed_annotations(log),
+        "eee_metrics": {"profundidad": 0.5, "pluralidad": 0.25, "trazabilidad": 0.75,
+                        "reversibilidad": 0.95, "robustez": 0.41, "total": 0.5},
+        "eee_evidence": {"total_nodes": 7, "validated": 3, "perspectives": 21}
+    }
+    trail = MerkleTrail.from_entries(log)
+    signature = sign_deliberation(content, "Dra. Ruiz", "2025-07-01T11:00:00", trail)
+    if scheme == MERKLE_SCHEME_V1:
+        payload = signing_payload(content, "Dra. Ruiz", signature["timestamp"], trail.root(),
+                                  trail.size, scheme)
+        signature.update(esquema=scheme, hash=hashlib.sha256(_canonical(payload)).hexdigest())
+    certificate = build_certificate(
+        "Dra. Ruiz", content["expert_role"], content["root_question"], content["synthesis"],
+        content["eee_metrics"], sorted(content["validated_nodes"]), content["annotations"], log,
+        signature["hash"], signature["timestamp"], signature_fields=signature,
+        eee_evidence=content["eee_evidence"]
+    )
+    return json.loads(json.dumps(certificate))
+
+
+def _write(path, data) -> str:
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    return str(path)
+
+
+def _forged_proof() -> dict:
+    # Prueba de una sola hoja que trae su propia raíz
+    leaf = {"anotacion": {"node_id": "q3", "annotation": "FORJADA"}}
+    return {"esquema": "merkle-sha256-v1", "hoja": leaf, "indice": 0, "hojas": 1, "ruta": [],
+            "raiz_merkle": leaf_hash(leaf).hex()}
+
+
+def test_honest_proof_verifies_against_the_signed_root():
+    certificate = _signed_certificate()
+    assert verify_certificate(certificate)
+    root = certificate["firma"]["raiz_merkle"]
+    for node_id in ("q1", "q3", "q7"):
+        proof = annotation_proof(certificate, node_id)
+        assert proof["hoja"]["anotacion"]["node_id"] == node_id
+        assert verify_inclusion_proof(proof, root)
+
+
+def test_tampered_proofs_are_rejected():
+    certificate = _signed_certificate()
+    root = certificate["firma"]["raiz_merkle"]
+    proof = annotation_proof(certificate, "q3")
+
+    tampered = copy.deepcopy(proof)
+    tampered["hoja"]["anotacion"]["annotation"] = "FORJADA"
+    assert not verify_inclusion_proof(tampered, root)
+
+    moved = copy.deepcopy(proof)
+    moved["indice"] += 1
+    assert not verify_inclusion_proof(moved, root)
+
+    assert not verify_inclusion_proof(_forged_proof(), root)
+    assert not verify_inclusion_proof({"hoja": "?"}, root)
+    with pytest.raises(ValueError):
+        verify_inclusion_proof(proof, "")
+
+
+@pytest.mark.parametrize("edit", [
+    lambda c: c["anotaciones"].update(q3="FORJADA"),
+    lambda c: c["anotaciones"].pop("q1"),
+    lambda c: c["experto"].update({"especialización": "Otra"}),
+    lambda c: c["metricas_eee"].update(pluralidad=1.0),
+    lambda c: c["evidencia_eee"].update(validated=7),
+    lambda c: c.pop("evidencia_eee"),
+])
+def test_every_signed_field_is_covered(edit):
+    certificate = _signed_certificate()
+    assert certificate["firma"]["esquema"] == MERKLE_SCHEME
+    assert verify_certificate(certificate)
+    edit(certificate)
+    assert not verify_certificate(certificate)
+
+
+def test_v1_certificates_verify_with_their_trail_annotations():
+    certificate = _signed_certificate(MERKLE_SCHEME_V1)
+    assert verify_certificate(certificate)
+    certificate["anotaciones"]["q3"] = "FORJADA"
+    assert not verify_certificate(certificate)
+
+
+def test_check_proof_requires_a_trusted_root(tmp_path, capsys):
+    certificate = _signed_certificate()
+    certificate_path = _write(tmp_path / "certificado.json", certificate)
+    honest = _write(tmp_path / "prueba.json", annotation_proof(certificate, "q3"))
+    forged = _write(tmp_path / "forjada.json", _forged_proof())
+
+    with pytest.raises(SystemExit) as exc:
+        main(["--check-proof", forged])
+    assert exc.value.code == 2
+
+    assert main(["--check-proof", honest, certificate_path]) == 0
+    assert main(["--check-proof", honest, "--root", certificate["firma"]["raiz_merkle"]]) == 0
+    assert main(["--check-proof", forged, certificate_path]) == 1
+    assert main(["--check-proof", forged, "--root", _forged_proof()["raiz_merkle"][::-1]]) == 1
+
+    # La raíz solo se toma de un certificado cuya firma es válida
+    certificate["sintesis"] = "Otra síntesis"
+    assert main(["--check-proof", honest, _write(tmp_path / "alterado.json", certificate)]) == 1
+    assert capsys.readouterr().out.split() == ["OK", "OK", "FALLO", "FALLO", "FALLO"]
+
+
+def test_prove_reports_nodes_without_a_signed_annotation(tmp_path, capsys):
+    certificate_path = _write(tmp_path / "certificado.json", _signed_certificate())
+    assert main(["--prove", "q2", certificate_path]) == 1
+    assert "No hay anotación firmada para el nodo q2" in capsys.readouterr().err
+    assert main(["--prove", "q3", certificate_path]) == 0
+    assert json.loads(capsys.readouterr().out)["hoja"]["anotacion"]["node_id"] == "q3"
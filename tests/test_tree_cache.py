@@ -0,0 +1,59 @@
+"""
+Caché de árboles de indagación: negaciones en la pregunta normalizada y
+errores del modelo de embeddings.
+"""
+
+import pytest
+
+from cd_modules.core import InquiryTreeCache, normalize_root_question
+from cd_modules.core.providers import registry
+
+
+QUESTION = "¿Puede una obra generada por IA tener derechos de autor?"
+NEGATED = "¿No puede una obra generada por IA tener derechos de autor?"
+
+
+class FailingEmbeddings:
+    def embed_query(self, text: str) -> list:
+        raise ConnectionError("sin red")
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = InquiryTreeCache(tmp_path / "trees.sqlite3")
+    yield cache
+    cache.close()
+
+
+def test_negations_are_kept_in_the_normalized_question():
+    assert normalize_root_question(NEGATED).split()[0] == "no"
+    assert normalize_root_question("Obra sin autor humano") != normalize_root_question(
+        "Obra con autor humano")
+
+
+def test_negated_question_does_not_reuse_the_affirmative_tree(cache):
+    affirmative = cache.put(QUESTION, {"root": QUESTION}, 1200.0, now=1.0)
+    assert cache.lookup(QUESTION, now=2.0).id == affirmative
+    assert cache.lookup(NEGATED, now=2.0) is None
+
+    negated = cache.put(NEGATED, {"root": NEGATED}, 900.0, now=3.0)
+    assert cache.lookup(NEGATED, now=4.0).id == negated
+    assert cache.lookup(QUESTION, now=4.0).id == affirmative
+    assert cache.stats()["misses"] == 1
+
+
+def test_embedding_errors_count_as_misses(cache, monkeypatch):
+    cache._embeddings = FailingEmbeddings()
+    assert cache.put(QUESTION, {"root": QUESTION}, 1200.0) is None
+    assert cache.lookup(QUESTION) is None
+
+    def failing_get(*args, **kwargs):
+        raise ValueError("Falta la clave de la API")
+
+    cache._embeddings = None
+    monkeypatch.setattr(registry, "get", failing_get)
+    assert cache.lookup(QUESTION) is None
+
+    stats = cache.stats()
+    assert (stats["embed_errors"], stats["misses"], stats["entries"]) == (3, 2, 0)
+    assert cache.available